@@ -0,0 +1,80 @@
+# app/api/ingest.py
+
+import json
+import sys
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from uuid import uuid4
+from app.settings import settings
+
+router = APIRouter()
+
+REQUIRED_FIELDS = ["store_id", "status", "timestamp_utc"]
+
+
+def parse_observations(body: bytes, content_type: str) -> list:
+    """Observations of a JSON array, a {"observations": [...]} object or NDJSON body."""
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("observations")
+    if not isinstance(payload, list):
+        raise ValueError("expected a list of observations")
+    return payload
+
+
+def observation_frame(observations: list):
+    """Validate observations into an ingest frame, giving rows without an id a new one."""
+    import pandas as pd
+    from app.services.status_ingest import normalize_status_frame
+
+    frame = pd.DataFrame(observations)
+    missing = [field for field in REQUIRED_FIELDS if field not in frame.columns]
+    if missing:
+        raise ValueError(f"observations are missing {', '.join(missing)}")
+    if "id" not in frame.columns:
+        frame["id"] = None
+    without_id = frame["id"].isna()
+    frame.loc[without_id, "id"] = [str(uuid4()) for _ in range(int(without_id.sum()))]
+    frame["id"] = frame["id"].astype(str)
+    return normalize_status_frame(frame.dropna(subset=["store_id"]))
+
+
+@router.post("/status", status_code=202)
+async def post_status(request: Request):
+    """Queue a batch of observations for a write-behind insert into store_status.
+
+    Accepts a JSON array (or {"observations": [...]}) or NDJSON with
+    Content-Type application/x-ndjson. Each observation has store_id,
+    status (active/inactive), timestamp_utc and an optional id that makes
+    retries idempotent. Invalid observations are counted and skipped; a
+    full buffer answers 503 so pollers back off.
+    """
+    # pandas and the write-behind buffer load with the first batch, not at boot
+    from app.services.status_buffer import BufferFull, status_buffer
+
+    body = await request.body()
+    try:
+        observations = parse_observations(body, request.headers.get("content-type", ""))
+        frame = await run_in_threadpool(observation_frame, observations) if observations else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid observations: {str(e)}")
+
+    accepted = 0 if frame is None else len(frame)
+    if accepted:
+        try:
+            await run_in_threadpool(status_buffer.put, frame)
+        except BufferFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Status buffer full, retry later",
+                headers={"Retry-After": str(max(1, round(settings.STATUS_BUFFER_FLUSH_SECONDS)))}
+            )
+    return {"accepted": accepted, "rejected": len(observations) - accepted, "buffered": status_buffer.rows}
+
+
+def stop_status_buffer():
+    """Flush and stop the write-behind buffer, if a POST /status ever started it."""
+    if "app.services.status_buffer" in sys.modules:
+        sys.modules["app.services.status_buffer"].status_buffer.stop()
@@ -1,57 +1,220 @@
 # app/api/report.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Iterator, List, Optional
 from uuid import uuid4
-from app.tasks.report_tasks import generate_store_report
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.models.report import Report
-import pandas as pd
+from app.services.report_events import TERMINAL_STATUSES, report_event, report_notifier
+from app.services.report_watermark import current_watermark, find_report_for_watermark
+from app.services.report_schema import REPORT_COLUMNS
 import os
+import zlib
 
 router = APIRouter()
 
+CHUNK_SIZE = 64 * 1024
+# Longest a client may hold a get_report request open waiting for completion
+MAX_WAIT_SECONDS = 300
+
+
+def iter_file(filepath: str, gzip_output: bool = False) -> Iterator[bytes]:
+    """Read a report file in chunks, optionally gzip-compressing on the fly."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if gzip_output else None
+    with open(filepath, "rb") as report_file:
+        while chunk := report_file.read(CHUNK_SIZE):
+            if compressor:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+    if compressor:
+        yield compressor.flush()
+
 
 @router.get("/trigger_report")
-def trigger_report():
-    """Trigger a new report generation"""
-    db: Session = next(get_db())
+async def trigger_report(profile: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """Trigger a new report generation, or reuse the report of the current data watermark.
+
+    With profile=true a new run is always started, profiled with cProfile
+    and tracemalloc; it does not claim the watermark, so regular triggers
+    never attach to it.
+    """
+    watermark = None
+    if not profile:
+        watermark = await current_watermark(db)
+        existing = await find_report_for_watermark(db, watermark)
+        if existing:
+            # Completed, or still running for the same data: attach to it
+            return {"report_id": existing.id}
     
     # Create new report record
     report_id = str(uuid4())
     report = Report(
         id=report_id,
-        status="Pending"
+        status="Pending",
+        watermark_key=watermark
     )
     db.add(report)
-    db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent trigger created the report for this watermark first
+        await db.rollback()
+        existing = await find_report_for_watermark(db, watermark)
+        if existing:
+            return {"report_id": existing.id}
+        raise HTTPException(status_code=409, detail="Concurrent report for the current data failed, retry")
     
-    # Trigger Celery task
-    generate_store_report.delay(report_id)
+    # Trigger Celery task; publishing to the broker is blocking I/O
+    try:
+        await run_in_threadpool(queue_report, report_id, profile)
+    except Exception as e:
+        # Never leave a report that no worker will run holding the watermark
+        report.status = "Failed"
+        report.error = f"Error queueing report: {str(e)}"
+        report.watermark_key = None
+        await db.commit()
+        raise
     
     return {"report_id": report_id}
 
 
+def queue_report(report_id: str, profile: bool = False):
+    """Send generate_store_report to the broker by name.
+
+    The API never runs the task, so it does not import the task modules
+    and the report engine behind them; Celery itself loads on first use.
+    """
+    from app.celery_app import celery_app
+
+    return celery_app.send_task("generate_store_report", args=[report_id], kwargs={"profile": profile})
+
+
 @router.get("/get_report/{report_id}")
-def get_report(report_id: str):
-    """Get report status and data"""
-    db: Session = next(get_db())
-    
-    # Get report from database
-    report = db.query(Report).filter(Report.id == report_id).first()
-    if not report:
-        raise HTTPException(status_code=404, detail="Report not found")
+async def get_report(
+    report_id: str,
+    compression: Optional[str] = None,
+    format: str = "csv",
+    store_id: Optional[List[str]] = Query(None),
+    columns: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    wait: Optional[float] = Query(None, ge=0, le=MAX_WAIT_SECONDS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get report status, or the finished report.
+
+    By default the report CSV is streamed (gzip with ?compression=gzip).
+    With format=json, store_id, columns or cursor, a page of rows is read
+    from the Parquet copy instead. With ?wait=<seconds> an unfinished
+    report is long-polled: the request returns as soon as the report
+    completes or fails, or with the current status after the timeout.
+    """
+    # Subscribe before reading, so a completion in between is not missed
+    queue = report_notifier.subscribe(report_id) if wait else None
+    try:
+        # Get report from database, releasing the connection before any file I/O
+        report = await db.get(Report, report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        await db.close()
+        if queue is not None and report.status not in TERMINAL_STATUSES:
+            # No connection is held while waiting
+            await report_notifier.wait(queue, wait)
+            report = await db.get(Report, report_id)
+            await db.close()
+            if not report:
+                raise HTTPException(status_code=404, detail="Report not found")
+    finally:
+        if queue is not None:
+            report_notifier.unsubscribe(report_id, queue)
     
     if report.status == "Running":
-        return {"status": "Running"}
+        return {
+            "status": "Running",
+            "progress": report.progress,
+            "eta_seconds": report.eta_seconds,
+            "stores_done": report.stores_done,
+            "total_stores": report.total_stores
+        }
     elif report.status == "Failed":
         return {"status": "Failed", "error": report.error}
     elif report.status == "Complete":
-        if not report.result:
+        result = report.result or {}
+        if format == "json" or store_id or columns or cursor:
+            return await run_in_threadpool(get_report_page, result, store_id, columns, cursor, limit)
+        
+        filepath = result.get("filepath")
+        if not filepath or not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Report data not found")
-        return {
-            "status": "Complete",
-            "data": report.result
+        
+        headers = {
+            "Content-Disposition": f'attachment; filename="{os.path.basename(filepath).removesuffix(".gz")}"',
+            "X-Report-Status": "Complete",
+            "X-Total-Stores": str(result.get("total_stores", "")),
+            "X-Stores-Processed": str(result.get("total_stores_processed", "")),
         }
+        if report.cpu_seconds is not None:
+            headers["X-Report-CPU-Seconds"] = str(report.cpu_seconds)
+            headers["X-Report-Peak-Memory-MB"] = str(report.peak_memory_mb)
+        stored_gzip = result.get("compression") == "gzip"
+        if stored_gzip or compression == "gzip":
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(
+            iter_file(filepath, gzip_output=compression == "gzip" and not stored_gzip),
+            media_type="text/csv",
+            headers=headers
+        )
     else:
-        return {"status": report.status}
\ No newline at end of file
+        return {"status": report.status}
+
+
+@router.get("/get_report/{report_id}/events")
+async def get_report_events(report_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Server-sent events with the status and progress of a report.
+
+    The first event is the current state; the stream ends after the event
+    that marks the report Complete or Failed.
+    """
+    queue = report_notifier.subscribe(report_id)
+    report = await db.get(Report, report_id)
+    if not report:
+        report_notifier.unsubscribe(report_id, queue)
+        raise HTTPException(status_code=404, detail="Report not found")
+    first = report_event(report)
+    await db.close()
+    return StreamingResponse(
+        report_notifier.stream(report_id, queue, first),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def get_report_page(result: dict, store_ids: Optional[List[str]], columns: Optional[str],
+                    cursor: Optional[str], limit: int) -> dict:
+    """Return filtered, projected and paginated rows of a completed report."""
+    from app.services.report_storage import query_report
+
+    parquet_path = result.get("parquet_path")
+    if not parquet_path or not os.path.exists(parquet_path):
+        raise HTTPException(status_code=404, detail="Columnar report data not found")
+    
+    projection = None
+    if columns:
+        projection = [column.strip() for column in columns.split(",") if column.strip()]
+        unknown = sorted(set(projection) - set(REPORT_COLUMNS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+    
+    page = query_report(parquet_path, store_ids=store_ids, columns=projection, cursor=cursor, limit=limit)
+    return {
+        "status": "Complete",
+        "data": page["rows"],
+        "next_cursor": page["next_cursor"],
+        "total_stores": result.get("total_stores")
+    }
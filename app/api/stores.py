@@ -0,0 +1,61 @@
+# app/api/stores.py
+
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.services.read_replica import get_read_db
+from app.models.store import StoreStatusEnum
+
+router = APIRouter()
+
+
+@router.get("/stores/status")
+def get_stores_status(
+    status: Optional[StoreStatusEnum] = None,
+    open_now: Optional[bool] = None,
+    min_streak_seconds: Optional[float] = Query(None, ge=0),
+    at: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=100000),
+    db: Session = Depends(get_read_db)
+):
+    """Live status of every store, from the in-memory snapshot.
+
+    Filters: status (active/inactive), open_now (inside or outside the
+    store's business hours in its timezone) and min_streak_seconds (time
+    since the last transition). Both are evaluated at `at`, by default the
+    latest observation. E.g. ?status=inactive&open_now=true lists the
+    stores down while they should be open. Pages follow next_cursor.
+    """
+    from app.services.status_snapshot import status_snapshot
+
+    return status_snapshot.query(
+        db, status=status.value if status else None, open_now=open_now,
+        min_streak_seconds=min_streak_seconds, at=at, cursor=cursor, limit=limit
+    )
+
+
+@router.get("/stores/{store_id}/uptime")
+def get_store_uptime(
+    store_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Business-hours uptime and downtime of one store over any time range, in hours.
+
+    Naive timestamps are UTC. end defaults to the latest observation and
+    start to one week before end.
+    """
+    # The index needs numpy; load it on the first query rather than at boot
+    from app.services.business_hours import as_utc
+    from app.services.uptime_index import store_uptime
+
+    if start and end and as_utc(start) >= as_utc(end):
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    uptime = store_uptime(db, store_id, start, end)
+    if uptime is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return uptime
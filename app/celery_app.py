@@ -1,13 +1,15 @@
 from celery import Celery
-from app.settings import Settings
+from celery.signals import worker_init, worker_process_init
+from app.settings import settings
+import logging
 
-settings = Settings()
+logger = logging.getLogger(__name__)
 
 celery_app = Celery(
     "store_monitor",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=['app.tasks.report_tasks']  # Include our tasks module
+    include=['app.tasks.report_tasks', 'app.tasks.rollup_tasks', 'app.tasks.interval_tasks']  # Include our tasks modules
 )
 
 celery_app.conf.update(
@@ -16,4 +18,56 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
-) 
\ No newline at end of file
+    # Report tasks are acknowledged late; fetch one at a time and let a running
+    # report outlive the redelivery of unacknowledged Redis messages
+    worker_prefetch_multiplier=1,
+    broker_transport_options={'visibility_timeout': settings.REPORT_VISIBILITY_TIMEOUT_SECONDS},
+    beat_schedule={
+        'refresh-uptime-rollup': {
+            'task': 'refresh_uptime_rollup',
+            'schedule': settings.ROLLUP_REFRESH_SECONDS,
+        },
+        'compact-status-intervals': {
+            'task': 'compact_status_intervals',
+            'schedule': settings.INTERVAL_COMPACTION_SECONDS,
+        },
+    },
+)
+
+
+@worker_init.connect
+def check_worker_schema(**kwargs):
+    """Stop a worker started on a database that lacks columns of the models."""
+    from app.db.database import engine
+    from app.db.schema import check_schema
+
+    try:
+        check_schema(engine)
+    except RuntimeError as e:
+        logger.critical(str(e))
+        # Signal handlers' exceptions are only logged, exit explicitly
+        raise SystemExit(1)
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    """Open a database connection and fill the metadata cache before the first task.
+
+    Runs in every pool process; connections inherited from the parent
+    across the fork are dropped without being closed.
+    """
+    if not settings.WORKER_WARMUP:
+        return
+    from app.db.database import engine, get_db, read_engine
+    from app.services.metadata_cache import metadata_cache
+
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+    db = next(get_db())
+    try:
+        metadata_cache.warm(db)
+    except Exception as e:
+        # A cold cache only costs the first report its metadata load
+        logger.warning(f"Worker warm-up failed: {str(e)}")
+    finally:
+        db.close()
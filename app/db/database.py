@@ -1,17 +1,76 @@
-from app.settings import Settings
-from sqlalchemy import create_engine
+from app.settings import settings
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-settings = Settings()
+# Async drivers used by the API for each sync database backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-engine = create_engine(settings.DATABASE_URL)
+
+def async_database_url(url: str):
+    """Return the DATABASE_URL with its driver swapped for the asyncio one."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def pool_options() -> dict:
+    """Connection pool configuration shared by the sync and async engines."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, **pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # Let progress updates commit while a report scan is reading
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(
+        settings.DATABASE_READ_URL,
+        # Replica connections refuse writes, so a misrouted one fails loudly
+        connect_args={"options": "-c default_transaction_read_only=on"}
+        if make_url(settings.DATABASE_READ_URL).get_backend_name() == "postgresql" else {},
+        **pool_options()
+    )
+    if read_engine.dialect.name == "sqlite":
+        @event.listens_for(read_engine, "connect")
+        def _read_only(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA query_only=ON")
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), **pool_options())
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def uses_read_replica(db: Session) -> bool:
+    """Whether a session reads from the replica rather than the primary."""
+    return read_engine is not engine and db.get_bind() is read_engine
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
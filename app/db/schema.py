@@ -0,0 +1,37 @@
+# app/db/schema.py
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from typing import Dict, List
+from app.db.database import Base
+
+
+def missing_columns(bind: Engine) -> Dict[str, List[str]]:
+    """Columns of the models that existing tables lack, by table.
+
+    create_all only creates missing tables; it never adds a column to a
+    table an earlier version created.
+    """
+    # Register every model on Base
+    import app.models
+    import app.models.report
+
+    inspector = inspect(bind)
+    missing = {}
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        columns = [column.name for column in table.columns if column.name not in existing]
+        if columns:
+            missing[table.name] = columns
+    return missing
+
+
+def check_schema(bind: Engine):
+    """Refuse a database whose tables lack columns of the models, naming them."""
+    missing = missing_columns(bind)
+    if missing:
+        tables = "; ".join(f"{table}: {', '.join(columns)}" for table, columns in missing.items())
+        raise RuntimeError(f"Database schema is out of date, missing columns ({tables}). "
+                           f"Apply the ALTER TABLE statements of the README first.")
@@ -1,24 +1,52 @@
-from fastapi import FastAPI
-from app.settings import Settings
-from app.db.database import engine, Base
-from app.api import report
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
+from app.settings import settings
+from app.db.database import engine, async_engine, Base, SessionLocal
+from app.db.schema import check_schema
+from app.api import ingest, report, stores
+from app.services.metrics import render_metrics, warn_without_multiprocess
+from app.services.report_events import report_notifier
+from app.services.report_watermark import init_store_directory
+from prometheus_client import CONTENT_TYPE_LATEST
 
 # Initialize FastAPI app
 app = FastAPI()
 app.include_router(report.router)
-settings = Settings()
+app.include_router(stores.router)
+app.include_router(ingest.router)
 
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    check_schema(engine)
+    db = SessionLocal()
+    try:
+        init_store_directory(db)
+    finally:
+        db.close()
 
 
 @app.on_event("startup")
 def on_startup():
     print(f"[INFO] Environment: {settings.ENVIRONMENT}")
     init_db()
+    warn_without_multiprocess()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Write what POST /status still buffers before the engines go away
+    await run_in_threadpool(ingest.stop_status_buffer)
+    await report_notifier.stop()
+    await async_engine.dispose()
 
 
 @app.get("/")
 def read_root():
-    return {"message": "Health Check OK" , "status": 200}
\ No newline at end of file
+    return {"message": "Health Check OK" , "status": 200}
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of the API and, in multiprocess mode, the workers."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,6 @@
-from .store import StoreStatus
+from .store import Store, StoreStatus
 from .timezone import StoreTimezone
 from .hours import BusinessHour
-
+from .rollup import StoreHourlyUptime, StoreRollupState
+from .interval import StoreStatusInterval
+from .ingest import IngestCheckpoint, IngestVersion
@@ -0,0 +1,21 @@
+# model for resumable ingest checkpoints
+
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class IngestCheckpoint(Base):
+    __tablename__ = "ingest_checkpoints"
+
+    source = Column(String, primary_key=True)  # identity of the ingested file: path, size and mtime
+    load_id = Column(String, nullable=False)  # prefix of the row ids generated by this load
+    rows_loaded = Column(Integer, nullable=False, default=0)  # data rows committed so far
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class IngestVersion(Base):
+    __tablename__ = "ingest_versions"
+
+    source = Column(String, primary_key=True)  # name of the versioned dataset
+    version = Column(Integer, nullable=False, default=0)  # bumped on every ingest
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
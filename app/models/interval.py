@@ -0,0 +1,18 @@
+# model for the run-length compacted status timeline
+
+from app.db.database import Base
+from app.models.store import StoreStatusEnum
+from sqlalchemy import Column, String, DateTime, Integer, Enum, Index
+
+class StoreStatusInterval(Base):
+    __tablename__ = "store_status_interval"
+
+    store_id = Column(String, primary_key=True)
+    start_utc = Column(DateTime(timezone=True), primary_key=True)  # first poll of the run
+    status = Column(Enum(StoreStatusEnum), nullable=False)
+    end_utc = Column(DateTime(timezone=True), nullable=False)  # last poll of the run; the status holds until the next run starts
+    polls = Column(Integer, nullable=False, default=1)  # raw store_status rows compacted into the run
+
+    __table_args__ = (
+        Index('idx_status_interval_end', 'end_utc'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Float
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -10,4 +10,12 @@ class Report(Base):
     error = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
-    result = Column(JSON, nullable=True)  # Store report data or error details 
\ No newline at end of file
+    result = Column(JSON, nullable=True)  # Store report data or error details
+    watermark_key = Column(String, unique=True, nullable=True)  # data watermark the report was built from, cleared on failure
+    started_at = Column(DateTime(timezone=True), nullable=True)  # when a worker picked the report up
+    total_stores = Column(Integer, nullable=True)
+    stores_done = Column(Integer, nullable=False, default=0)
+    progress = Column(Float, nullable=True)  # percent of stores computed
+    eta_seconds = Column(Float, nullable=True)  # estimated seconds until the stores are computed
+    cpu_seconds = Column(Float, nullable=True)  # CPU time of a profiled run, summed over its shards
+    peak_memory_mb = Column(Float, nullable=True)  # tracemalloc peak of a profiled run, largest shard
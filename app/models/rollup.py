@@ -0,0 +1,26 @@
+# model for the hourly uptime rollup
+
+from app.db.database import Base
+from app.models.store import StoreStatusEnum
+from sqlalchemy import Boolean, Column, String, DateTime, Float, Enum, Index, false
+
+class StoreHourlyUptime(Base):
+    __tablename__ = "store_hourly_uptime"
+
+    store_id = Column(String, primary_key=True)
+    hour_utc = Column(DateTime(timezone=True), primary_key=True)  # start of the UTC hour
+    uptime_seconds = Column(Float, nullable=False, default=0.0)  # restricted to business hours
+    downtime_seconds = Column(Float, nullable=False, default=0.0)  # restricted to business hours
+
+    __table_args__ = (
+        Index('idx_hourly_uptime_hour', 'hour_utc'),
+    )
+
+class StoreRollupState(Base):
+    __tablename__ = "store_rollup_state"
+
+    store_id = Column(String, primary_key=True)
+    dirty_from_utc = Column(DateTime(timezone=True), nullable=True, index=True)  # earliest change not rolled up, NULL when clean
+    last_timestamp_utc = Column(DateTime(timezone=True), nullable=True)  # latest rolled up observation
+    last_status = Column(Enum(StoreStatusEnum), nullable=True)  # its status, extended to the report end
+    intervals_dirty = Column(Boolean, nullable=False, default=True, server_default=false(), index=True)  # ingested since the last interval compaction
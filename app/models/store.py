@@ -1,16 +1,25 @@
 from app.db.database import Base
-from sqlalchemy import Column, String, DateTime, Enum, Index
+from sqlalchemy import Column, String, Integer, DateTime, Enum, Index
 import enum
 
 class StoreStatusEnum(str, enum.Enum):
     active = "active"
     inactive = "inactive"
 
+class Store(Base):
+    __tablename__ = "stores"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # compact surrogate key
+    store_id = Column(String, nullable=False, unique=True)  # store UUID used everywhere else
+    last_seen_utc = Column(DateTime(timezone=True), nullable=True, index=True)  # latest observation, NULL for metadata-only stores
+    last_status = Column(Enum(StoreStatusEnum), nullable=True)  # status of the latest observation
+    change_version = Column(Integer, nullable=True, index=True)  # ingest version that last moved last_seen_utc
+
 class StoreStatus(Base):
     __tablename__ = "store_status"
 
     id = Column(String, primary_key=True)
-    store_id = Column(String, nullable=False, index=True)
+    store_id = Column(String, nullable=False)  # leads idx_store_timestamp
     status = Column(Enum(StoreStatusEnum), nullable=False)
     timestamp_utc = Column(DateTime(timezone=True), nullable=False, index=True)
 
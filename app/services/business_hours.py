@@ -0,0 +1,163 @@
+# app/services/business_hours.py
+
+import bisect
+import numpy as np
+from datetime import datetime, timedelta, time
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 3600
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+
+def parse_time(time_str: str) -> time:
+    """Parse time string to time object."""
+    try:
+        return datetime.strptime(time_str, "%H:%M:%S").time()
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid time format: {time_str}")
+        return time(0, 0, 0)
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Return a naive (assumed UTC) or aware datetime as an aware UTC datetime."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=pytz.utc)
+    return timestamp.astimezone(pytz.utc)
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Convert a naive (assumed UTC) or aware datetime to epoch seconds."""
+    return as_utc(timestamp).timestamp()
+
+
+def second_of_week(timestamp: datetime, timezone_str: str) -> int:
+    """Seconds since Monday midnight of a timestamp in the given timezone's local time."""
+    local = as_utc(timestamp).astimezone(pytz.timezone(timezone_str))
+    return local.weekday() * DAY_SECONDS + local.hour * 3600 + local.minute * 60 + local.second
+
+
+def merge_intervals(intervals: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Sort intervals and merge the overlapping or touching ones."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def open_seconds_before(starts: np.ndarray, ends: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Seconds covered by the sorted, disjoint [starts, ends) intervals before each point."""
+    points = np.asarray(points, dtype=np.float64)
+    if len(starts) == 0:
+        return np.zeros(len(points), dtype=np.float64)
+
+    lengths = ends - starts
+    covered_before = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    position = np.searchsorted(starts, points, side="right") - 1
+    inside = position >= 0
+    position = np.clip(position, 0, None)
+
+    partial = np.clip(points - starts[position], 0.0, lengths[position])
+    return np.where(inside, covered_before[position] + partial, 0.0)
+
+
+@lru_cache(maxsize=4096)
+def _utc_intervals(week_intervals: Tuple[Tuple[int, int], ...], timezone_str: str,
+                   start_epoch: float, end_epoch: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Project local second-of-week intervals onto UTC epoch seconds within [start, end]."""
+    tz = pytz.timezone(timezone_str)
+
+    # Cover the window with whole local weeks, starting from the Monday before it
+    first_day = datetime.fromtimestamp(start_epoch, tz).date() - timedelta(days=1)
+    last_day = datetime.fromtimestamp(end_epoch, tz).date() + timedelta(days=1)
+    monday = first_day - timedelta(days=first_day.weekday())
+
+    projected = []
+    while monday <= last_day:
+        week_start = datetime.combine(monday, time(0, 0, 0))
+        for open_offset, close_offset in week_intervals:
+            # localize() resolves DST gaps and overlaps to a single offset
+            opens = tz.localize(week_start + timedelta(seconds=open_offset)).timestamp()
+            closes = tz.localize(week_start + timedelta(seconds=close_offset)).timestamp()
+            opens, closes = max(opens, start_epoch), min(closes, end_epoch)
+            if opens < closes:
+                projected.append((opens, closes))
+        monday += timedelta(days=7)
+
+    merged = merge_intervals(projected)
+    starts = np.array([interval[0] for interval in merged], dtype=np.float64)
+    ends = np.array([interval[1] for interval in merged], dtype=np.float64)
+    return starts, ends
+
+
+class BusinessHoursIndex:
+    """Sorted second-of-week open intervals of a store, in the store's local time."""
+
+    def __init__(self, week_intervals: List[Tuple[int, int]]):
+        self.week_intervals = tuple(merge_intervals(week_intervals))
+
+    @classmethod
+    def from_seconds(cls, entries: Iterable[Tuple[int, int, int]]) -> "BusinessHoursIndex":
+        """Build the index from (dayOfWeek, start seconds, end seconds) entries."""
+        week_intervals = []
+        for day, start_seconds, end_seconds in entries:
+            if end_seconds < start_seconds:
+                # Closes after midnight, on the next day
+                end_seconds += DAY_SECONDS
+            opens = int(day) * DAY_SECONDS + int(start_seconds)
+            closes = int(day) * DAY_SECONDS + int(end_seconds)
+            if closes > WEEK_SECONDS:
+                # Sunday night spills over into Monday
+                week_intervals.append((0, closes - WEEK_SECONDS))
+                closes = WEEK_SECONDS
+            week_intervals.append((opens, closes))
+        return cls(week_intervals)
+
+    @classmethod
+    def from_rows(cls, business_hours: list) -> "BusinessHoursIndex":
+        """Build the index from BusinessHour rows."""
+        entries = []
+        for hours in business_hours:
+            start_time = parse_time(hours.start_time_local)
+            end_time = parse_time(hours.end_time_local)
+            entries.append((
+                hours.dayOfWeek,
+                start_time.hour * 3600 + start_time.minute * 60 + start_time.second,
+                end_time.hour * 3600 + end_time.minute * 60 + end_time.second
+            ))
+        return cls.from_seconds(entries)
+
+    @property
+    def always_open(self) -> bool:
+        """Stores without business hours are considered always open."""
+        return not self.week_intervals
+
+    def is_open(self, local_second_of_week: int) -> bool:
+        """Whether the store is open at a local second of the week."""
+        if self.always_open:
+            return True
+        position = bisect.bisect_right(self.week_intervals, (local_second_of_week, WEEK_SECONDS + 1)) - 1
+        return position >= 0 and local_second_of_week < self.week_intervals[position][1]
+
+    def utc_intervals(self, timezone_str: str, start_time: datetime,
+                      end_time: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """Open intervals as sorted UTC epoch-second arrays clipped to [start_time, end_time]."""
+        start_epoch, end_epoch = to_epoch(start_time), to_epoch(end_time)
+        if self.always_open:
+            return np.array([start_epoch]), np.array([end_epoch])
+        return _utc_intervals(self.week_intervals, timezone_str, start_epoch, end_epoch)
+
+    def open_seconds(self, timezone_str: str, start_time: datetime, end_time: datetime,
+                     points: np.ndarray) -> np.ndarray:
+        """Open seconds between start_time and each epoch-second point."""
+        starts, ends = self.utc_intervals(timezone_str, start_time, end_time)
+        return open_seconds_before(starts, ends, points)
@@ -0,0 +1,114 @@
+# app/services/instrumentation.py
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.services.metrics import REPORT_PHASE_QUERIES, REPORT_PHASE_SECONDS, REPORT_ROWS
+import logging
+
+logger = logging.getLogger(__name__)
+
+_current_timer: ContextVar[Optional["PhaseTimer"]] = ContextVar("current_phase_timer", default=None)
+
+
+class PhaseTimer:
+    """Exclusive wall time, query and row counts of the phases of one report run.
+
+    Phases nest: entering a phase pauses the enclosing one, so the phase
+    times add up to the instrumented wall time.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.queries = defaultdict(int)
+        self.rows = defaultdict(int)
+        self._stack = []
+
+    @contextmanager
+    def activate(self):
+        """Make this the timer that phase(), count_rows() and query counting report to."""
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+    @contextmanager
+    def phase(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            parent, started = self._stack[-1]
+            self.seconds[parent] += now - started
+        self._stack.append((name, now))
+        try:
+            yield
+        finally:
+            name, started = self._stack.pop()
+            now = time.perf_counter()
+            self.seconds[name] += now - started
+            if self._stack:
+                self._stack[-1] = (self._stack[-1][0], now)
+
+    def count_query(self):
+        self.queries[self._stack[-1][0] if self._stack else "other"] += 1
+
+    def merge(self, summary: dict):
+        """Add the summary of another timer, e.g. of a report shard."""
+        for name, values in summary.get("phases", {}).items():
+            self.seconds[name] += values["seconds"]
+            self.queries[name] += values["queries"]
+        for kind, count in summary.get("rows", {}).items():
+            self.rows[kind] += count
+
+    def summary(self) -> dict:
+        phases = sorted(set(self.seconds) | set(self.queries))
+        return {
+            "phases": {
+                name: {"seconds": round(self.seconds[name], 3), "queries": self.queries[name]}
+                for name in phases
+            },
+            "rows": dict(self.rows),
+            "queries": sum(self.queries.values()),
+        }
+
+    def observe(self, phases: Optional[Iterable[str]] = None):
+        """Export the recorded phases to the Prometheus metrics."""
+        for name in phases or sorted(set(self.seconds) | set(self.queries)):
+            REPORT_PHASE_SECONDS.labels(phase=name).observe(self.seconds[name])
+            REPORT_PHASE_QUERIES.labels(phase=name).inc(self.queries[name])
+        for kind, count in self.rows.items():
+            REPORT_ROWS.labels(kind=kind).inc(count)
+
+    def log(self, label: str):
+        parts = ", ".join(
+            f"{name} {self.seconds[name]:.2f}s/{self.queries[name]}q" for name in sorted(self.seconds)
+        )
+        logger.info(f"{label} phases: {parts}; rows: {dict(self.rows)}")
+
+
+@contextmanager
+def phase(name: str):
+    """Time a phase on the active timer; a no-op outside an instrumented run."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+def count_rows(kind: str, count: int):
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.rows[kind] += count
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.count_query()
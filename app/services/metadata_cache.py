@@ -0,0 +1,202 @@
+# app/services/metadata_cache.py
+
+import numpy as np
+import pandas as pd
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from app.models.timezone import StoreTimezone
+from app.models.hours import BusinessHour
+from app.services.business_hours import BusinessHoursIndex
+from app.settings import settings
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Above this many misses a full-table load is cheaper than IN (...) lookups
+BULK_LOAD_THRESHOLD = 1000
+IN_CLAUSE_CHUNK = 500
+
+
+class BusinessHourRow(NamedTuple):
+    dayOfWeek: int
+    start_time_local: str
+    end_time_local: str
+
+
+class StoreMetadata(NamedTuple):
+    timezone_str: Optional[str]  # None when the store has no timezone row
+    business_hours: Tuple[BusinessHourRow, ...]
+    hours_index: BusinessHoursIndex
+
+
+def load_timezones(db: Session, store_ids: Optional[List[str]] = None) -> Dict[str, str]:
+    """Load the timezone of every store in one query."""
+    query = db.query(StoreTimezone.store_id, StoreTimezone.timezone_str)
+    if store_ids is not None:
+        query = query.filter(StoreTimezone.store_id.in_(store_ids))
+    return {str(store_id): timezone_str for store_id, timezone_str in query.all()}
+
+
+def load_business_hours(db: Session, store_ids: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load business hours of every store in one query, with seconds since local midnight."""
+    query = db.query(
+        BusinessHour.store_id,
+        BusinessHour.dayOfWeek,
+        BusinessHour.start_time_local,
+        BusinessHour.end_time_local
+    )
+    if store_ids is not None:
+        query = query.filter(BusinessHour.store_id.in_(store_ids))
+
+    frame = pd.DataFrame(query.all(), columns=["store_id", "dayOfWeek", "start_time_local", "end_time_local"])
+    frame["store_id"] = frame["store_id"].astype(str)
+    frame["start_seconds"] = _seconds_of_day(frame["start_time_local"])
+    frame["end_seconds"] = _seconds_of_day(frame["end_time_local"])
+    return frame
+
+
+def _seconds_of_day(values: pd.Series) -> pd.Series:
+    """Parse HH:MM:SS strings into seconds; invalid values map to midnight like parse_time."""
+    parsed = pd.to_datetime(values.astype(str), format="%H:%M:%S", errors="coerce")
+    seconds = parsed.dt.hour * 3600 + parsed.dt.minute * 60 + parsed.dt.second
+    invalid = parsed.isna() & values.notna()
+    if invalid.any():
+        logger.warning(f"Invalid time format in {int(invalid.sum())} business hour rows")
+    return seconds.fillna(0).astype(np.int64)
+
+
+def build_metadata(store_ids: Iterable[str], timezones: Dict[str, str],
+                   business_hours: pd.DataFrame) -> Dict[str, StoreMetadata]:
+    """Combine bulk-loaded timezones and business hours into per-store metadata."""
+    rows, entries = {}, {}
+    for store_id, day, start_local, end_local, start_seconds, end_seconds in business_hours[
+        ["store_id", "dayOfWeek", "start_time_local", "end_time_local", "start_seconds", "end_seconds"]
+    ].itertuples(index=False):
+        rows.setdefault(store_id, []).append(BusinessHourRow(int(day), start_local, end_local))
+        entries.setdefault(store_id, []).append((day, start_seconds, end_seconds))
+
+    return {
+        store_id: StoreMetadata(
+            timezone_str=timezones.get(store_id),
+            business_hours=tuple(rows.get(store_id, ())),
+            hours_index=BusinessHoursIndex.from_seconds(entries.get(store_id, ()))
+        )
+        for store_id in store_ids
+    }
+
+
+class StoreMetadataCache:
+    """Process-wide LRU/TTL cache of store timezones and business hours.
+
+    Invalidation is in-process: ingest paths running in another process
+    (e.g. the CSV loader script) are picked up once entries expire.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, StoreMetadata]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0  # bumped whenever cached metadata is loaded or dropped
+
+    def _lookup(self, store_id: str) -> Optional[StoreMetadata]:
+        entry = self._entries.get(store_id)
+        if entry is None:
+            return None
+        loaded_at, metadata = entry
+        if time.monotonic() - loaded_at > self.ttl_seconds:
+            del self._entries[store_id]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(store_id)
+        return metadata
+
+    def _store(self, metadata: Dict[str, StoreMetadata]):
+        now = time.monotonic()
+        if metadata:
+            self.generation += 1
+        for store_id, entry in metadata.items():
+            self._entries[store_id] = (now, entry)
+            self._entries.move_to_end(store_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, db: Session, store_ids: List[str]) -> Dict[str, StoreMetadata]:
+        if len(store_ids) > BULK_LOAD_THRESHOLD:
+            return build_metadata(store_ids, load_timezones(db), load_business_hours(db))
+
+        metadata = {}
+        for chunk_start in range(0, len(store_ids), IN_CLAUSE_CHUNK):
+            chunk = store_ids[chunk_start:chunk_start + IN_CLAUSE_CHUNK]
+            metadata.update(build_metadata(chunk, load_timezones(db, chunk), load_business_hours(db, chunk)))
+        return metadata
+
+    def get_many(self, db: Session, store_ids: Iterable[str]) -> Dict[str, StoreMetadata]:
+        """Return metadata for all given stores, loading the misses in bulk."""
+        result, missing = {}, []
+        with self._lock:
+            for store_id in store_ids:
+                metadata = self._lookup(store_id)
+                if metadata is None:
+                    missing.append(store_id)
+                else:
+                    result[store_id] = metadata
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load(db, missing)
+            with self._lock:
+                self._store(loaded)
+            result.update(loaded)
+        return result
+
+    def get(self, db: Session, store_id: str) -> StoreMetadata:
+        """Return metadata for a single store."""
+        return self.get_many(db, [store_id])[store_id]
+
+    def warm(self, db: Session, store_ids: Optional[List[str]] = None):
+        """Bulk-load metadata for the given stores, or for every known store."""
+        if store_ids is None:
+            timezones = load_timezones(db)
+            business_hours = load_business_hours(db)
+            store_ids = list(set(timezones) | set(business_hours["store_id"]))
+            metadata = build_metadata(store_ids, timezones, business_hours)
+        else:
+            metadata = self._load(db, list(store_ids))
+        with self._lock:
+            self._store(metadata)
+        logger.info(f"Warmed store metadata cache with {len(metadata)} stores")
+
+    def invalidate(self, store_ids: Optional[Iterable[str]] = None):
+        """Drop cached metadata for the given stores, or for all stores."""
+        with self._lock:
+            self.generation += 1
+            if store_ids is None:
+                self._entries.clear()
+            else:
+                for store_id in store_ids:
+                    self._entries.pop(store_id, None)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries)
+            }
+
+
+metadata_cache = StoreMetadataCache(
+    maxsize=settings.METADATA_CACHE_SIZE,
+    ttl_seconds=settings.METADATA_CACHE_TTL_SECONDS
+)
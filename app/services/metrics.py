@@ -0,0 +1,97 @@
+# app/services/metrics.py
+
+import os
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, REGISTRY
+from prometheus_client import multiprocess
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Buckets from seconds up to a multi-hour report
+DURATION_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200, 14400, float("inf"))
+
+REPORT_PHASE_SECONDS = Histogram(
+    "store_monitor_report_phase_seconds",
+    "Time spent in each phase of a report run (or report shard)",
+    ["phase"],
+    buckets=DURATION_BUCKETS,
+)
+REPORT_PHASE_QUERIES = Counter(
+    "store_monitor_report_phase_queries_total",
+    "Database statements executed in each report phase",
+    ["phase"],
+)
+REPORT_ROWS = Counter(
+    "store_monitor_report_rows_total",
+    "Rows handled by report runs, by kind",
+    ["kind"],
+)
+REPORT_DURATION_SECONDS = Histogram(
+    "store_monitor_report_duration_seconds",
+    "Time from a report starting to run until it completes or fails",
+    ["execution", "status"],
+    buckets=DURATION_BUCKETS,
+)
+REPORT_QUEUE_LATENCY_SECONDS = Histogram(
+    "store_monitor_report_queue_latency_seconds",
+    "Time from a report being triggered until a worker starts it",
+    buckets=DURATION_BUCKETS,
+)
+INGEST_ROWS = Counter(
+    "store_monitor_ingest_rows_total",
+    "Rows written by ingest, by source",
+    ["source"],
+)
+INGEST_BATCH_SECONDS = Histogram(
+    "store_monitor_ingest_batch_seconds",
+    "Time to write one ingest batch, by source",
+    ["source"],
+)
+READ_ROUTING = Counter(
+    "store_monitor_read_routing_total",
+    "Read-only sessions opened, by the database they were routed to",
+    ["use", "target"],
+)
+REPLICA_LAG_SECONDS = Gauge(
+    "store_monitor_replica_lag_seconds",
+    "Observation time the read replica trailed the primary by at its last check",
+    multiprocess_mode="livemax",
+)
+
+STATUS_BUFFER_ROWS = Gauge(
+    "store_monitor_status_buffer_rows",
+    "Observations waiting in the write-behind buffer of POST /status",
+    multiprocess_mode="livesum",
+)
+STATUS_BUFFER_REJECTED = Counter(
+    "store_monitor_status_buffer_rejected_total",
+    "Observations refused by POST /status because the write-behind buffer was full",
+)
+STATUS_BUFFER_DEAD_LETTERED = Counter(
+    "store_monitor_status_buffer_dead_lettered_total",
+    "Buffered observations the database kept rejecting, written to the dead-letter CSV",
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def warn_without_multiprocess():
+    """Warn at API startup that /metrics cannot show what the Celery workers record."""
+    if not multiprocess_enabled():
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set: /metrics shows only this API process, "
+                       "report metrics recorded by the Celery workers will be missing")
+
+
+def render_metrics() -> bytes:
+    """Render all metrics in the Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set (shared by the API and the Celery
+    workers) the samples of every process are aggregated.
+    """
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -0,0 +1,127 @@
+# app/services/read_replica.py
+
+import threading
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy.orm import Session
+from app.db.database import ReadSessionLocal, SessionLocal, engine, read_engine
+from app.services.metrics import READ_ROUTING, REPLICA_LAG_SECONDS
+from app.services.report_watermark import data_watermark
+from app.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Report engines that only read; REPORT_ENGINE=sql writes temporary tables, which a replica refuses
+REPLICA_ENGINES = ("vectorized", "intervals", "rollup", "per_store")
+
+
+class ReplicaState(NamedTuple):
+    caught_up: bool  # the replica has every ingest the primary had when checked
+    lag_seconds: float  # observation time the replica trails the primary by
+
+
+def check_replica() -> ReplicaState:
+    """Compare the data watermark of the replica against the primary's.
+
+    The primary is read first: replication only moves the replica forward,
+    so a replica that matches afterwards holds at least that data.
+    """
+    # Deferred: business_hours pulls in numpy, which the API does not need to boot
+    from app.services.business_hours import as_utc
+
+    primary, replica = SessionLocal(), ReadSessionLocal()
+    try:
+        primary_latest, primary_version = data_watermark(primary)
+        replica_latest, replica_version = data_watermark(replica)
+    finally:
+        primary.close()
+        replica.close()
+
+    caught_up = replica_version >= primary_version
+    if caught_up or primary_latest is None:
+        lag = 0.0
+    elif replica_latest is None:
+        lag = float("inf")
+    else:
+        lag = max((as_utc(primary_latest) - as_utc(replica_latest)).total_seconds(), 0.0)
+    return ReplicaState(caught_up, lag)
+
+
+class ReadReplica:
+    """Routes read-only work to the replica while it is fresh enough, otherwise to the primary.
+
+    Reads tolerate max_lag_seconds of missing observations. Report scans
+    check on every run, since a report is cut off at the latest observation
+    its session sees; store reads reuse a check for check_seconds. An
+    unreachable replica counts as stale.
+    """
+
+    def __init__(self, max_lag_seconds: float, check_seconds: float):
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._state: Optional[ReplicaState] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return read_engine is not engine
+
+    def state(self, max_age: float = 0.0) -> Optional[ReplicaState]:
+        """Replica freshness, checked again when older than max_age; None when the replica is unreachable."""
+        with self._lock:
+            if time.monotonic() - self._checked_at <= max_age:
+                return self._state
+            try:
+                self._state = check_replica()
+                REPLICA_LAG_SECONDS.set(self._state.lag_seconds)
+            except Exception as e:
+                logger.warning(f"Read replica check failed, using the primary: {str(e)}")
+                self._state = None
+            self._checked_at = time.monotonic()
+            return self._state
+
+    def _session(self, use: str, fresh: bool) -> Session:
+        target = "replica" if fresh else "primary"
+        READ_ROUTING.labels(use=use, target=target).inc()
+        return ReadSessionLocal() if fresh else SessionLocal()
+
+    def _fresh(self, state: Optional[ReplicaState]) -> bool:
+        return state is not None and (state.caught_up or state.lag_seconds <= self.max_lag_seconds)
+
+    def scan_session(self) -> Session:
+        """Session for a report scan: the replica while it lags by at most max_lag_seconds.
+
+        Ingest bumps the version on every flush, so under continuous ingest
+        the replica is rarely fully caught up; a lag within bounds only
+        moves the report's cut-off back. Engines that write during a report
+        always scan the primary.
+        """
+        if not self.configured:
+            return SessionLocal()
+        if settings.REPORT_ENGINE not in REPLICA_ENGINES:
+            return self._session("report", False)
+        state = self.state()
+        fresh = self._fresh(state)
+        if state is not None and not fresh:
+            logger.info(f"Read replica trails the primary by {state.lag_seconds:.0f}s, scanning the primary")
+        return self._session("report", fresh)
+
+    def read_session(self) -> Session:
+        """Session for store reads: the replica while it lags by at most max_lag_seconds."""
+        if not self.configured:
+            return SessionLocal()
+        return self._session("store", self._fresh(self.state(self.check_seconds)))
+
+
+read_replica = ReadReplica(settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_SECONDS)
+
+
+def get_read_db():
+    """Dependency for read-only endpoints, routed by replica lag."""
+    db = read_replica.read_session()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,132 @@
+# app/services/report_checkpoint.py
+
+import json
+import os
+import shutil
+from datetime import datetime
+from app.services.report_writer import report_parts_dir
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ReportCheckpoint:
+    """Progress of a report run, saved next to its partial files so a redelivered task can resume.
+
+    The manifest holds the data cut-off of the first attempt, the finished
+    batches (part file, rows and last store written) and the attempt count.
+    It is replaced atomically after every change.
+    """
+
+    def __init__(self, report_id: str, state: dict):
+        self.report_id = report_id
+        self.state = state
+
+    @property
+    def path(self) -> str:
+        return os.path.join(report_parts_dir(self.report_id), MANIFEST_NAME)
+
+    @classmethod
+    def load(cls, report_id: str) -> Optional["ReportCheckpoint"]:
+        """Return the saved checkpoint of a report, or None when it has none."""
+        checkpoint = cls(report_id, {})
+        try:
+            with open(checkpoint.path) as manifest:
+                checkpoint.state = json.load(manifest)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            # Only a torn write could cause this; start over rather than fail the report
+            logger.error(f"Unreadable checkpoint of report {report_id}, starting over: {str(e)}")
+            cls.discard(report_id)
+            return None
+        return checkpoint
+
+    @classmethod
+    def open(cls, report_id: str) -> "ReportCheckpoint":
+        """Load the checkpoint of a report, or start an empty one."""
+        return cls.load(report_id) or cls(report_id, {"attempts": 0, "parts": [], "dispatched": False})
+
+    @classmethod
+    def discard(cls, report_id: str):
+        """Remove the checkpoint and every partial file of a report."""
+        shutil.rmtree(report_parts_dir(report_id), ignore_errors=True)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as manifest:
+            json.dump(self.state, manifest)
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        os.replace(tmp_path, self.path)
+
+    @property
+    def attempts(self) -> int:
+        return self.state["attempts"]
+
+    def start_attempt(self) -> int:
+        """Count a new attempt of the report task and return the count."""
+        self.state["attempts"] += 1
+        self.save()
+        return self.attempts
+
+    @property
+    def started(self) -> bool:
+        """Whether the store list and cut-off of the report are fixed."""
+        return self.state.get("latest_timestamp") is not None
+
+    def begin(self, latest_timestamp: datetime, total_stores: int):
+        self.state["latest_timestamp"] = latest_timestamp.isoformat()
+        self.state["total_stores"] = total_stores
+        self.save()
+
+    @property
+    def latest_timestamp(self) -> datetime:
+        return datetime.fromisoformat(self.state["latest_timestamp"])
+
+    @property
+    def total_stores(self) -> int:
+        return self.state["total_stores"]
+
+    @property
+    def parts(self) -> List[dict]:
+        return self.state["parts"]
+
+    @property
+    def stores_done(self) -> int:
+        return sum(part["rows"] for part in self.parts)
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """Last store written to a saved batch; the run resumes after it."""
+        return self.parts[-1]["last_store_id"] if self.parts else None
+
+    def record_batch(self, part_path: str, rows: int, last_store_id: str):
+        self.parts.append({"path": part_path, "rows": rows, "last_store_id": last_store_id})
+        self.save()
+
+    @property
+    def dispatched(self) -> bool:
+        """Whether the shard tasks of a celery-executed report were already sent."""
+        return self.state["dispatched"]
+
+    def mark_dispatched(self):
+        self.state["dispatched"] = True
+        self.save()
+
+    @property
+    def result(self) -> Optional[dict]:
+        """Summary of the merged report, once written."""
+        return self.state.get("result")
+
+    def complete(self, result: dict):
+        """Keep the merged report's summary and drop the batches merged into it."""
+        for part in self.parts:
+            if os.path.exists(part["path"]):
+                os.remove(part["path"])
+        self.state["result"] = result
+        self.save()
@@ -0,0 +1,201 @@
+# app/services/report_events.py
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from sqlalchemy import select
+from app.db.database import AsyncSessionLocal
+from app.models.report import Report
+from app.settings import settings
+from typing import AsyncIterator, Dict, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPORT_EVENTS_CHANNEL = "store_monitor:report_events"
+TERMINAL_STATUSES = ("Complete", "Failed")
+IN_CLAUSE_CHUNK = 500
+# Comment line that keeps idle SSE connections open through proxies
+SSE_KEEPALIVE_SECONDS = 15
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def report_event(report: Report) -> dict:
+    """Status and progress of a report as sent to waiting clients."""
+    return {
+        "report_id": report.id,
+        "status": report.status,
+        "progress": report.progress,
+        "stores_done": report.stores_done,
+        "total_stores": report.total_stores,
+        "eta_seconds": report.eta_seconds,
+        "error": report.error,
+    }
+
+
+def publish_report_event(event: dict):
+    """Announce a committed status or progress change of a report (see report_event).
+
+    Goes to the Redis channel the API processes listen on, and straight to
+    this process' notifier when it serves requests too. Never raises: a
+    lost event only delays waiting clients until the database check.
+    """
+    global _publisher
+    report_notifier.notify_threadsafe(event)
+    try:
+        with _publisher_lock:
+            if _publisher is None:
+                import redis
+
+                _publisher = redis.Redis.from_url(settings.REPORT_EVENTS_URL, socket_timeout=1, socket_connect_timeout=1)
+        _publisher.publish(REPORT_EVENTS_CHANNEL, json.dumps(event))
+    except Exception as e:
+        logger.warning(f"Error publishing event of report {event['report_id']}: {str(e)}")
+
+
+def format_sse(event: dict) -> str:
+    return f"event: status\ndata: {json.dumps(event)}\n\n"
+
+
+class ReportNotifier:
+    """Wakes API requests waiting on reports, without per-request database reads.
+
+    Each waiting request holds an asyncio.Queue. A single Redis pub/sub
+    subscription per process feeds them the events workers publish, and a
+    single batched query every fallback_seconds catches reports that
+    finished while an event was lost (e.g. Redis down). Both start with
+    the first waiting request; however many wait, a waiter costs a queue.
+    """
+
+    def __init__(self, url: str, fallback_seconds: float):
+        self.url = url
+        self.fallback_seconds = fallback_seconds
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = []
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def _ensure_started(self):
+        if self._tasks and not any(task.done() for task in self._tasks):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [self._loop.create_task(self._listen()), self._loop.create_task(self._check_database())]
+
+    def subscribe(self, report_id: str) -> asyncio.Queue:
+        """Register a waiter before reading the report, so no event falls in between."""
+        self._ensure_started()
+        queue = asyncio.Queue()
+        self._subscribers[report_id].add(queue)
+        return queue
+
+    def unsubscribe(self, report_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(report_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[report_id]
+
+    def dispatch(self, event: dict):
+        for queue in self._subscribers.get(event.get("report_id"), ()):
+            queue.put_nowait(event)
+
+    def notify_threadsafe(self, event: dict):
+        """Dispatch from any thread of this process; a no-op until a request waited here."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.dispatch, event)
+
+    async def wait(self, queue: asyncio.Queue, timeout: float) -> Optional[dict]:
+        """The event that moved the report to Complete or Failed, or None after the timeout."""
+        deadline = self._loop.time() + timeout
+        while True:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                event = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if event["status"] in TERMINAL_STATUSES:
+                return event
+
+    async def stream(self, report_id: str, queue: asyncio.Queue, first: dict) -> AsyncIterator[str]:
+        """Server-sent events of a report, from its current state until it completes or fails."""
+        try:
+            yield format_sse(first)
+            if first["status"] in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            self.unsubscribe(report_id, queue)
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        backoff = 1.0
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(REPORT_EVENTS_CHANNEL)
+                    backoff = 1.0
+                    async for message in pubsub.listen():
+                        try:
+                            self.dispatch(json.loads(message["data"]))
+                        except (TypeError, ValueError):
+                            logger.warning(f"Ignoring malformed report event: {message['data']!r}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Waiters still finish through the database check meanwhile
+                logger.warning(f"Report event subscription lost, retrying in {backoff:.0f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                await client.aclose()
+
+    async def _check_database(self):
+        """One query for all waited-on reports that already finished."""
+        while True:
+            await asyncio.sleep(self.fallback_seconds)
+            report_ids = list(self._subscribers)
+            if not report_ids:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    for chunk_start in range(0, len(report_ids), IN_CLAUSE_CHUNK):
+                        finished = await db.scalars(select(Report).where(
+                            Report.id.in_(report_ids[chunk_start:chunk_start + IN_CLAUSE_CHUNK]),
+                            Report.status.in_(TERMINAL_STATUSES)
+                        ))
+                        for report in finished:
+                            self.dispatch(report_event(report))
+            except Exception as e:
+                logger.warning(f"Error checking waited-on reports: {str(e)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        self._loop = None
+
+
+report_notifier = ReportNotifier(url=settings.REPORT_EVENTS_URL, fallback_seconds=settings.REPORT_WAIT_CHECK_SECONDS)
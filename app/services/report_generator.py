@@ -1,15 +1,23 @@
 # app/services/report_generator.py
 
-import pandas as pd
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import ReadSessionLocal, get_db, uses_read_replica
 from app.models.store import StoreStatus, StoreStatusEnum
-from app.models.timezone import StoreTimezone
-from app.models.hours import BusinessHour
+from app.services.business_hours import to_epoch
+from app.services.instrumentation import count_rows, phase
+from app.services.metadata_cache import metadata_cache
+from app.services.report_checkpoint import ReportCheckpoint
+from app.services.report_writer import ReportWriter
+from app.services.uptime_engine import compute_report_rows, compute_report_batches
+from app.services.status_intervals import compute_interval_rows
+from app.services.store_directory import discover_observed_stores, store_directory_complete
+from app.services.uptime_rollup import compute_rollup_rows
+from app.services.uptime_sql import check_sql_dialect, compute_sql_rows
+from app.settings import settings
 import pytz
-import os
-from typing import List, Tuple, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,50 +25,20 @@ logger = logging.getLogger(__name__)
 
 def get_store_timezone(db: Session, store_id: str) -> str:
     """Get store's timezone or default to America/Chicago."""
-    timezone = db.query(StoreTimezone).filter(StoreTimezone.store_id == store_id).first()
-    return timezone.timezone_str if timezone else "America/Chicago"
+    return metadata_cache.get(db, store_id).timezone_str or "America/Chicago"
 
 
 def get_business_hours(db: Session, store_id: str) -> list:
     """Get store's business hours."""
-    return db.query(BusinessHour).filter(BusinessHour.store_id == store_id).all()
-
-
-def parse_time(time_str: str) -> time:
-    """Parse time string to time object."""
-    try:
-        return datetime.strptime(time_str, "%H:%M:%S").time()
-    except ValueError:
-        logger.warning(f"Invalid time format: {time_str}")
-        return time(0, 0, 0)
-
-
-def is_within_business_hours(timestamp: datetime, business_hours: list) -> bool:
-    """Check if timestamp is within business hours."""
-    if not business_hours:
-        return True  # If no business hours defined, consider store always open
-    
-    weekday = timestamp.weekday()
-    for hours in business_hours:
-        if hours.dayOfWeek == weekday:
-            start_time = parse_time(hours.start_time_local)
-            end_time = parse_time(hours.end_time_local)
-            current_time = timestamp.time()
-            
-            if start_time <= current_time <= end_time:
-                return True
-    return False
+    return list(metadata_cache.get(db, store_id).business_hours)
 
 
 def calculate_uptime_downtime(db: Session, store_id: str, start_time: datetime, end_time: datetime) -> Tuple[float, float]:
     """Calculate uptime and downtime for a store within a time period."""
     try:
-        # Get store's timezone
-        timezone_record = db.query(StoreTimezone).filter(StoreTimezone.store_id == store_id).first()
-        timezone = timezone_record.timezone_str if timezone_record else "UTC"
-        
-        # Get business hours
-        business_hours = db.query(BusinessHour).filter(BusinessHour.store_id == store_id).all()
+        # Get store's timezone and business hours
+        metadata = metadata_cache.get(db, store_id)
+        timezone = metadata.timezone_str or "UTC"
         
         # Get all status observations for the store in the time period
         status_observations = db.query(StoreStatus).\
@@ -79,45 +57,27 @@ def calculate_uptime_downtime(db: Session, store_id: str, start_time: datetime,
         total_uptime = 0
         total_downtime = 0
         
-        # Pre-calculate timezone conversion
-        tz = pytz.timezone(timezone)
-        
-        # Calculate time differences between consecutive observations
-        for i in range(len(status_observations) - 1):
-            current = status_observations[i]
-            next_obs = status_observations[i + 1]
-            
-            # Convert timestamps to store's local timezone
-            current_time = current.timestamp_utc.astimezone(tz)
-            next_time = next_obs.timestamp_utc.astimezone(tz)
-            
-            # Calculate time difference in seconds
-            time_diff = (next_time - current_time).total_seconds()
-            
-            # Check if the time period is within business hours
-            if is_within_business_hours(current_time, business_hours):
-                if current.status == StoreStatusEnum.active:
-                    total_uptime += time_diff
-                elif current.status == StoreStatusEnum.inactive:
-                    total_downtime += time_diff
-                else:
-                    logger.warning(f"Unknown status value: {current.status} for store {store_id}")
-        
-        # Handle the last observation
-        last_obs = status_observations[-1]
-        last_time = last_obs.timestamp_utc.astimezone(tz)
-        end_time_local = end_time.astimezone(tz)
-        
-        if last_time < end_time_local:
-            final_diff = (end_time_local - last_time).total_seconds()
-            if is_within_business_hours(last_time, business_hours):
-                if last_obs.status == StoreStatusEnum.active:
-                    total_uptime += final_diff
-                elif last_obs.status == StoreStatusEnum.inactive:
-                    total_downtime += final_diff
+        # Validate the timezone and project business hours onto the UTC window
+        pytz.timezone(timezone)
+        hours_index = metadata.hours_index
+        
+        # Open seconds before every observation and before the end of the period
+        boundaries = [to_epoch(obs.timestamp_utc) for obs in status_observations]
+        boundaries.append(max(to_epoch(end_time), boundaries[-1]))
+        open_before = hours_index.open_seconds(timezone, start_time, end_time, boundaries)
+        
+        # Each observation holds until the next one, the last one until the end of the period
+        for i, current in enumerate(status_observations):
+            open_time = open_before[i + 1] - open_before[i]
+            if current.status == StoreStatusEnum.active:
+                total_uptime += open_time
+            elif current.status == StoreStatusEnum.inactive:
+                total_downtime += open_time
+            else:
+                logger.warning(f"Unknown status value: {current.status} for store {store_id}")
         
         # Convert seconds to hours
-        return total_uptime / 3600, total_downtime / 3600
+        return float(total_uptime) / 3600, float(total_downtime) / 3600
         
     except Exception as e:
         logger.error(f"Error calculating uptime/downtime for store {store_id}: {str(e)}")
@@ -125,89 +85,306 @@ def calculate_uptime_downtime(db: Session, store_id: str, start_time: datetime,
         return 0.0, 0.0
 
 
-def generate_report(db: Session) -> dict:
-    """Generate a report for all stores."""
+def generate_report_per_store(db: Session, store_ids: List[str], latest_timestamp: datetime) -> List[dict]:
+    """Calculate report rows store by store (fallback for the vectorized engine)."""
+    one_hour_ago = latest_timestamp - timedelta(hours=1)
+    one_day_ago = latest_timestamp - timedelta(days=1)
+    one_week_ago = latest_timestamp - timedelta(weeks=1)
+    
+    # Process stores in batches
+    BATCH_SIZE = 50
+    report_data = []
+    total_stores = len(store_ids)
+    
+    for batch_start in range(0, total_stores, BATCH_SIZE):
+        batch_end = min(batch_start + BATCH_SIZE, total_stores)
+        batch_stores = store_ids[batch_start:batch_end]
+        
+        logger.info(f"Processing batch {batch_start//BATCH_SIZE + 1}/{(total_stores + BATCH_SIZE - 1)//BATCH_SIZE}")
+        
+        for store_id in batch_stores:
+            try:
+                # Calculate uptime/downtime for different time periods
+                last_hour = calculate_uptime_downtime(db, store_id, one_hour_ago, latest_timestamp)
+                last_day = calculate_uptime_downtime(db, store_id, one_day_ago, latest_timestamp)
+                last_week = calculate_uptime_downtime(db, store_id, one_week_ago, latest_timestamp)
+                
+                store_report = {
+                    "store_id": store_id,
+                    "uptime_last_hour": round(last_hour[0], 2),
+                    "uptime_last_day": round(last_day[0], 2),
+                    "uptime_last_week": round(last_week[0], 2),
+                    "downtime_last_hour": round(last_hour[1], 2),
+                    "downtime_last_day": round(last_day[1], 2),
+                    "downtime_last_week": round(last_week[1], 2)
+                }
+                report_data.append(store_report)
+                
+            except Exception as e:
+                logger.error(f"Error processing store {store_id}: {str(e)}")
+                continue
+    
+    return report_data
+
+
+def discover_stores(db: Session) -> Tuple[List[str], Optional[datetime]]:
+    """Return the sorted store IDs and the latest observation timestamp."""
+    # The stores dimension answers both from one row per store, once it covers every observation
+    if store_directory_complete(db):
+        return discover_observed_stores(db)
+
+    if db.query(StoreStatus.id).first() is None:
+        return [], None
+    logger.warning("stores table is not backfilled, scanning store_status; run app.services.store_directory")
+
+    # Get all unique store IDs in the database's store_id order with a single optimized query
+    store_ids = [
+        str(store[0])
+        for store in db.query(StoreStatus.store_id).distinct().order_by(StoreStatus.store_id).all()
+    ]
+    
+    # Get the latest timestamp with an optimized query
+    latest_timestamp = db.query(StoreStatus.timestamp_utc).\
+        order_by(StoreStatus.timestamp_utc.desc()).\
+        first()[0]
+    
+    return store_ids, latest_timestamp
+
+
+def check_report_engine(dialect: str):
+    """Reject a REPORT_ENGINE the database cannot run, instead of falling back per store."""
+    if settings.REPORT_ENGINE == "sql":
+        check_sql_dialect(dialect)
+
+
+def compute_store_rows(db: Session, store_ids: List[str], latest_timestamp: datetime,
+                       filter_stores: bool = False) -> List[dict]:
+    """Compute report rows for the given stores with the configured engine."""
+    check_report_engine(db.get_bind().dialect.name)
+    if settings.REPORT_ENGINE == "rollup":
+        try:
+            return compute_rollup_rows(db, store_ids, latest_timestamp)
+        except Exception as e:
+            logger.error(f"Rollup engine failed, falling back to per-store calculation: {str(e)}")
+            db.rollback()
+    elif settings.REPORT_ENGINE == "intervals":
+        try:
+            return compute_interval_rows(db, store_ids, latest_timestamp, filter_stores=filter_stores)
+        except Exception as e:
+            logger.error(f"Interval engine failed, falling back to per-store calculation: {str(e)}")
+            db.rollback()
+    elif settings.REPORT_ENGINE == "vectorized":
+        try:
+            return compute_report_rows(db, store_ids, latest_timestamp, filter_stores=filter_stores)
+        except Exception as e:
+            logger.error(f"Vectorized engine failed, falling back to per-store calculation: {str(e)}")
+            db.rollback()
+    elif settings.REPORT_ENGINE == "sql":
+        try:
+            return compute_sql_rows(db, store_ids, latest_timestamp)
+        except Exception as e:
+            logger.error(f"SQL engine failed, falling back to per-store calculation: {str(e)}")
+            db.rollback()
+    
+    return generate_report_per_store(db, store_ids, latest_timestamp)
+
+
+def split_shards(store_ids: List[str], shard_size: int) -> List[List[str]]:
+    """Split the store list into consecutive shards."""
+    return [store_ids[i:i + shard_size] for i in range(0, len(store_ids), shard_size)]
+
+
+def _init_shard_process():
+    """Drop pooled connections inherited from the parent process."""
+    from app.db.database import engine, read_engine
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+
+
+def compute_shard(store_ids: List[str], latest_timestamp: datetime, read_replica: bool = False) -> List[dict]:
+    """Compute one shard of the report in its own database session, retrying once on the primary."""
+    for attempt in range(2):
+        db = ReadSessionLocal() if read_replica and not attempt else next(get_db())
+        try:
+            return compute_store_rows(db, store_ids, latest_timestamp, filter_stores=True)
+        except Exception as e:
+            if attempt:
+                raise
+            logger.error(f"Shard of {len(store_ids)} stores failed, retrying: {str(e)}")
+        finally:
+            db.close()
+
+
+def generate_report_parallel(store_ids: List[str], latest_timestamp: datetime,
+                             shard_size: int, workers: Optional[int] = None,
+                             read_replica: bool = False) -> Iterator[List[dict]]:
+    """Compute report rows with a local process pool, yielding shards in store order."""
+    shards = split_shards(store_ids, shard_size)
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_process) as executor:
+        results = executor.map(
+            compute_shard, shards, [latest_timestamp] * len(shards), [read_replica] * len(shards)
+        )
+        for done, rows in enumerate(results, start=1):
+            logger.info(f"Processed shard {done}/{len(shards)}")
+            yield rows
+
+
+def generate_report_serial(db: Session, store_ids: List[str], latest_timestamp: datetime,
+                           shard_size: int) -> Iterator[List[dict]]:
+    """Compute report rows shard by shard in the current session."""
+    if settings.REPORT_ENGINE == "vectorized" and settings.REPORT_SCAN == "stream":
+        # One ordered scan over all stores, batched by the scan chunks
+        for done, rows in enumerate(compute_report_batches(db, store_ids, latest_timestamp), start=1):
+            logger.info(f"Processed batch {done} ({len(rows)} stores)")
+            yield rows
+        return
+    
+    shards = split_shards(store_ids, shard_size)
+    for done, shard in enumerate(shards, start=1):
+        rows = compute_store_rows(db, shard, latest_timestamp, filter_stores=len(shards) > 1)
+        logger.info(f"Processed batch {done}/{len(shards)}")
+        yield rows
+
+
+def generate_report(db: Session, parallel: bool = False,
+                    on_progress: Optional[Callable[[int, int], None]] = None,
+                    checkpoint: Optional[ReportCheckpoint] = None) -> dict:
+    """Generate a report for all stores, writing rows to the CSV as each batch finishes.
+
+    on_progress(stores_done, total_stores) is called after each written batch.
+    With a checkpoint the run is resumable instead (see generate_report_checkpointed).
+    """
+    if checkpoint is not None:
+        return generate_report_checkpointed(db, checkpoint, parallel, on_progress)
+
+    writer = None
     try:
-        # Get all unique store IDs with a single optimized query
-        store_ids = [str(store[0]) for store in db.query(StoreStatus.store_id).distinct().all()]
+        with phase("discovery"):
+            store_ids, latest_timestamp = discover_stores(db)
         
         if not store_ids:
             logger.warning("No stores found in the database")
             return None
         
-        # Get the latest timestamp with an optimized query
-        latest_timestamp = db.query(StoreStatus.timestamp_utc).\
-            order_by(StoreStatus.timestamp_utc.desc()).\
-            first()[0]
-        
-        one_hour_ago = latest_timestamp - timedelta(hours=1)
-        one_day_ago = latest_timestamp - timedelta(days=1)
-        one_week_ago = latest_timestamp - timedelta(weeks=1)
-        
-        # Process stores in batches
-        BATCH_SIZE = 50
-        report_data = []
         total_stores = len(store_ids)
         
         logger.info(f"Starting report generation for {total_stores} stores...")
         
-        for batch_start in range(0, total_stores, BATCH_SIZE):
-            batch_end = min(batch_start + BATCH_SIZE, total_stores)
-            batch_stores = store_ids[batch_start:batch_end]
-            
-            logger.info(f"Processing batch {batch_start//BATCH_SIZE + 1}/{(total_stores + BATCH_SIZE - 1)//BATCH_SIZE}")
-            
-            for store_id in batch_stores:
-                try:
-                    # Calculate uptime/downtime for different time periods
-                    last_hour = calculate_uptime_downtime(db, store_id, one_hour_ago, latest_timestamp)
-                    last_day = calculate_uptime_downtime(db, store_id, one_day_ago, latest_timestamp)
-                    last_week = calculate_uptime_downtime(db, store_id, one_week_ago, latest_timestamp)
-                    
-                    store_report = {
-                        "store_id": store_id,
-                        "uptime_last_hour": round(last_hour[0], 2),
-                        "uptime_last_day": round(last_day[0], 2),
-                        "uptime_last_week": round(last_week[0], 2),
-                        "downtime_last_hour": round(last_hour[1], 2),
-                        "downtime_last_day": round(last_day[1], 2),
-                        "downtime_last_week": round(last_week[1], 2)
-                    }
-                    report_data.append(store_report)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing store {store_id}: {str(e)}")
-                    continue
-        
-        if not report_data:
-            logger.warning("No valid report data generated")
-            return None
-        
-        # Create reports directory if it doesn't exist
-        reports_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports')
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Generate timestamp for filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"store_report_{timestamp}.csv"
-        filepath = os.path.join(reports_dir, filename)
+        if parallel:
+            batches = generate_report_parallel(
+                store_ids, latest_timestamp, settings.REPORT_SHARD_SIZE, settings.REPORT_LOCAL_WORKERS or None,
+                read_replica=uses_read_replica(db)
+            )
+        else:
+            batches = generate_report_serial(db, store_ids, latest_timestamp, settings.REPORT_SHARD_SIZE)
         
-        # Convert to DataFrame and save as CSV efficiently
-        df = pd.DataFrame(report_data)
-        df.to_csv(filepath, index=False)
+        writer = ReportWriter.create()
+        while True:
+            with phase("compute"):
+                rows = next(batches, None)
+            if rows is None:
+                break
+            with phase("write"):
+                writer.write_rows(rows)
+            count_rows("report_rows", len(rows))
+            if on_progress:
+                on_progress(len(rows), total_stores)
         
-        logger.info(f"Report saved to {filepath}")
-        logger.info(f"Successfully processed {len(report_data)} out of {total_stores} stores")
+        if not writer.rows_written:
+            logger.warning("No valid report data generated")
+            writer.abort()
+            return None
         
-        return {
-            "report_data": report_data,
-            "filename": filename,
-            "filepath": filepath,
-            "total_stores_processed": len(report_data),
-            "total_stores": total_stores
-        }
+        logger.info(f"Store metadata cache: {metadata_cache.stats()}")
+        with phase("write"):
+            return writer.close(total_stores)
         
     except Exception as e:
         logger.error(f"Error generating report: {str(e)}")
+        if writer is not None:
+            writer.abort()
         db.rollback()
-        return None
\ No newline at end of file
+        return None
+
+
+def _stores_after(store_ids: List[str], cursor: Optional[str]) -> List[str]:
+    """Stores after the checkpoint cursor, in discover_stores order."""
+    if cursor is None:
+        return store_ids
+    try:
+        return store_ids[store_ids.index(cursor) + 1:]
+    except ValueError:
+        logger.warning(f"Checkpoint store {cursor} no longer exists, resuming by store_id comparison")
+        return [store_id for store_id in store_ids if store_id > cursor]
+
+
+def generate_report_checkpointed(db: Session, checkpoint: ReportCheckpoint, parallel: bool = False,
+                                 on_progress: Optional[Callable[[int, int], None]] = None) -> Optional[dict]:
+    """Generate a report through per-batch partial files recorded in a checkpoint.
+
+    A rerun with the same checkpoint keeps the cut-off of the first attempt
+    and only computes the stores after the last saved batch. Errors
+    propagate with the saved batches kept, so the caller can retry.
+    """
+    if checkpoint.result is not None:
+        return checkpoint.result
+    
+    with phase("discovery"):
+        store_ids, latest_timestamp = discover_stores(db)
+    if not checkpoint.started:
+        if not store_ids:
+            logger.warning("No stores found in the database")
+            return None
+        checkpoint.begin(latest_timestamp, len(store_ids))
+    else:
+        store_ids = _stores_after(store_ids, checkpoint.cursor)
+        logger.info(f"Resuming report {checkpoint.report_id} after {checkpoint.stores_done} "
+                    f"of {checkpoint.total_stores} stores")
+    latest_timestamp, total_stores = checkpoint.latest_timestamp, checkpoint.total_stores
+    if on_progress and checkpoint.stores_done:
+        on_progress(checkpoint.stores_done, total_stores)
+    
+    if parallel:
+        batches = generate_report_parallel(
+            store_ids, latest_timestamp, settings.REPORT_SHARD_SIZE, settings.REPORT_LOCAL_WORKERS or None,
+            read_replica=uses_read_replica(db)
+        )
+    else:
+        batches = generate_report_serial(db, store_ids, latest_timestamp, settings.REPORT_SHARD_SIZE)
+    
+    while True:
+        with phase("compute"):
+            rows = next(batches, None)
+        if rows is None:
+            break
+        if rows:
+            with phase("write"):
+                part = ReportWriter.for_part(checkpoint.report_id, len(checkpoint.parts))
+                try:
+                    part.write_rows(rows)
+                    summary = part.close(len(rows))
+                except Exception:
+                    part.abort()
+                    raise
+                checkpoint.record_batch(summary["filepath"], len(rows), rows[-1]["store_id"])
+        count_rows("report_rows", len(rows))
+        if on_progress:
+            on_progress(len(rows), total_stores)
+    
+    if not checkpoint.stores_done:
+        logger.warning("No valid report data generated")
+        return None
+    
+    logger.info(f"Store metadata cache: {metadata_cache.stats()}")
+    with phase("write"):
+        writer = ReportWriter.create()
+        try:
+            for part in checkpoint.parts:
+                writer.append_part(part["path"], part["rows"])
+            result = writer.close(total_stores)
+        except Exception:
+            writer.abort()
+            raise
+        checkpoint.complete(result)
+    return result
@@ -0,0 +1,137 @@
+# app/services/report_profiler.py
+
+import cProfile
+import io
+import linecache
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from app.services.report_writer import REPORTS_DIR
+from app.settings import settings
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Functions and allocation sites listed in the text summaries
+PROFILE_TOP = 40
+# Allocations of the profiler itself are not what a slow report is about
+IGNORED_ALLOCATIONS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+def profile_dir(report_id: str) -> str:
+    """Directory of a report's profiling artifacts, kept after the report completes."""
+    return os.path.join(REPORTS_DIR, f"profile_{report_id}")
+
+
+def write_stats(stats: pstats.Stats, path: str):
+    """Save pstats as a loadable .prof file and a text summary by cumulative time."""
+    stats.dump_stats(path)
+    summary = io.StringIO()
+    stats.stream = summary
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    with open(path.removesuffix(".prof") + ".txt", "w") as text:
+        text.write(summary.getvalue())
+
+
+class ReportProfiler:
+    """cProfile and tracemalloc around one report run or shard.
+
+    A sampler thread takes a tracemalloc snapshot whenever traced memory
+    reaches a new high, so the saved allocation sites are the ones live at
+    the peak rather than at the end of the run. Only the calling thread is
+    profiled; peak memory covers allocations traced by tracemalloc (Python
+    objects and numpy buffers).
+    """
+
+    def __init__(self, report_id: str, name: str, sample_seconds: Optional[float] = None):
+        self.report_id = report_id
+        self.name = name
+        self.sample_seconds = sample_seconds or settings.REPORT_PROFILE_SAMPLE_SECONDS
+        self.path = os.path.join(profile_dir(report_id), f"{name}.prof")
+        self.cpu_seconds: Optional[float] = None
+        self.peak_bytes = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._sampled_bytes = -1
+
+    def _sample(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self._sampled_bytes:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._sampled_bytes = current
+
+    def _run_sampler(self, stop: threading.Event):
+        while not stop.wait(self.sample_seconds):
+            self._sample()
+
+    @contextmanager
+    def run(self):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._run_sampler, args=(stop,), name="report-profile-sampler", daemon=True)
+        profiler = cProfile.Profile()
+
+        sampler.start()
+        cpu_started = time.process_time()
+        profiler.enable()
+        try:
+            yield self
+        finally:
+            profiler.disable()
+            self.cpu_seconds = time.process_time() - cpu_started
+            stop.set()
+            sampler.join()
+            self._sample()
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if not was_tracing:
+                tracemalloc.stop()
+            try:
+                self._save(profiler)
+            except Exception as e:
+                # A profile is a diagnostic, it never fails the report
+                logger.error(f"Error saving profile {self.name} of report {self.report_id}: {str(e)}")
+
+    def _save(self, profiler: cProfile.Profile):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_stats(pstats.Stats(profiler), self.path)
+        if self._snapshot is None:
+            return
+        lines = [f"Top allocation sites at the sampled peak of {self._sampled_bytes / 2 ** 20:.1f} MB traced"]
+        for stat in self._snapshot.filter_traces(IGNORED_ALLOCATIONS).statistics("lineno")[:PROFILE_TOP]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 2 ** 20:10.2f} MB {stat.count:>10} blocks  {frame.filename}:{frame.lineno}")
+            lines.append(f"{'':35}{linecache.getline(frame.filename, frame.lineno).strip()}")
+        with open(self.path.removesuffix(".prof") + "-allocations.txt", "w") as allocations:
+            allocations.write("\n".join(lines) + "\n")
+        logger.info(f"Saved profile {self.name} of report {self.report_id} to {os.path.dirname(self.path)}")
+
+    def summary(self) -> dict:
+        return {
+            "cpu_seconds": round(self.cpu_seconds or 0.0, 3),
+            "peak_memory_mb": round(self.peak_bytes / 2 ** 20, 2),
+            "profile": self.path,
+        }
+
+
+def combine_profiles(report_id: str, summaries: List[dict]) -> dict:
+    """Merge the profiles of a report's shards into one; CPU time adds up, peak memory is the largest."""
+    combined_path = os.path.join(profile_dir(report_id), "report.prof")
+    paths = [summary["profile"] for summary in summaries if os.path.exists(summary["profile"])]
+    if paths:
+        write_stats(pstats.Stats(*paths), combined_path)
+    return {
+        "cpu_seconds": round(sum(summary["cpu_seconds"] for summary in summaries), 3),
+        "peak_memory_mb": max(summary["peak_memory_mb"] for summary in summaries),
+        "profile": combined_path if paths else None,
+        "shards": len(summaries),
+    }
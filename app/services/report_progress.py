@@ -0,0 +1,71 @@
+# app/services/report_progress.py
+
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import update
+from app.db.database import get_db
+from app.models.report import Report
+from app.services.report_events import publish_report_event, report_event
+from app.services.business_hours import as_utc
+from app.services.instrumentation import phase
+from app.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def record_progress(report_id: str, stores_done: int, total_stores: Optional[int] = None):
+    """Add finished stores to a report and refresh its progress percentage and ETA.
+
+    Uses its own session. The increment is a single UPDATE, like
+    bump_ingest_version, so concurrent shards never lose counts; the row is
+    read back under the write lock the UPDATE took.
+    """
+    values = {"stores_done": Report.stores_done + stores_done}
+    if total_stores is not None:
+        values["total_stores"] = total_stores
+    with phase("progress"):
+        db = next(get_db())
+        try:
+            updated = db.execute(update(Report).where(Report.id == report_id).values(**values))
+            if not updated.rowcount:
+                return
+            report = db.get(Report, report_id)
+            
+            if report.total_stores:
+                done = min(report.stores_done, report.total_stores)
+                report.progress = round(100.0 * done / report.total_stores, 1)
+                if report.started_at and done:
+                    elapsed = (datetime.now(timezone.utc) - as_utc(report.started_at)).total_seconds()
+                    report.eta_seconds = round(elapsed / done * (report.total_stores - done), 1)
+            # Read before the commit expires the row
+            event = report_event(report)
+            db.commit()
+            publish_report_event(event)
+        except Exception as e:
+            # Progress is informational, never fail the report over it
+            logger.warning(f"Error recording progress of report {report_id}: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+
+
+class ProgressReporter:
+    """on_progress callback for generate_report that writes to the report row at most every interval."""
+
+    def __init__(self, report_id: str, interval: Optional[float] = None):
+        self.report_id = report_id
+        self.interval = settings.REPORT_PROGRESS_INTERVAL_SECONDS if interval is None else interval
+        self.pending = 0
+        self.done = 0
+        self._last_write = 0.0
+
+    def __call__(self, stores_done: int, total_stores: int):
+        self.pending += stores_done
+        self.done += stores_done
+        now = time.monotonic()
+        if now - self._last_write >= self.interval or self.done >= total_stores:
+            record_progress(self.report_id, self.pending, total_stores)
+            self.pending = 0
+            self._last_write = now
@@ -0,0 +1,24 @@
+# app/services/report_schema.py
+
+from datetime import timedelta
+
+# Kept free of numpy/pandas so the API can import the report layout cheaply
+
+DEFAULT_TIMEZONE = "UTC"
+
+# Report windows, ordered from the shortest to the longest
+REPORT_WINDOWS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+REPORT_COLUMNS = [
+    "store_id",
+    "uptime_last_hour",
+    "uptime_last_day",
+    "uptime_last_week",
+    "downtime_last_hour",
+    "downtime_last_day",
+    "downtime_last_week",
+]
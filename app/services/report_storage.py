@@ -0,0 +1,105 @@
+# app/services/report_storage.py
+
+import os
+import bisect
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from app.services.report_schema import REPORT_COLUMNS
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPORT_SCHEMA = pa.schema(
+    [pa.field("store_id", pa.string())] + [pa.field(column, pa.float64()) for column in REPORT_COLUMNS[1:]]
+)
+
+
+class ParquetReportSink:
+    """Write report rows to a zstd-compressed Parquet file, one row group per batch.
+
+    Batches arrive in store_id order, so each row group covers a contiguous
+    store_id range and its min/max statistics act as a sparse index.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._tmp_path = f"{filepath}.tmp"
+        self._writer = pq.ParquetWriter(self._tmp_path, REPORT_SCHEMA, compression="zstd")
+
+    def write_rows(self, rows: List[dict]):
+        if rows:
+            self._writer.write_table(pa.Table.from_pylist(rows, schema=REPORT_SCHEMA))
+
+    def write_csv_part(self, part_path: str):
+        """Append a header-less partial report CSV."""
+        table = pa_csv.read_csv(
+            part_path,
+            read_options=pa_csv.ReadOptions(column_names=REPORT_COLUMNS),
+            convert_options=pa_csv.ConvertOptions(column_types=REPORT_SCHEMA)
+        )
+        if table.num_rows:
+            self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+        os.replace(self._tmp_path, self.filepath)
+
+    def abort(self):
+        self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def _row_group_ranges(parquet_file: pq.ParquetFile) -> List[Tuple[int, str, str]]:
+    """Return (index, min store_id, max store_id) for each row group; None when unknown."""
+    column = parquet_file.schema_arrow.get_field_index("store_id")
+    ranges = []
+    for index in range(parquet_file.metadata.num_row_groups):
+        statistics = parquet_file.metadata.row_group(index).column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            ranges.append((index, None, None))
+        else:
+            ranges.append((index, statistics.min, statistics.max))
+    return ranges
+
+
+def query_report(filepath: str, store_ids: Optional[Iterable[str]] = None,
+                 columns: Optional[List[str]] = None, cursor: Optional[str] = None,
+                 limit: int = 100) -> dict:
+    """Read a page of report rows, filtered by store_id, projected to the given columns.
+
+    Only the row groups whose store_id range can match are read. The cursor is
+    the last store_id of the previous page.
+    """
+    parquet_file = pq.ParquetFile(filepath)
+    wanted = sorted(set(store_ids)) if store_ids else None
+    projection = ["store_id"] + [column for column in (columns or REPORT_COLUMNS[1:]) if column != "store_id"]
+
+    rows = []
+    for index, low, high in _row_group_ranges(parquet_file):
+        if cursor is not None and high is not None and high <= cursor:
+            continue
+        if wanted is not None and low is not None:
+            position = bisect.bisect_left(wanted, low)
+            if position == len(wanted) or wanted[position] > high:
+                continue
+
+        table = parquet_file.read_row_group(index, columns=projection)
+        mask = None
+        if cursor is not None:
+            mask = pc.greater(table["store_id"], cursor)
+        if wanted is not None:
+            in_set = pc.is_in(table["store_id"], value_set=pa.array(wanted, pa.string()))
+            mask = in_set if mask is None else pc.and_(mask, in_set)
+        if mask is not None:
+            table = table.filter(mask)
+
+        rows.extend(table.slice(0, limit + 1 - len(rows)).to_pylist())
+        if len(rows) > limit:
+            break
+
+    next_cursor = rows[limit - 1]["store_id"] if len(rows) > limit else None
+    return {"rows": rows[:limit], "next_cursor": next_cursor}
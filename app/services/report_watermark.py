@@ -0,0 +1,99 @@
+# app/services/report_watermark.py
+
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.ingest import IngestVersion
+from app.models.report import Report
+from app.models.store import Store, StoreStatus
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ingested data a report depends on: observations, business hours and timezones
+INGEST_VERSION_SOURCE = "store_data"
+# Present once the stores dimension covers every observation: created empty, or backfilled
+STORE_DIRECTORY_SOURCE = "store_directory"
+
+
+def store_directory_marker():
+    """Query of the row recording that the stores dimension is complete."""
+    return select(IngestVersion.version).where(IngestVersion.source == STORE_DIRECTORY_SOURCE)
+
+
+def mark_store_directory_complete(db: Session):
+    """Record that the stores dimension covers every observation (caller commits)."""
+    if db.scalar(store_directory_marker()) is None:
+        db.add(IngestVersion(source=STORE_DIRECTORY_SOURCE, version=1))
+        db.flush()
+
+
+def init_store_directory(db: Session):
+    """Mark the stores dimension complete while there are no observations yet; ingest keeps it so."""
+    if db.scalar(store_directory_marker()) is None and db.scalar(select(StoreStatus.id).limit(1)) is None:
+        mark_store_directory_complete(db)
+        db.commit()
+
+
+def bump_ingest_version(db: Session) -> int:
+    """Record that report inputs changed and return the new version; runs inside the caller's transaction.
+
+    The bumped row stays locked until the caller commits, so versions commit in order.
+    """
+    bumped = db.execute(
+        update(IngestVersion).
+        where(IngestVersion.source == INGEST_VERSION_SOURCE).
+        values(version=IngestVersion.version + 1)
+    )
+    if not bumped.rowcount:
+        db.add(IngestVersion(source=INGEST_VERSION_SOURCE, version=1))
+        db.flush()
+    return ingest_version(db)
+
+
+def ingest_version(db: Session) -> int:
+    """Current ingest version of a database, read synchronously."""
+    return db.scalar(
+        select(IngestVersion.version).where(IngestVersion.source == INGEST_VERSION_SOURCE)
+    ) or 0
+
+
+def watermark_key(latest_timestamp: Optional[datetime], ingest_version: Optional[int]) -> str:
+    """Key identifying the data a report is built from."""
+    # Deferred: business_hours pulls in numpy, which the API does not need to boot
+    from app.services.business_hours import as_utc
+
+    latest = as_utc(latest_timestamp).isoformat() if latest_timestamp else "none"
+    return f"{latest}|v{ingest_version or 0}"
+
+
+async def latest_observation_time(db: AsyncSession) -> Optional[datetime]:
+    """Latest observation time from the stores dimension, or from store_status before the backfill."""
+    if await db.scalar(store_directory_marker()) is not None:
+        return await db.scalar(select(func.max(Store.last_seen_utc)))
+    return await db.scalar(select(func.max(StoreStatus.timestamp_utc)))
+
+
+def data_watermark(db: Session) -> Tuple[Optional[datetime], int]:
+    """Latest observation time and ingest version of a database, read synchronously."""
+    if db.scalar(store_directory_marker()) is not None:
+        latest = db.scalar(select(func.max(Store.last_seen_utc)))
+    else:
+        latest = db.scalar(select(func.max(StoreStatus.timestamp_utc)))
+    return latest, ingest_version(db)
+
+
+async def current_watermark(db: AsyncSession) -> str:
+    """Watermark of the data currently in the database."""
+    latest_timestamp = await latest_observation_time(db)
+    ingest_version = await db.scalar(
+        select(IngestVersion.version).where(IngestVersion.source == INGEST_VERSION_SOURCE)
+    )
+    return watermark_key(latest_timestamp, ingest_version)
+
+
+async def find_report_for_watermark(db: AsyncSession, key: str) -> Optional[Report]:
+    """Pending, running or completed report built from the given watermark."""
+    return await db.scalar(select(Report).where(Report.watermark_key == key))
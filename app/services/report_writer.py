@@ -0,0 +1,107 @@
+# app/services/report_writer.py
+
+import csv
+import gzip
+import os
+import shutil
+from datetime import datetime
+from app.services.report_storage import ParquetReportSink
+from app.services.report_schema import REPORT_COLUMNS
+from app.settings import settings
+from typing import Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports')
+
+
+def report_parts_dir(report_id: str) -> str:
+    """Directory holding the partial files of a sharded report."""
+    return os.path.join(REPORTS_DIR, report_id)
+
+
+class ReportWriter:
+    """Write report rows to a CSV file (and optionally Parquet) incrementally, as batches finish.
+
+    Rows go to a temporary file that is renamed into place on close, so a
+    half-written report is never visible under its final name.
+    """
+
+    def __init__(self, filepath: str, header: bool = True, compression: Optional[str] = None,
+                 parquet: bool = False):
+        self.filepath = filepath
+        self.compression = compression
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        self.parquet_path = f"{filepath.removesuffix('.gz').removesuffix('.csv')}.parquet" if parquet else None
+        self._parquet = ParquetReportSink(self.parquet_path) if parquet else None
+        self._tmp_path = f"{filepath}.tmp"
+        if compression == "gzip":
+            self._file = gzip.open(self._tmp_path, "wt", newline="")
+        else:
+            self._file = open(self._tmp_path, "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=REPORT_COLUMNS, lineterminator="\n")
+        if header:
+            self._writer.writeheader()
+
+    @classmethod
+    def create(cls) -> "ReportWriter":
+        """Open a new, timestamped report file in the reports directory."""
+        compression = settings.REPORT_COMPRESSION if settings.REPORT_COMPRESSION == "gzip" else None
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"store_report_{timestamp}.csv" + (".gz" if compression else "")
+        return cls(os.path.join(REPORTS_DIR, filename), compression=compression, parquet=settings.REPORT_PARQUET)
+
+    @staticmethod
+    def part_path(report_id: str, index: int) -> str:
+        """Path of the header-less partial file of one report shard or batch."""
+        return os.path.join(report_parts_dir(report_id), f"part-{index:05d}.csv")
+
+    @classmethod
+    def for_part(cls, report_id: str, index: int) -> "ReportWriter":
+        """Open the header-less partial file of one report shard or batch."""
+        return cls(cls.part_path(report_id, index), header=False)
+
+    def write_rows(self, rows: Iterable[dict]):
+        """Append a batch of report rows."""
+        rows = list(rows)
+        self._writer.writerows(rows)
+        self._file.flush()
+        if self._parquet:
+            self._parquet.write_rows(rows)
+        self.rows_written += len(rows)
+
+    def append_part(self, part_path: str, rows: int):
+        """Append the rows of a header-less partial file."""
+        with open(part_path, newline="") as part:
+            shutil.copyfileobj(part, self._file)
+        if self._parquet:
+            self._parquet.write_csv_part(part_path)
+        self.rows_written += rows
+
+    def close(self, total_stores: int) -> dict:
+        """Finish the file and return the report summary."""
+        self._file.close()
+        os.replace(self._tmp_path, self.filepath)
+        if self._parquet:
+            self._parquet.close()
+
+        logger.info(f"Report saved to {self.filepath}")
+        logger.info(f"Successfully processed {self.rows_written} out of {total_stores} stores")
+        return {
+            "filename": os.path.basename(self.filepath),
+            "filepath": self.filepath,
+            "compression": self.compression,
+            "parquet_path": self.parquet_path,
+            "total_stores_processed": self.rows_written,
+            "total_stores": total_stores
+        }
+
+    def abort(self):
+        """Discard the partially written file."""
+        self._file.close()
+        if self._parquet:
+            self._parquet.abort()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
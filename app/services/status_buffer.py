@@ -0,0 +1,229 @@
+# app/services/status_buffer.py
+
+import os
+import threading
+import time
+import pandas as pd
+from collections import deque
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.models.store import StoreStatus
+from app.services.metrics import (
+    INGEST_BATCH_SECONDS, INGEST_ROWS, STATUS_BUFFER_DEAD_LETTERED, STATUS_BUFFER_REJECTED, STATUS_BUFFER_ROWS
+)
+from app.services.status_ingest import ingest_status_frame, publish_status_frame
+from app.settings import settings
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+INGEST_SOURCE = "api"
+IN_CLAUSE_CHUNK = 500
+
+
+class BufferFull(Exception):
+    """The buffer stayed full for the whole enqueue timeout."""
+
+
+def drop_stored_ids(db: Session, frame: pd.DataFrame) -> pd.DataFrame:
+    """Drop observations whose id is repeated in the batch or already stored, e.g. a poller's retry."""
+    frame = frame.drop_duplicates("id", keep="last")
+    ids = frame["id"].tolist()
+    stored = set()
+    for chunk_start in range(0, len(ids), IN_CLAUSE_CHUNK):
+        chunk = ids[chunk_start:chunk_start + IN_CLAUSE_CHUNK]
+        stored.update(stored_id for (stored_id,) in db.query(StoreStatus.id).filter(StoreStatus.id.in_(chunk)).all())
+    return frame[~frame["id"].isin(stored)]
+
+
+class StatusWriteBuffer:
+    """In-process write-behind buffer of validated observations.
+
+    A single flusher thread writes the buffered frames through
+    ingest_status_frame in one transaction per batch, once flush_rows are
+    waiting or flush_seconds passed. put() blocks while the buffer holds
+    max_rows and raises BufferFull after the timeout. A failed write keeps
+    the batch at the front and is retried on the next flush, so a database
+    outage turns into backpressure instead of data loss. A batch the
+    database rejects max_attempts times is split in halves, and a single
+    observation that still fails goes to the dead-letter CSV, so one bad
+    row cannot stall the buffer.
+    """
+
+    def __init__(self, max_rows: int, flush_rows: int, flush_seconds: float, max_attempts: int,
+                 dead_letter_path: str):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self._frames = deque()
+        # Failed batches with their failed attempts, retried before new frames
+        self._failed = deque()
+        self._rows = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="status-write-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Flush what is buffered and stop the flusher thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._rows:
+            logger.error(f"Status buffer stopped with {self._rows} observations unwritten")
+
+    def put(self, frame: pd.DataFrame, timeout: Optional[float] = None):
+        """Queue normalized observations, waiting up to timeout seconds for room."""
+        if frame.empty:
+            return
+        timeout = settings.STATUS_BUFFER_PUT_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            # An oversized batch is accepted into an empty buffer rather than never fitting
+            while self._rows and self._rows + len(frame) > self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    STATUS_BUFFER_REJECTED.inc(len(frame))
+                    raise BufferFull(f"Status buffer full ({self._rows} observations)")
+                self._condition.wait(remaining)
+            self._frames.append(frame)
+            self._rows += len(frame)
+            STATUS_BUFFER_ROWS.set(self._rows)
+            if self._rows >= self.flush_rows:
+                self._condition.notify_all()
+        self.start()
+
+    def _take(self) -> Optional[Tuple[pd.DataFrame, int]]:
+        """Wait for a full batch or the flush interval and return the buffered observations.
+
+        A failed batch is returned first, on its own, with its failed attempts.
+        """
+        with self._condition:
+            if self._failed:
+                return self._failed.popleft()
+            deadline = time.monotonic() + self.flush_seconds
+            while self._rows < self.flush_rows and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if not self._frames:
+                return None
+            frames, taken = [], 0
+            while self._frames and taken < self.flush_rows:
+                frames.append(self._frames.popleft())
+                taken += len(frames[-1])
+            return pd.concat(frames, ignore_index=True), 0
+
+    def _release(self, rows: int):
+        with self._condition:
+            self._rows -= rows
+            STATUS_BUFFER_ROWS.set(self._rows)
+            self._condition.notify_all()
+
+    def _requeue(self, *batches: Tuple[pd.DataFrame, int]):
+        with self._condition:
+            self._failed.extendleft(reversed(batches))
+
+    def _dead_letter(self, frame: pd.DataFrame):
+        """Append observations the database keeps rejecting to the dead-letter CSV."""
+        directory = os.path.dirname(self.dead_letter_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        frame.to_csv(self.dead_letter_path, mode="a", index=False,
+                     header=not os.path.exists(self.dead_letter_path))
+        STATUS_BUFFER_DEAD_LETTERED.inc(len(frame))
+        self._release(len(frame))
+
+    def _write(self, frame: pd.DataFrame) -> int:
+        db = next(get_db())
+        try:
+            try:
+                written = ingest_status_frame(db, frame)
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                frame = drop_stored_ids(db, frame)
+                written = ingest_status_frame(db, frame)
+                db.commit()
+            publish_status_frame(frame)
+            return written
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def flush(self) -> int:
+        """Write one batch of buffered observations; returns the rows written."""
+        batch = self._take()
+        if batch is None:
+            return 0
+        frame, attempts = batch
+        started = time.monotonic()
+        try:
+            written = self._write(frame)
+        except (OperationalError, InterfaceError) as e:
+            # The database is unreachable, not the batch at fault: retry for as long as it takes
+            logger.error(f"Error writing {len(frame)} buffered observations, will retry: {str(e)}")
+            self._requeue((frame, attempts))
+            raise
+        except Exception as e:
+            attempts += 1
+            if attempts < self.max_attempts:
+                logger.error(f"Error writing {len(frame)} buffered observations, will retry: {str(e)}")
+                self._requeue((frame, attempts))
+            elif len(frame) > 1:
+                logger.error(f"Writing {len(frame)} buffered observations failed {attempts} times, "
+                             f"retrying them in halves: {str(e)}")
+                half = len(frame) // 2
+                self._requeue((frame.iloc[:half], 0), (frame.iloc[half:], 0))
+            else:
+                logger.error(f"Observation {frame['id'].iloc[0]} failed {attempts} times, "
+                             f"moved to {self.dead_letter_path}: {str(e)}")
+                self._dead_letter(frame)
+            raise
+        self._release(len(frame))
+        INGEST_BATCH_SECONDS.labels(source=INGEST_SOURCE).observe(time.monotonic() - started)
+        INGEST_ROWS.labels(source=INGEST_SOURCE).inc(written)
+        return written
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopping and not self._frames and not self._failed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Back off before retrying the failed batch
+                time.sleep(self.flush_seconds)
+                with self._condition:
+                    if self._stopping:
+                        return
+
+
+status_buffer = StatusWriteBuffer(
+    max_rows=settings.STATUS_BUFFER_MAX_ROWS,
+    flush_rows=settings.STATUS_BUFFER_FLUSH_ROWS,
+    flush_seconds=settings.STATUS_BUFFER_FLUSH_SECONDS,
+    max_attempts=settings.STATUS_BUFFER_MAX_ATTEMPTS,
+    dead_letter_path=settings.STATUS_BUFFER_DEAD_LETTER_PATH
+)
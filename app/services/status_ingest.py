@@ -0,0 +1,102 @@
+# app/services/status_ingest.py
+
+import io
+import pandas as pd
+from sqlalchemy import Table
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.models.store import StoreStatus, StoreStatusEnum
+from app.services.report_watermark import bump_ingest_version
+from app.services.status_intervals import merge_status_intervals
+from app.services.status_snapshot import status_snapshot
+from app.services.store_directory import record_last_seen, store_keys
+from app.services.uptime_index import uptime_index
+from app.services.uptime_rollup import mark_rollup_dirty
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_COLUMNS = ["id", "store_id", "status", "timestamp_utc"]
+STATUS_VALUES = [status.value for status in StoreStatusEnum]
+
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """Parse 'YYYY-MM-DD HH:MM:SS[.ffffff] UTC' strings into UTC timestamps; invalid ones become NaT."""
+    return pd.to_datetime(
+        values.astype(str).str.replace(" UTC", "", regex=False),
+        format="ISO8601",
+        utc=True,
+        errors="coerce"
+    )
+
+
+def normalize_status_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Validate statuses and timestamps of raw observations, dropping invalid rows."""
+    frame = frame.copy()
+    frame["store_id"] = frame["store_id"].astype(str)
+    frame["status"] = frame["status"].astype(str).str.strip().str.lower()
+    if not pd.api.types.is_datetime64_any_dtype(frame["timestamp_utc"]):
+        frame["timestamp_utc"] = parse_timestamps(frame["timestamp_utc"])
+
+    valid = frame["status"].isin(STATUS_VALUES) & frame["timestamp_utc"].notna()
+    if not valid.all():
+        logger.warning(f"Skipping {int((~valid).sum())} observations with an invalid status or timestamp")
+    return frame.loc[valid, STATUS_COLUMNS]
+
+
+def bulk_insert(db: Session, table: Table, frame: pd.DataFrame):
+    """Insert a frame with COPY on PostgreSQL and a single executemany elsewhere."""
+    if frame.empty:
+        return
+
+    if db.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        statement = f"COPY {table.name} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)"
+        dbapi = db.get_bind().dialect.loaded_dbapi
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        except dbapi.Error as e:
+            # Raise what executemany would, e.g. IntegrityError for a duplicate id
+            raise DBAPIError.instance(statement, None, e, dbapi.Error) from e
+        finally:
+            cursor.close()
+    else:
+        records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        db.execute(table.insert(), records)
+
+
+def ingest_status_frame(db: Session, frame: pd.DataFrame, defer_intervals: bool = False) -> int:
+    """Write normalized observations and update everything derived from them.
+
+    Runs inside the caller's transaction; the caller commits, then passes the
+    frame to publish_status_frame. Bulk loads pass defer_intervals and
+    compact the status runs once at the end. Of observations repeating an
+    id, the last one is written.
+    """
+    frame = frame.drop_duplicates("id", keep="last")
+    if frame.empty:
+        return 0
+
+    # New data, earlier reports no longer match the data watermark
+    version = bump_ingest_version(db)
+    keys = store_keys(db, frame["store_id"].unique())
+    bulk_insert(db, StoreStatus.__table__, frame)
+    record_last_seen(db, frame, keys, version)
+
+    # Re-roll the hourly rollup from the earliest new observation of each store
+    dirty_from = frame.groupby("store_id")["timestamp_utc"].min()
+    mark_rollup_dirty(db, {store_id: timestamp.to_pydatetime() for store_id, timestamp in dirty_from.items()})
+    if not defer_intervals:
+        merge_status_intervals(db, frame)
+    return len(frame)
+
+
+def publish_status_frame(frame: pd.DataFrame):
+    """Advance this process's in-memory views once the observations are committed."""
+    if frame.empty:
+        return
+    uptime_index.invalidate(frame["store_id"].unique())
+    status_snapshot.apply(frame.drop_duplicates("id", keep="last"))
@@ -0,0 +1,286 @@
+# app/services/status_intervals.py
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import and_, func, or_, select, update, String, type_coerce
+from sqlalchemy.orm import Session
+from app.models.interval import StoreStatusInterval
+from app.models.rollup import StoreRollupState
+from app.models.store import StoreStatus
+from app.services.business_hours import as_utc
+from app.services.instrumentation import count_rows, phase
+from app.services.metadata_cache import metadata_cache
+from app.services.uptime_engine import REPORT_WINDOWS, compute_uptime_frame, frame_to_report_rows
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_CHUNK = 500
+RUN_COLUMNS = ["store_id", "status", "start_utc", "end_utc", "polls"]
+
+
+def status_runs(observations: pd.DataFrame) -> pd.DataFrame:
+    """Collapse observations into runs of consecutive polls with the same status, per store.
+
+    Polls of a store sharing a timestamp count once; the last one holds,
+    as in the raw engines.
+    """
+    if observations.empty:
+        return pd.DataFrame(columns=RUN_COLUMNS)
+
+    frame = observations.sort_values(["store_id", "timestamp_utc"], kind="stable")
+    stores = frame["store_id"].to_numpy()
+    statuses = frame["status"].astype(str).to_numpy()
+    timestamps = frame["timestamp_utc"].to_numpy()
+    polls = np.ones(len(frame), dtype=np.int64)
+
+    same_key = (stores[1:] == stores[:-1]) & (timestamps[1:] == timestamps[:-1])
+    if same_key.any():
+        # Keep the last poll of each (store_id, timestamp) and carry the dropped ones in its count
+        keep = ~np.append(same_key, False)
+        key_id = np.cumsum(np.concatenate(([True], ~same_key)))
+        polls = np.bincount(key_id)[key_id][keep]
+        stores, statuses, timestamps = stores[keep], statuses[keep], timestamps[keep]
+
+    new_run = np.ones(len(stores), dtype=bool)
+    new_run[1:] = (stores[1:] != stores[:-1]) | (statuses[1:] != statuses[:-1])
+    run_starts = np.flatnonzero(new_run)
+    run_stops = np.append(run_starts[1:], len(stores))
+    return pd.DataFrame({
+        "store_id": stores[run_starts],
+        "status": statuses[run_starts],
+        "start_utc": pd.to_datetime(timestamps[run_starts], utc=True),
+        "end_utc": pd.to_datetime(timestamps[run_stops - 1], utc=True),
+        "polls": np.add.reduceat(polls, run_starts),
+    })
+
+
+def _insert_runs(db: Session, runs: pd.DataFrame):
+    if runs.empty:
+        return
+    db.execute(StoreStatusInterval.__table__.insert(), [
+        {
+            "store_id": store_id,
+            "status": status,
+            "start_utc": start.to_pydatetime(),
+            "end_utc": end.to_pydatetime(),
+            "polls": int(polls),
+        }
+        for store_id, status, start, end, polls in runs[RUN_COLUMNS].itertuples(index=False)
+    ])
+
+
+def _last_intervals(db: Session, store_ids: List[str]) -> Dict[str, StoreStatusInterval]:
+    """Latest run of each store."""
+    last = {}
+    for chunk_start in range(0, len(store_ids), INTERVAL_CHUNK):
+        chunk = store_ids[chunk_start:chunk_start + INTERVAL_CHUNK]
+        latest = select(
+            StoreStatusInterval.store_id, func.max(StoreStatusInterval.start_utc).label("start_utc")
+        ).where(StoreStatusInterval.store_id.in_(chunk)).group_by(StoreStatusInterval.store_id).subquery()
+        for interval in db.query(StoreStatusInterval).join(
+                latest,
+                and_(StoreStatusInterval.store_id == latest.c.store_id,
+                     StoreStatusInterval.start_utc == latest.c.start_utc)).all():
+            last[interval.store_id] = interval
+    return last
+
+
+def merge_status_intervals(db: Session, frame: pd.DataFrame):
+    """Fold newly ingested observations into the run timeline (caller commits).
+
+    Observations after a store's last run extend or follow it; late ones
+    rebuild the store's runs from the run they fall into.
+    """
+    if frame.empty:
+        return
+    store_ids = list(frame["store_id"].unique())
+    last = _last_intervals(db, store_ids)
+    first_new = frame.groupby("store_id")["timestamp_utc"].min()
+
+    late = {
+        store_id: first_new[store_id].to_pydatetime()
+        for store_id, interval in last.items()
+        if first_new[store_id] <= as_utc(interval.end_utc)
+    }
+    runs = status_runs(frame[~frame["store_id"].isin(late)])
+
+    # A store's first new run continues its last stored run when the status did not change
+    extended = []
+    for index, store_id, status, end_utc, polls in runs.groupby("store_id", sort=False).head(1)[
+            ["store_id", "status", "end_utc", "polls"]].itertuples():
+        interval = last.get(store_id)
+        if interval is not None and interval.status.value == status:
+            interval.end_utc = end_utc.to_pydatetime()
+            interval.polls += int(polls)
+            extended.append(index)
+    _insert_runs(db, runs.drop(index=extended))
+    db.flush()
+
+    if late:
+        rebuild_status_intervals(db, late)
+
+
+def rebuild_status_intervals(db: Session, since: Dict[str, Optional[datetime]]):
+    """Recompute the runs of stores from raw observations (caller commits).
+
+    `since` maps each store to the earliest changed observation, or None
+    to rebuild its whole history.
+    """
+    store_ids = list(since)
+    for chunk_start in range(0, len(store_ids), INTERVAL_CHUNK):
+        chunk = store_ids[chunk_start:chunk_start + INTERVAL_CHUNK]
+        partial = {store_id: as_utc(since[store_id]) for store_id in chunk if since[store_id] is not None}
+
+        # Restart each partial rebuild at the run the earliest change falls into
+        rebuild_from = dict(partial)
+        if partial:
+            for store_id, start_utc in db.query(
+                    StoreStatusInterval.store_id, func.max(StoreStatusInterval.start_utc)).filter(
+                    or_(*[
+                        and_(StoreStatusInterval.store_id == store_id, StoreStatusInterval.start_utc <= timestamp)
+                        for store_id, timestamp in partial.items()
+                    ])).group_by(StoreStatusInterval.store_id).all():
+                rebuild_from[store_id] = as_utc(start_utc)
+
+        conditions = [
+            and_(StoreStatusInterval.store_id == store_id, StoreStatusInterval.start_utc >= rebuild_from[store_id])
+            if store_id in rebuild_from else StoreStatusInterval.store_id == store_id
+            for store_id in chunk
+        ]
+        db.query(StoreStatusInterval).filter(or_(*conditions)).delete(synchronize_session=False)
+
+        query = db.query(StoreStatus.store_id, type_coerce(StoreStatus.status, String), StoreStatus.timestamp_utc).\
+            filter(StoreStatus.store_id.in_(chunk))
+        if len(rebuild_from) == len(chunk):
+            query = query.filter(StoreStatus.timestamp_utc >= min(rebuild_from.values()))
+        observations = pd.DataFrame(query.all(), columns=["store_id", "status", "timestamp_utc"])
+        observations["timestamp_utc"] = pd.to_datetime(observations["timestamp_utc"], utc=True)
+        if rebuild_from:
+            starts = observations["store_id"].map(rebuild_from)
+            observations = observations[starts.isna() | (observations["timestamp_utc"] >= starts)]
+
+        _insert_runs(db, status_runs(observations))
+    db.flush()
+
+
+def compact_status_intervals(db: Session, store_ids: Optional[List[str]] = None) -> int:
+    """Rebuild the runs of stores whose compacted poll count disagrees with store_status.
+
+    Checks the given stores, by default those ingested since the last
+    compaction (flagged with the rollup's dirty marks), e.g. loaded in bulk.
+    Returns the number of rebuilt stores.
+    """
+    if store_ids is None:
+        store_ids = [
+            store_id
+            for (store_id,) in db.query(StoreRollupState.store_id).
+            filter(StoreRollupState.intervals_dirty.is_(True)).
+            order_by(StoreRollupState.store_id).all()
+        ]
+
+    checked, rebuilt = 0, 0
+    for chunk_start in range(0, len(store_ids), INTERVAL_CHUNK):
+        chunk = store_ids[chunk_start:chunk_start + INTERVAL_CHUNK]
+        # Cleared before counting in this transaction: an ingest committing meanwhile flags the store again
+        db.execute(
+            update(StoreRollupState).
+            where(StoreRollupState.store_id.in_(chunk), StoreRollupState.intervals_dirty.is_(True)).
+            values(intervals_dirty=False)
+        )
+        raw = {
+            str(store_id): count
+            for store_id, count in db.query(StoreStatus.store_id, func.count()).
+            filter(StoreStatus.store_id.in_(chunk)).group_by(StoreStatus.store_id).all()
+        }
+        compacted = {
+            store_id: int(polls)
+            for store_id, polls in db.query(StoreStatusInterval.store_id, func.sum(StoreStatusInterval.polls)).
+            filter(StoreStatusInterval.store_id.in_(chunk)).group_by(StoreStatusInterval.store_id).all()
+        }
+        stale = sorted(store_id for store_id in set(raw) | set(compacted) if raw.get(store_id) != compacted.get(store_id))
+        if stale:
+            rebuild_status_intervals(db, {store_id: None for store_id in stale})
+        db.commit()
+        checked += sum(raw.values())
+        rebuilt += len(stale)
+
+    logger.info(f"Compacted {checked} observations of {len(store_ids)} stores, rebuilt {rebuilt} stores")
+    return rebuilt
+
+
+def interval_observations(db: Session, runs: pd.DataFrame, end_time: datetime) -> pd.DataFrame:
+    """Turn runs into the observations the uptime engine expects.
+
+    Each run becomes one observation at its start. A run that was polled on
+    both sides of a window start also gets an observation at its first poll
+    inside the window, read from store_status, so the window counts it from
+    there like the raw engines do.
+    """
+    end = pd.Timestamp(as_utc(end_time))
+    week_start = end - max(REPORT_WINDOWS.values())
+    frames = [runs.loc[runs["start_utc"] >= week_start, ["store_id", "status", "start_utc"]].
+              rename(columns={"start_utc": "timestamp_utc"})]
+    for length in REPORT_WINDOWS.values():
+        window_start = end - length
+        straddling = runs[(runs["start_utc"] < window_start) & (runs["end_utc"] >= window_start)]
+        if straddling.empty:
+            continue
+        first_polls = _first_polls(db, straddling["store_id"].tolist(), window_start.to_pydatetime(), end.to_pydatetime())
+        frames.append(pd.DataFrame({
+            "store_id": straddling["store_id"],
+            "status": straddling["status"],
+            "timestamp_utc": straddling["store_id"].map(first_polls),
+        }).dropna(subset=["timestamp_utc"]))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _first_polls(db: Session, store_ids: List[str], since: datetime, until: datetime) -> pd.Series:
+    """First poll time of each store in [since, until], by store_id."""
+    first = []
+    for chunk_start in range(0, len(store_ids), INTERVAL_CHUNK):
+        first.extend(
+            db.query(StoreStatus.store_id, func.min(StoreStatus.timestamp_utc)).
+            filter(StoreStatus.store_id.in_(store_ids[chunk_start:chunk_start + INTERVAL_CHUNK]),
+                   StoreStatus.timestamp_utc >= since, StoreStatus.timestamp_utc <= until).
+            group_by(StoreStatus.store_id).all()
+        )
+    return pd.to_datetime(pd.Series(dict(first), dtype=object), utc=True)
+
+
+def compute_interval_rows(db: Session, store_ids: List[str], end_time: datetime,
+                          filter_stores: bool = False) -> List[dict]:
+    """Compute report rows from the run timeline instead of raw polls.
+
+    Matches the vectorized engine; only runs straddling a window start read
+    a raw poll each.
+    """
+    week_start = as_utc(end_time) - max(REPORT_WINDOWS.values())
+    query = select(
+        StoreStatusInterval.store_id,
+        type_coerce(StoreStatusInterval.status, String),
+        StoreStatusInterval.start_utc,
+        StoreStatusInterval.end_utc
+    ).where(
+        StoreStatusInterval.end_utc >= week_start,
+        StoreStatusInterval.start_utc <= end_time
+    )
+    if filter_stores:
+        query = query.where(StoreStatusInterval.store_id.in_(store_ids))
+
+    with phase("load"):
+        runs = pd.DataFrame(db.execute(query).all(), columns=["store_id", "status", "start_utc", "end_utc"])
+        runs["store_id"] = runs["store_id"].astype(str)
+        runs["start_utc"] = pd.to_datetime(runs["start_utc"], utc=True)
+        runs["end_utc"] = pd.to_datetime(runs["end_utc"], utc=True)
+        metadata = metadata_cache.get_many(db, store_ids)
+    logger.info(f"Loaded {len(runs)} status runs for {len(store_ids)} stores")
+    count_rows("intervals", len(runs))
+
+    with phase("load"):
+        observations = interval_observations(db, runs, end_time)
+
+    with phase("compute"):
+        return frame_to_report_rows(compute_uptime_frame(observations, metadata, store_ids, end_time))
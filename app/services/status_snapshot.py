@@ -0,0 +1,318 @@
+# app/services/status_snapshot.py
+
+import bisect
+import threading
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.store import Store, StoreStatusEnum
+from app.services.business_hours import as_utc, second_of_week
+from app.services.metadata_cache import StoreMetadata, metadata_cache
+from app.services.report_watermark import ingest_version
+from app.services.report_schema import DEFAULT_TIMEZONE
+from app.services.status_intervals import status_runs
+from app.services.store_directory import latest_seen_time
+from app.services.uptime_engine import iter_observation_chunks
+from app.settings import settings
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+IN_CLAUSE_CHUNK = 500
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+class StoreState(NamedTuple):
+    status: str
+    since: datetime  # first observation of the current streak, i.e. the last transition
+    last_seen: datetime
+    polls: int  # observations in the current streak
+
+
+def _schedule_key(metadata: Optional[StoreMetadata]) -> Tuple[str, tuple]:
+    if metadata is None:
+        return DEFAULT_TIMEZONE, ()
+    return metadata.timezone_str or DEFAULT_TIMEZONE, metadata.hours_index.week_intervals
+
+
+def _static_row(store_id: str, state: StoreState) -> dict:
+    return {
+        "store_id": store_id,
+        "status": state.status,
+        "since": state.since.isoformat(),
+        "last_seen": state.last_seen.isoformat(),
+        "streak_polls": state.polls,
+    }
+
+
+def _run_states(runs: pd.DataFrame, position: str) -> Dict[str, StoreState]:
+    """State of the first or last run of each store in a status_runs frame."""
+    grouped = runs.groupby("store_id", sort=False)
+    selected = grouped.head(1) if position == "first" else grouped.tail(1)
+    return {
+        store_id: StoreState(status, start.to_pydatetime(), end.to_pydatetime(), int(polls))
+        for store_id, status, start, end, polls in selected[
+            ["store_id", "status", "start_utc", "end_utc", "polls"]
+        ].itertuples(index=False)
+    }
+
+
+class StatusSnapshot:
+    """Latest status, last transition and streak of every store, kept in memory.
+
+    Seeded by one scan of store_status on first use, then advanced by
+    ingest_status_frame in this process. Observations ingested by other
+    processes are picked up at most every sync_seconds from the stores
+    whose change_version is newer than the last sync; a late observation
+    older than a store's state reloads
+    that store. Queries filter column arrays in store_id order and check
+    business hours once per distinct (timezone, hours) schedule, without
+    touching the database.
+    """
+
+    def __init__(self, sync_seconds: float):
+        self.sync_seconds = sync_seconds
+        self._states: Dict[str, StoreState] = {}
+        self._stale = set()
+        self._horizon: Optional[datetime] = None
+        self._synced_at: Optional[float] = None
+        self._synced_version = 0  # ingest version the snapshot has caught up with
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        # Column view of _states in store_id order; rebuilt when stores are added
+        self._order: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._active = np.zeros(0, dtype=bool)
+        self._since = np.zeros(0, dtype=np.float64)
+        self._rows: List[dict] = []
+        self._layout_dirty = False
+        # Schedule of each store, -1 until resolved from the metadata cache
+        self._schedules = np.zeros(0, dtype=np.int64)
+        self._schedule_ids: Dict[Tuple[str, tuple], int] = {}
+        self._schedule_hours: List[Tuple[str, Optional[StoreMetadata]]] = []
+        self._schedules_generation: Optional[int] = None  # metadata_cache.generation they were resolved at
+
+    @property
+    def seeded(self) -> bool:
+        return self._synced_at is not None
+
+    def _set(self, store_id: str, state: StoreState):
+        self._states[store_id] = state
+        if self._horizon is None or state.last_seen > self._horizon:
+            self._horizon = state.last_seen
+        position = self._positions.get(store_id)
+        if position is None:
+            self._layout_dirty = True
+        elif not self._layout_dirty:
+            self._active[position] = state.status == StoreStatusEnum.active.value
+            self._since[position] = state.since.timestamp()
+            self._rows[position] = _static_row(store_id, state)
+
+    def _rebuild_layout(self):
+        if not self._layout_dirty:
+            return
+        schedules = dict(zip(self._order, self._schedules.tolist()))
+        self._order = sorted(self._states)
+        self._positions = {store_id: position for position, store_id in enumerate(self._order)}
+        states = [self._states[store_id] for store_id in self._order]
+        self._active = np.array([state.status == StoreStatusEnum.active.value for state in states], dtype=bool)
+        self._since = np.array([state.since.timestamp() for state in states], dtype=np.float64)
+        self._rows = [_static_row(store_id, state) for store_id, state in zip(self._order, states)]
+        self._schedules = np.array([schedules.get(store_id, -1) for store_id in self._order], dtype=np.int64)
+        self._layout_dirty = False
+
+    def _resolve_schedules(self, db: Session, store_ids: List[str], reset: bool = False):
+        """Assign stores their schedule from the metadata cache; reset drops the schedules no store uses."""
+        metadata = metadata_cache.get_many(db, store_ids)
+        with self._lock:
+            self._rebuild_layout()
+            if reset:
+                self._schedule_ids, self._schedule_hours = {}, []
+                self._schedules_generation = metadata_cache.generation
+            for store_id in store_ids:
+                key = _schedule_key(metadata.get(store_id))
+                if key not in self._schedule_ids:
+                    self._schedule_ids[key] = len(self._schedule_hours)
+                    self._schedule_hours.append((key[0], metadata.get(store_id)))
+                self._schedules[self._positions[store_id]] = self._schedule_ids[key]
+
+    def _open_mask(self, at: datetime) -> np.ndarray:
+        """Whether each store is inside its business hours at `at`."""
+        local_seconds = {}
+        schedule_open = np.zeros(len(self._schedule_hours), dtype=bool)
+        for schedule, (timezone, metadata) in enumerate(self._schedule_hours):
+            if timezone not in local_seconds:
+                try:
+                    local_seconds[timezone] = second_of_week(at, timezone)
+                except pytz.UnknownTimeZoneError:
+                    # Like the report engines, an invalid timezone counts nothing
+                    local_seconds[timezone] = None
+            if local_seconds[timezone] is not None:
+                schedule_open[schedule] = metadata is None or metadata.hours_index.is_open(local_seconds[timezone])
+        return schedule_open[self._schedules]
+
+    def _merge(self, runs: pd.DataFrame):
+        """Advance the states with runs of observations newer than them."""
+        if runs.empty:
+            return
+        first_runs = _run_states(runs, "first")
+        run_counts = runs.groupby("store_id", sort=False).size()
+        with self._lock:
+            for store_id, state in _run_states(runs, "last").items():
+                current = self._states.get(store_id)
+                if current is not None:
+                    first = first_runs[store_id]
+                    if first.since <= current.last_seen:
+                        # Lands inside the known history and may move the last transition
+                        self._stale.add(store_id)
+                        continue
+                    if run_counts[store_id] == 1 and first.status == current.status:
+                        state = state._replace(since=current.since, polls=current.polls + state.polls)
+                self._set(store_id, state)
+
+    def apply(self, frame: pd.DataFrame):
+        """Advance the snapshot with newly ingested normalized observations."""
+        if not self.seeded or frame.empty:
+            return
+        self._merge(status_runs(frame[["store_id", "status", "timestamp_utc"]]))
+
+    def _scan(self, db: Session, store_ids: Optional[List[str]], start_time: datetime,
+              end_time: datetime) -> Iterable[pd.DataFrame]:
+        if store_ids is None:
+            yield from iter_observation_chunks(db, start_time, end_time)
+            return
+        for chunk_start in range(0, len(store_ids), IN_CLAUSE_CHUNK):
+            yield from iter_observation_chunks(
+                db, start_time, end_time, store_ids=store_ids[chunk_start:chunk_start + IN_CLAUSE_CHUNK]
+            )
+
+    def _load(self, db: Session, store_ids: Optional[List[str]], end_time: datetime):
+        """Rebuild the states of the given stores, or of all stores, from their full history."""
+        for chunk in self._scan(db, store_ids, EPOCH, end_time):
+            states = _run_states(status_runs(chunk), "last")
+            with self._lock:
+                for store_id, state in states.items():
+                    self._set(store_id, state)
+
+    def _catch_up(self, db: Session, store_ids: List[str], end_time: datetime):
+        """Merge the observations of known stores that are newer than their states."""
+        with self._lock:
+            cutoffs = {store_id: self._states[store_id].last_seen for store_id in store_ids}
+        for chunk in self._scan(db, store_ids, min(cutoffs.values()), end_time):
+            cutoff = pd.to_datetime(chunk["store_id"].map(cutoffs), utc=True)
+            self._merge(status_runs(chunk[chunk["timestamp_utc"] > cutoff]))
+
+    def seed(self, db: Session):
+        """Build the snapshot with one ordered scan of store_status."""
+        started = time.monotonic()
+        # Read first: ingests committing during the scan are synced again later
+        version = ingest_version(db)
+        latest = latest_seen_time(db)
+        with self._lock:
+            self._states, self._stale, self._horizon = {}, set(), None
+            self._layout_dirty = True
+        if latest is not None:
+            self._load(db, None, latest)
+        # Business-hours filters then run from memory
+        metadata_cache.warm(db)
+        self._resolve_schedules(db, sorted(self._states), reset=True)
+        self._synced_version = version
+        self._synced_at = time.monotonic()
+        logger.info(f"Seeded status snapshot with {len(self._states)} stores in {time.monotonic() - started:.2f}s")
+
+    def sync(self, db: Session):
+        """Catch up with other processes' ingests and reload stores that got late observations.
+
+        Schedules are resolved again when the metadata cache changed, so
+        new business hours or timezones show up once the cache has them.
+        """
+        # Ingest versions commit in order, so every store changed up to `version` is visible now
+        version = ingest_version(db)
+        dimension = {
+            store_id: as_utc(last_seen)
+            for store_id, last_seen in db.query(Store.store_id, Store.last_seen_utc).
+            filter(Store.change_version > self._synced_version, Store.last_seen_utc.isnot(None)).all()
+        }
+        with self._lock:
+            stale, self._stale = self._stale, set()
+            reload = sorted(stale | {store_id for store_id in dimension if store_id not in self._states})
+            behind = sorted(
+                store_id for store_id, last_seen in dimension.items()
+                if store_id in self._states and store_id not in stale and last_seen > self._states[store_id].last_seen
+            )
+        horizons = [*dimension.values(), *([self._horizon] if self._horizon else [])]
+        if horizons:
+            end_time = max(horizons)
+            if reload:
+                self._load(db, reload, end_time)
+            if behind:
+                self._catch_up(db, behind, end_time)
+        if metadata_cache.generation != self._schedules_generation:
+            self._resolve_schedules(db, sorted(self._states), reset=True)
+        self._synced_version = version
+        self._synced_at = time.monotonic()
+        if reload or behind:
+            logger.info(f"Status snapshot reloaded {len(reload)} and advanced {len(behind)} stores")
+
+    def refresh(self, db: Session):
+        """Seed on first use, then sync once the last sync is older than sync_seconds."""
+        if self.seeded and time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        with self._sync_lock:
+            if not self.seeded:
+                self.seed(db)
+            elif time.monotonic() - self._synced_at >= self.sync_seconds:
+                self.sync(db)
+
+    def query(self, db: Session, status: Optional[str] = None, open_now: Optional[bool] = None,
+              min_streak_seconds: Optional[float] = None, at: Optional[datetime] = None,
+              cursor: Optional[str] = None, limit: int = 1000) -> dict:
+        """Stores matching the filters, in store_id order after the cursor.
+
+        Streaks and business hours are evaluated at `at`, by default the
+        latest observation of any store. A store is open when `at` falls in
+        its business hours in its timezone; stores without hours are always
+        open and stores with an invalid timezone never are.
+        """
+        self.refresh(db)
+        with self._lock:
+            self._rebuild_layout()
+            unresolved = [self._order[position] for position in np.flatnonzero(self._schedules < 0)]
+        if unresolved:
+            # Stores first seen by an ingest since the last sync
+            self._resolve_schedules(db, unresolved)
+
+        with self._lock:
+            self._rebuild_layout()
+            if self._horizon is None:
+                return {"as_of": None, "total": 0, "stores": [], "next_cursor": None}
+            at = as_utc(at) if at else self._horizon
+            streak = at.timestamp() - self._since
+            in_hours = self._open_mask(at)
+
+            mask = np.ones(len(self._order), dtype=bool)
+            if cursor is not None:
+                mask[:bisect.bisect_right(self._order, cursor)] = False
+            if status is not None:
+                mask &= self._active == (status == StoreStatusEnum.active.value)
+            if min_streak_seconds is not None:
+                mask &= streak >= min_streak_seconds
+            if open_now is not None:
+                mask &= in_hours == open_now
+
+            matches = np.flatnonzero(mask)
+            page = matches[:limit]
+            stores = [
+                {**self._rows[position], "streak_seconds": round(max(seconds, 0.0), 3), "in_business_hours": is_open}
+                for position, seconds, is_open in zip(page.tolist(), streak[page].tolist(), in_hours[page].tolist())
+            ]
+            next_cursor = self._order[page[-1]] if len(matches) > limit else None
+
+        return {"as_of": at.isoformat(), "total": len(matches), "stores": stores, "next_cursor": next_cursor}
+
+
+status_snapshot = StatusSnapshot(sync_seconds=settings.STATUS_SNAPSHOT_SYNC_SECONDS)
@@ -0,0 +1,138 @@
+# app/services/store_directory.py
+
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import bindparam, func, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.hours import BusinessHour
+from app.models.store import Store, StoreStatus
+from app.models.timezone import StoreTimezone
+from app.services.report_watermark import mark_store_directory_complete, store_directory_marker
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+IN_CLAUSE_CHUNK = 500
+
+# Dialect-specific INSERT that skips store_ids another ingest already added
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert_missing(db: Session, store_ids: List[str]):
+    dialect = db.get_bind().dialect.name
+    if dialect in _UPSERT_INSERTS:
+        statement = _UPSERT_INSERTS[dialect](Store.__table__).on_conflict_do_nothing(index_elements=["store_id"])
+    else:
+        statement = insert(Store.__table__)
+    db.execute(statement, [{"store_id": store_id} for store_id in store_ids])
+
+
+def store_keys(db: Session, store_ids: Iterable[str]) -> Dict[str, int]:
+    """Return the integer key of each store, adding unknown stores (caller commits)."""
+    store_ids = sorted(set(str(store_id) for store_id in store_ids))
+    keys = {}
+    for chunk_start in range(0, len(store_ids), IN_CLAUSE_CHUNK):
+        chunk = store_ids[chunk_start:chunk_start + IN_CLAUSE_CHUNK]
+        found = dict(db.query(Store.store_id, Store.id).filter(Store.store_id.in_(chunk)).all())
+        missing = [store_id for store_id in chunk if store_id not in found]
+        if missing:
+            _insert_missing(db, missing)
+            found.update(db.query(Store.store_id, Store.id).filter(Store.store_id.in_(missing)).all())
+        keys.update(found)
+    return keys
+
+
+def add_stores(db: Session, frame: pd.DataFrame) -> pd.DataFrame:
+    """Add the stores of a frame keyed by store_id to the dimension and return the frame (caller commits)."""
+    store_keys(db, frame["store_id"].unique())
+    return frame
+
+
+def record_last_seen(db: Session, frame: pd.DataFrame, keys: Dict[str, int], version: Optional[int] = None):
+    """Move each store's last_seen_utc and last_status forward to its newest observation (caller commits).
+
+    Stores that moved are stamped with the ingest version, so snapshots can sync only them.
+    """
+    latest = frame.sort_values("timestamp_utc", kind="stable").groupby("store_id", sort=False).tail(1)
+    parameters = [
+        {"b_key": keys[str(store_id)], "b_seen": timestamp.to_pydatetime(), "b_status": status}
+        for store_id, status, timestamp in latest[["store_id", "status", "timestamp_utc"]].itertuples(index=False)
+    ]
+    if not parameters:
+        return
+    table = Store.__table__
+    db.execute(
+        update(table).
+        where(table.c.id == bindparam("b_key"),
+              or_(table.c.last_seen_utc.is_(None), table.c.last_seen_utc < bindparam("b_seen"))).
+        values(last_seen_utc=bindparam("b_seen"), last_status=bindparam("b_status"),
+               change_version=version if version is not None else table.c.change_version),
+        parameters
+    )
+
+
+def store_directory_complete(db: Session) -> bool:
+    """Whether the stores dimension covers every observation, so discovery can trust it."""
+    return db.scalar(store_directory_marker()) is not None
+
+
+def discover_observed_stores(db: Session) -> Tuple[List[str], Optional[datetime]]:
+    """Store ids with observations in store_id order, and the latest observation time, from the dimension."""
+    store_ids = [
+        store_id
+        for (store_id,) in db.query(Store.store_id).
+        filter(Store.last_seen_utc.isnot(None)).
+        order_by(Store.store_id).
+        all()
+    ]
+    latest = db.query(func.max(Store.last_seen_utc)).scalar()
+    return store_ids, latest
+
+
+def latest_seen_time(db: Session) -> Optional[datetime]:
+    """Latest observation time from the dimension, or from store_status before the backfill."""
+    if store_directory_complete(db):
+        return db.query(func.max(Store.last_seen_utc)).scalar()
+    return db.query(func.max(StoreStatus.timestamp_utc)).scalar()
+
+
+def backfill_stores(db: Session):
+    """Build the dimension from existing data."""
+    store_ids = set()
+    for model in (StoreStatus, StoreTimezone, BusinessHour):
+        store_ids.update(str(store_id) for (store_id,) in db.query(model.store_id).distinct().all())
+    keys = store_keys(db, store_ids)
+    db.commit()
+    logger.info(f"Store dimension holds {len(keys)} stores")
+
+    latest_time = db.query(StoreStatus.store_id, func.max(StoreStatus.timestamp_utc).label("timestamp_utc")).\
+        group_by(StoreStatus.store_id).subquery()
+    latest = pd.DataFrame(
+        db.query(StoreStatus.store_id, StoreStatus.status, StoreStatus.timestamp_utc).join(
+            latest_time,
+            (StoreStatus.store_id == latest_time.c.store_id) &
+            (StoreStatus.timestamp_utc == latest_time.c.timestamp_utc)
+        ).all(),
+        columns=["store_id", "status", "timestamp_utc"]
+    )
+    latest["status"] = [getattr(status, "value", status) for status in latest["status"]]
+    latest["timestamp_utc"] = pd.to_datetime(latest["timestamp_utc"], utc=True)
+    record_last_seen(db, latest, keys)
+    db.commit()
+
+    # Ingest has kept the dimension current since it existed, so it is complete now
+    mark_store_directory_complete(db)
+    db.commit()
+
+
+if __name__ == "__main__":
+    from app.db.database import get_db
+
+    logging.basicConfig(level=logging.INFO)
+    session = next(get_db())
+    try:
+        backfill_stores(session)
+    finally:
+        session.close()
@@ -0,0 +1,280 @@
+# app/services/uptime_engine.py
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import select, String, type_coerce
+from sqlalchemy.orm import Session
+from app.models.store import StoreStatus, StoreStatusEnum
+from app.services.business_hours import open_seconds_before, to_epoch
+from app.services.instrumentation import count_rows, phase
+from app.services.metadata_cache import StoreMetadata, metadata_cache
+from app.services.report_schema import DEFAULT_TIMEZONE, REPORT_COLUMNS, REPORT_WINDOWS
+from app.settings import settings
+from typing import Iterator, List, Dict, Optional
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def to_utc_timestamp(value: datetime) -> pd.Timestamp:
+    """Convert a naive (assumed UTC) or aware datetime to a UTC pandas Timestamp."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+def load_observations(db: Session, start_time: datetime, end_time: datetime,
+                      store_ids: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load status observations for the window in one query as plain columns."""
+    query = db.query(StoreStatus.store_id, StoreStatus.status, StoreStatus.timestamp_utc).\
+        filter(
+            StoreStatus.timestamp_utc >= start_time,
+            StoreStatus.timestamp_utc <= end_time
+        )
+    if store_ids is not None:
+        query = query.filter(StoreStatus.store_id.in_(store_ids))
+
+    return _observation_frame(query.all())
+
+
+def _observation_frame(rows: list) -> pd.DataFrame:
+    frame = pd.DataFrame(rows, columns=["store_id", "status", "timestamp_utc"])
+    frame["store_id"] = frame["store_id"].astype(str)
+    frame["status"] = frame["status"].astype(str)
+    frame["timestamp_utc"] = pd.to_datetime(frame["timestamp_utc"], utc=True)
+    return frame
+
+
+def iter_observation_chunks(db: Session, start_time: datetime, end_time: datetime,
+                            store_ids: Optional[List[str]] = None,
+                            chunk_rows: Optional[int] = None,
+                            from_store_id: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Scan observations ordered by (store_id, timestamp_utc) through a server-side cursor.
+
+    The ordering is served by idx_store_timestamp. Rows come back as raw column
+    tuples (no ORM objects, statuses as plain strings) and are yielded in
+    frames of about `chunk_rows` rows that always hold complete stores.
+    from_store_id skips the stores ordered before it, e.g. on a resumed run.
+    """
+    chunk_rows = chunk_rows or settings.REPORT_SCAN_CHUNK_ROWS
+    statement = select(
+        StoreStatus.store_id,
+        type_coerce(StoreStatus.status, String),
+        StoreStatus.timestamp_utc
+    ).where(
+        StoreStatus.timestamp_utc >= start_time,
+        StoreStatus.timestamp_utc <= end_time
+    ).order_by(StoreStatus.store_id, StoreStatus.timestamp_utc)
+    if store_ids is not None:
+        statement = statement.where(StoreStatus.store_id.in_(store_ids))
+    if from_store_id is not None:
+        statement = statement.where(StoreStatus.store_id >= from_store_id)
+
+    result = db.execute(statement.execution_options(stream_results=True, yield_per=chunk_rows))
+    pending = []
+    for partition in result.partitions():
+        pending.extend(partition)
+        if len(pending) < chunk_rows:
+            continue
+        # Hold back the last store, its rows may continue in the next partition
+        cut = len(pending)
+        while cut > 0 and pending[cut - 1][0] == pending[-1][0]:
+            cut -= 1
+        if cut:
+            yield _observation_frame(pending[:cut])
+            pending = pending[cut:]
+    if pending:
+        yield _observation_frame(pending)
+
+
+def _valid_timezones(timezone_names) -> set:
+    """Return the subset of timezone names pytz can resolve."""
+    valid = set()
+    for timezone in timezone_names:
+        try:
+            pytz.timezone(timezone)
+            valid.add(timezone)
+        except pytz.UnknownTimeZoneError:
+            logger.error(f"Invalid timezone {timezone}")
+    return valid
+
+
+def timestamps_to_epoch(timestamps: pd.Series) -> np.ndarray:
+    """Convert a UTC datetime column to epoch seconds."""
+    return (timestamps - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy()
+
+
+def compute_uptime_frame(observations: pd.DataFrame, metadata: Dict[str, StoreMetadata],
+                         store_ids: List[str], end_time: datetime) -> pd.DataFrame:
+    """Compute hour/day/week uptime and downtime (in hours) for every store at once."""
+    end = to_utc_timestamp(end_time)
+    window_start = end - max(REPORT_WINDOWS.values())
+    result = pd.DataFrame(0.0, index=pd.Index(store_ids, name="store_id"), columns=REPORT_COLUMNS[1:])
+    if observations.empty:
+        return result
+
+    frame = observations.sort_values(["store_id", "timestamp_utc"], kind="stable").reset_index(drop=True)
+    stores = frame["store_id"].to_numpy()
+    epoch = timestamps_to_epoch(frame["timestamp_utc"])
+    end_epoch = to_epoch(end.to_pydatetime())
+
+    # Each observation holds until the next one of the same store, the last one until the end time
+    group_starts = np.concatenate(([0], np.flatnonzero(stores[1:] != stores[:-1]) + 1))
+    group_stops = np.append(group_starts[1:], len(frame))
+    next_epoch = np.append(epoch[1:], end_epoch)
+    next_epoch[group_stops - 1] = np.maximum(end_epoch, epoch[group_stops - 1])
+
+    # Keep only the part of each interval that falls inside the store's business hours
+    timezones = {
+        store_id: (metadata[store_id].timezone_str if store_id in metadata else None) or DEFAULT_TIMEZONE
+        for store_id in stores[group_starts]
+    }
+    valid_timezones = _valid_timezones(set(timezones.values()))
+    counted = np.zeros(len(frame), dtype=np.float64)
+    for store_id, lo, hi in zip(stores[group_starts], group_starts, group_stops):
+        timezone = timezones[store_id]
+        if timezone not in valid_timezones:
+            continue
+        hours_index = metadata[store_id].hours_index if store_id in metadata else None
+        if hours_index is None or hours_index.always_open:
+            counted[lo:hi] = next_epoch[lo:hi] - epoch[lo:hi]
+            continue
+        open_starts, open_ends = hours_index.utc_intervals(timezone, window_start.to_pydatetime(), end.to_pydatetime())
+        counted[lo:hi] = (
+            open_seconds_before(open_starts, open_ends, next_epoch[lo:hi])
+            - open_seconds_before(open_starts, open_ends, epoch[lo:hi])
+        )
+
+    active = (frame["status"] == StoreStatusEnum.active.value).to_numpy()
+    inactive = (frame["status"] == StoreStatusEnum.inactive.value).to_numpy()
+
+    for window, length in REPORT_WINDOWS.items():
+        in_window = epoch >= end_epoch - length.total_seconds()
+        sums = pd.DataFrame({
+            "store_id": stores,
+            "uptime": np.where(in_window & active, counted, 0.0),
+            "downtime": np.where(in_window & inactive, counted, 0.0),
+        }).groupby("store_id", sort=False).sum()
+        sums = sums[sums.index.isin(result.index)]
+        result.loc[sums.index, f"uptime_last_{window}"] = sums["uptime"].to_numpy() / 3600
+        result.loc[sums.index, f"downtime_last_{window}"] = sums["downtime"].to_numpy() / 3600
+
+    return result
+
+
+def frame_to_report_rows(frame: pd.DataFrame) -> List[dict]:
+    """Turn an uptime frame into report rows rounded to two decimals."""
+    return [
+        {"store_id": store_id, **{column: round(float(value), 2) for column, value in values.items()}}
+        for store_id, values in zip(frame.index, frame.to_dict("records"))
+    ]
+
+
+def compute_report_batches(db: Session, store_ids: List[str], end_time: datetime,
+                           filter_stores: bool = False) -> Iterator[List[dict]]:
+    """Compute report rows in store_id order, one batch per scanned chunk.
+
+    `store_ids` must be in the database's store_id order (see discover_stores);
+    stores without observations in the week get zero rows.
+    """
+    start_time = end_time - max(REPORT_WINDOWS.values())
+    position_of = {store_id: position for position, store_id in enumerate(store_ids)}
+    position = 0
+    scanned = 0
+
+    chunks = iter_observation_chunks(
+        db, start_time, end_time, store_ids if filter_stores else None,
+        from_store_id=store_ids[0] if store_ids and not filter_stores else None
+    )
+    while True:
+        with phase("load"):
+            observations = next(chunks, None)
+        if observations is None:
+            break
+        last_position = max(position_of.get(store_id, -1) for store_id in observations["store_id"].unique())
+        if last_position < position:
+            continue
+        batch_ids = store_ids[position:last_position + 1]
+        with phase("load"):
+            metadata = metadata_cache.get_many(db, batch_ids)
+        scanned += len(observations)
+        count_rows("observations", len(observations))
+        with phase("compute"):
+            rows = frame_to_report_rows(compute_uptime_frame(observations, metadata, batch_ids, end_time))
+        # Yield outside the phases, the consumer's time is not ours
+        yield rows
+        position = last_position + 1
+
+    # Stores after the last one with observations
+    for batch_start in range(position, len(store_ids), settings.REPORT_SHARD_SIZE):
+        batch_ids = store_ids[batch_start:batch_start + settings.REPORT_SHARD_SIZE]
+        yield frame_to_report_rows(compute_uptime_frame(_observation_frame([]), {}, batch_ids, end_time))
+
+    logger.info(f"Scanned {scanned} observations for {len(store_ids)} stores")
+
+
+def compute_report_rows(db: Session, store_ids: List[str], end_time: datetime,
+                        filter_stores: bool = False) -> List[dict]:
+    """Compute report rows for all stores from the last week of observations."""
+    if settings.REPORT_SCAN == "stream":
+        return [row for batch in compute_report_batches(db, store_ids, end_time, filter_stores) for row in batch]
+
+    start_time = end_time - max(REPORT_WINDOWS.values())
+    with phase("load"):
+        observations = load_observations(db, start_time, end_time, store_ids if filter_stores else None)
+        metadata = metadata_cache.get_many(db, store_ids)
+    logger.info(f"Loaded {len(observations)} observations for {len(store_ids)} stores")
+    count_rows("observations", len(observations))
+
+    return frame_to_report_rows(compute_uptime_frame(observations, metadata, store_ids, end_time))
+
+
+def compare_with_legacy(db: Session, store_ids: Optional[List[str]] = None,
+                        sample_size: Optional[int] = 100, tolerance: float = 0.01) -> List[dict]:
+    """Compare the vectorized engine against calculate_uptime_downtime; return mismatching cells."""
+    from app.services.report_generator import calculate_uptime_downtime
+
+    if store_ids is None:
+        store_ids = [
+            str(store[0])
+            for store in db.query(StoreStatus.store_id).distinct().order_by(StoreStatus.store_id).all()
+        ]
+    if sample_size is not None:
+        store_ids = store_ids[:sample_size]
+    if not store_ids:
+        return []
+
+    latest_timestamp = db.query(StoreStatus.timestamp_utc).\
+        order_by(StoreStatus.timestamp_utc.desc()).\
+        first()[0]
+
+    vectorized = {row["store_id"]: row for row in compute_report_rows(db, store_ids, latest_timestamp, filter_stores=True)}
+
+    mismatches = []
+    for store_id in store_ids:
+        for window, length in REPORT_WINDOWS.items():
+            legacy = calculate_uptime_downtime(db, store_id, latest_timestamp - length, latest_timestamp)
+            for column, expected in zip((f"uptime_last_{window}", f"downtime_last_{window}"), legacy):
+                actual = vectorized[store_id][column]
+                if abs(actual - round(expected, 2)) > tolerance:
+                    mismatches.append({
+                        "store_id": store_id,
+                        "column": column,
+                        "legacy": round(expected, 2),
+                        "vectorized": actual
+                    })
+
+    logger.info(f"Compared {len(store_ids)} stores, found {len(mismatches)} mismatches")
+    return mismatches
+
+
+if __name__ == "__main__":
+    from app.db.database import get_db
+
+    logging.basicConfig(level=logging.INFO)
+    db = next(get_db())
+    for mismatch in compare_with_legacy(db):
+        print(mismatch)
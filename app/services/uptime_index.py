@@ -0,0 +1,186 @@
+# app/services/uptime_index.py
+
+import numpy as np
+import pandas as pd
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import String, type_coerce
+from sqlalchemy.orm import Session
+from app.models.store import Store, StoreStatus, StoreStatusEnum
+from app.services.business_hours import as_utc, open_seconds_before, to_epoch
+from app.services.metadata_cache import StoreMetadata, metadata_cache
+from app.services.status_intervals import status_runs
+from app.services.store_directory import latest_seen_time
+from app.services.uptime_engine import DEFAULT_TIMEZONE, REPORT_WINDOWS
+from app.settings import settings
+from typing import Iterable, Optional, Tuple
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _metadata_key(metadata: Optional[StoreMetadata]) -> Tuple[str, tuple]:
+    if metadata is None:
+        return DEFAULT_TIMEZONE, ()
+    return metadata.timezone_str or DEFAULT_TIMEZONE, metadata.hours_index.week_intervals
+
+
+class StoreUptimeIndex:
+    """Cumulative business-hours uptime and downtime of one store at each status change.
+
+    A status holds until the next change, the last one until the horizon
+    (the latest observation of any store). Range queries binary-search the
+    change times and the store's open intervals.
+    """
+
+    def __init__(self, change_epochs: np.ndarray, active: np.ndarray, last_seen: datetime):
+        self.change_epochs = change_epochs
+        self.active = active
+        self.last_seen = last_seen
+        self._metadata_key = None
+        self._covered_until = None
+        self._lock = threading.Lock()
+
+    def _project(self, metadata: Optional[StoreMetadata], horizon_epoch: float):
+        """Project business hours up to the horizon and accumulate open seconds per status."""
+        timezone_str, _ = _metadata_key(metadata)
+        try:
+            pytz.timezone(timezone_str)
+        except pytz.UnknownTimeZoneError:
+            # Like the report engines, a store with an invalid timezone counts nothing
+            logger.error(f"Invalid timezone {timezone_str}")
+            self.open_starts = self.open_ends = np.array([], dtype=np.float64)
+        else:
+            hours_index = metadata.hours_index if metadata is not None else None
+            if hours_index is None or hours_index.always_open:
+                self.open_starts = self.change_epochs[:1].astype(np.float64)
+                self.open_ends = np.array([horizon_epoch], dtype=np.float64)
+            else:
+                self.open_starts, self.open_ends = hours_index.utc_intervals(
+                    timezone_str,
+                    datetime.fromtimestamp(self.change_epochs[0], pytz.utc),
+                    datetime.fromtimestamp(horizon_epoch, pytz.utc)
+                )
+
+        self.open_at_change = open_seconds_before(self.open_starts, self.open_ends, self.change_epochs)
+        segments = np.diff(self.open_at_change)
+        self.uptime_before = np.concatenate(([0.0], np.cumsum(np.where(self.active[:-1], segments, 0.0))))
+        self.downtime_before = np.concatenate(([0.0], np.cumsum(np.where(self.active[:-1], 0.0, segments))))
+        self._metadata_key = _metadata_key(metadata)
+        self._covered_until = horizon_epoch
+
+    def _cumulative(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Business-hours uptime and downtime seconds from the first change up to each point."""
+        position = np.searchsorted(self.change_epochs, points, side="right") - 1
+        observed = position >= 0
+        position = np.clip(position, 0, None)
+        since_change = open_seconds_before(self.open_starts, self.open_ends, points) - self.open_at_change[position]
+        active = self.active[position]
+        uptime = self.uptime_before[position] + np.where(active, since_change, 0.0)
+        downtime = self.downtime_before[position] + np.where(active, 0.0, since_change)
+        return np.where(observed, uptime, 0.0), np.where(observed, downtime, 0.0)
+
+    def query(self, metadata: Optional[StoreMetadata], start_time: datetime, end_time: datetime,
+              horizon: datetime) -> Tuple[float, float]:
+        """Business-hours uptime and downtime seconds between start_time and end_time."""
+        horizon_epoch = max(to_epoch(horizon), float(self.change_epochs[-1]))
+        start_epoch = to_epoch(start_time)
+        end_epoch = min(to_epoch(end_time), horizon_epoch)
+        if end_epoch <= start_epoch:
+            return 0.0, 0.0
+
+        with self._lock:
+            if self._metadata_key != _metadata_key(metadata) or self._covered_until < horizon_epoch:
+                self._project(metadata, horizon_epoch)
+            uptime, downtime = self._cumulative(np.array([start_epoch, end_epoch], dtype=np.float64))
+        return float(uptime[1] - uptime[0]), float(downtime[1] - downtime[0])
+
+
+def load_store_index(db: Session, store_id: str) -> Optional[StoreUptimeIndex]:
+    """Build the index of one store from its raw observations; None when it has none."""
+    observations = pd.DataFrame(
+        db.query(StoreStatus.store_id, type_coerce(StoreStatus.status, String), StoreStatus.timestamp_utc).
+        filter(StoreStatus.store_id == store_id).
+        all(),
+        columns=["store_id", "status", "timestamp_utc"]
+    )
+    if observations.empty:
+        return None
+    observations["timestamp_utc"] = pd.to_datetime(observations["timestamp_utc"], utc=True)
+
+    runs = status_runs(observations)
+    change_epochs = (runs["start_utc"] - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy()
+    active = (runs["status"] == StoreStatusEnum.active.value).to_numpy()
+    return StoreUptimeIndex(change_epochs, active, runs["end_utc"].iloc[-1].to_pydatetime())
+
+
+class UptimeIndexCache:
+    """Process-wide LRU of per-store uptime indexes.
+
+    An entry is rebuilt when the stores table shows an observation newer
+    than the ones it holds, so appends from any process are picked up.
+    Late observations ingested in this process invalidate their stores;
+    changed business hours or timezones re-project the entry.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, StoreUptimeIndex]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, db: Session, store_id: str, last_seen: Optional[datetime]) -> Optional[StoreUptimeIndex]:
+        with self._lock:
+            index = self._entries.get(store_id)
+            if index is not None:
+                self._entries.move_to_end(store_id)
+        if index is not None and (last_seen is None or as_utc(last_seen) <= as_utc(index.last_seen)):
+            return index
+
+        index = load_store_index(db, store_id)
+        if index is not None:
+            with self._lock:
+                self._entries[store_id] = index
+                self._entries.move_to_end(store_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return index
+
+    def invalidate(self, store_ids: Optional[Iterable[str]] = None):
+        """Drop the indexes of the given stores, or of all stores."""
+        with self._lock:
+            if store_ids is None:
+                self._entries.clear()
+            else:
+                for store_id in store_ids:
+                    self._entries.pop(store_id, None)
+
+
+uptime_index = UptimeIndexCache(maxsize=settings.UPTIME_INDEX_SIZE)
+
+
+def store_uptime(db: Session, store_id: str, start_time: Optional[datetime] = None,
+                 end_time: Optional[datetime] = None) -> Optional[dict]:
+    """Business-hours uptime and downtime of a store over [start_time, end_time], in hours.
+
+    end_time defaults to the latest observation and start_time to one week
+    before it. Returns None for a store without observations.
+    """
+    last_seen = db.query(Store.last_seen_utc).filter(Store.store_id == store_id).scalar()
+    horizon = latest_seen_time(db)
+    index = uptime_index.get(db, store_id, last_seen)
+    if index is None:
+        return None
+
+    end_time = as_utc(end_time) if end_time else as_utc(horizon)
+    start_time = as_utc(start_time) if start_time else end_time - REPORT_WINDOWS["week"]
+    metadata = metadata_cache.get(db, store_id)
+    uptime, downtime = index.query(metadata, start_time, end_time, horizon)
+    return {
+        "store_id": store_id,
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+        "uptime_hours": round(uptime / 3600, 4),
+        "downtime_hours": round(downtime / 3600, 4),
+    }
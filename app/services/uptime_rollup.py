@@ -0,0 +1,359 @@
+# app/services/uptime_rollup.py
+
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, or_, update
+from sqlalchemy.orm import Session
+from app.models.store import StoreStatus, StoreStatusEnum
+from app.models.rollup import StoreHourlyUptime, StoreRollupState
+from app.services.business_hours import as_utc, to_epoch
+from app.services.metadata_cache import StoreMetadata, metadata_cache
+from app.services.uptime_engine import (
+    REPORT_COLUMNS, REPORT_WINDOWS, DEFAULT_TIMEZONE, compute_report_rows, timestamps_to_epoch
+)
+from typing import Dict, List, Optional, Tuple
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keep a day more than the longest report window
+ROLLUP_RETENTION = max(REPORT_WINDOWS.values()) + timedelta(days=1)
+ROLLUP_CHUNK = 500
+
+
+def floor_hour(timestamp: datetime) -> datetime:
+    """Truncate a datetime to the start of its UTC hour."""
+    return as_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+def mark_rollup_dirty(db: Session, dirty_from: Dict[str, datetime]):
+    """Record the earliest new observation per store so the rollup re-rolls from there.
+
+    Also flags the stores for the next interval compaction. Runs inside the
+    caller's ingest transaction; the caller commits.
+    """
+    store_ids = list(dirty_from)
+    for chunk_start in range(0, len(store_ids), ROLLUP_CHUNK):
+        chunk = store_ids[chunk_start:chunk_start + ROLLUP_CHUNK]
+        states = {
+            state.store_id: state
+            for state in db.query(StoreRollupState).filter(StoreRollupState.store_id.in_(chunk)).all()
+        }
+        for store_id in chunk:
+            timestamp = as_utc(dirty_from[store_id])
+            state = states.get(store_id)
+            if state is None:
+                db.add(StoreRollupState(store_id=store_id, dirty_from_utc=timestamp, intervals_dirty=True))
+                continue
+            if state.dirty_from_utc is None or timestamp < as_utc(state.dirty_from_utc):
+                state.dirty_from_utc = timestamp
+            state.intervals_dirty = True
+    db.flush()
+
+
+def mark_all_rollup_dirty(db: Session, since: datetime):
+    """Re-roll every known store from `since`, e.g. after business hours changed (caller commits)."""
+    db.execute(
+        update(StoreRollupState).
+        where(or_(StoreRollupState.dirty_from_utc.is_(None), StoreRollupState.dirty_from_utc > since)).
+        values(dirty_from_utc=since)
+    )
+
+
+def rollup_horizon(db: Session) -> Optional[datetime]:
+    """Oldest hour the rollup keeps, relative to the latest observation."""
+    latest = db.query(func.max(StoreStatus.timestamp_utc)).scalar()
+    return floor_hour(latest - ROLLUP_RETENTION) if latest else None
+
+
+def held_seconds(epoch: np.ndarray, metadata: Optional[StoreMetadata], timezone: str) -> np.ndarray:
+    """Business-hours seconds each observation but the last holds until the next one."""
+    if metadata is None or metadata.hours_index.always_open:
+        return np.diff(epoch)
+    start, end = datetime.fromtimestamp(epoch[0], pytz.utc), datetime.fromtimestamp(epoch[-1], pytz.utc)
+    return np.diff(metadata.hours_index.open_seconds(timezone, start, end, epoch))
+
+
+def store_timezone(store_id: str, metadata: Optional[StoreMetadata]) -> Optional[str]:
+    """Timezone of a store, None when pytz cannot resolve it (the store then counts nothing)."""
+    timezone = (metadata.timezone_str if metadata else None) or DEFAULT_TIMEZONE
+    try:
+        pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        logger.error(f"Invalid timezone {timezone} for store {store_id}")
+        return None
+    return timezone
+
+
+def _rollup_chunk(db: Session, store_ids: List[str], horizon: datetime) -> int:
+    """Recompute the dirty hours of a chunk of stores; return the rows written.
+
+    The chunk's dirty marks are locked, read and cleared first in the
+    transaction, so an ingest committing meanwhile marks its stores again
+    for the next refresh instead of being cleared with this one.
+    """
+    state_rows = StoreRollupState.store_id.in_(store_ids)
+    db.execute(update(StoreRollupState).where(state_rows).values(dirty_from_utc=StoreRollupState.dirty_from_utc))
+    dirty = [
+        as_utc(dirty_from)
+        for (dirty_from,) in db.query(StoreRollupState.dirty_from_utc).
+        filter(state_rows, StoreRollupState.dirty_from_utc.isnot(None)).all()
+    ]
+    if not dirty:
+        db.commit()
+        return 0
+    db.execute(update(StoreRollupState).where(state_rows).values(dirty_from_utc=None))
+    dirty_hour = max(floor_hour(min(dirty)), horizon)
+
+    # A new observation shortens the hold of the one before it, so its hour is rewritten too
+    previous = db.query(StoreStatus.store_id, func.max(StoreStatus.timestamp_utc)).\
+        filter(StoreStatus.store_id.in_(store_ids), StoreStatus.timestamp_utc < dirty_hour).\
+        group_by(StoreStatus.store_id).\
+        all()
+    rewrite_from = max(min([floor_hour(timestamp) for _, timestamp in previous] + [dirty_hour]), horizon)
+
+    observations = pd.DataFrame(
+        db.query(StoreStatus.store_id, StoreStatus.status, StoreStatus.timestamp_utc).
+        filter(StoreStatus.store_id.in_(store_ids), StoreStatus.timestamp_utc >= rewrite_from).
+        order_by(StoreStatus.store_id, StoreStatus.timestamp_utc).
+        all(),
+        columns=["store_id", "status", "timestamp_utc"]
+    )
+    observations["timestamp_utc"] = pd.to_datetime(observations["timestamp_utc"], utc=True)
+    metadata = metadata_cache.get_many(db, store_ids)
+
+    db.query(StoreHourlyUptime).\
+        filter(StoreHourlyUptime.store_id.in_(store_ids), StoreHourlyUptime.hour_utc >= rewrite_from).\
+        delete(synchronize_session=False)
+
+    rows = []
+    for store_id, group in observations.groupby("store_id", sort=False):
+        epoch = timestamps_to_epoch(group["timestamp_utc"])
+        statuses = group["status"].to_numpy()
+        rows.extend(_store_hour_rows(store_id, epoch, statuses, metadata.get(store_id)))
+
+    if rows:
+        db.bulk_insert_mappings(StoreHourlyUptime, rows)
+
+    last_observations = observations.groupby("store_id", sort=False).tail(1)
+    last_seen = {
+        store_id: (timestamp.to_pydatetime(), status)
+        for store_id, status, timestamp in last_observations.itertuples(index=False)
+    }
+    for store_id, (last_timestamp, last_status) in last_seen.items():
+        db.execute(
+            update(StoreRollupState).
+            where(StoreRollupState.store_id == store_id).
+            values(last_timestamp_utc=last_timestamp, last_status=last_status)
+        )
+    db.commit()
+    return len(rows)
+
+
+def _store_hour_rows(store_id: str, epoch: np.ndarray, statuses: np.ndarray,
+                     metadata: Optional[StoreMetadata]) -> List[dict]:
+    """Build the non-empty hourly rollup rows of one store from its observations since the rewrite.
+
+    Each observation but the last adds the time it holds, until the next
+    one, to the hour it starts in. The last observation stays out; it is
+    extended to the report end at report time.
+    """
+    timezone = store_timezone(store_id, metadata)
+    if timezone is None or len(epoch) < 2:
+        return []
+
+    held = held_seconds(epoch, metadata, timezone)
+    hours = np.floor(epoch[:-1] / 3600) * 3600
+    totals = pd.DataFrame({
+        "hour": hours,
+        "uptime": np.where(statuses[:-1] == StoreStatusEnum.active.value, held, 0.0),
+        "downtime": np.where(statuses[:-1] == StoreStatusEnum.inactive.value, held, 0.0),
+    }).groupby("hour", sort=True).sum()
+    return [
+        {
+            "store_id": store_id,
+            "hour_utc": datetime.fromtimestamp(hour, pytz.utc),
+            "uptime_seconds": float(up),
+            "downtime_seconds": float(down)
+        }
+        for hour, up, down in zip(totals.index, totals["uptime"], totals["downtime"])
+        if up > 0 or down > 0
+    ]
+
+
+def refresh_rollup(db: Session, store_ids: Optional[List[str]] = None) -> int:
+    """Roll up every dirty store (or the given ones) and drop hours past retention."""
+    horizon = rollup_horizon(db)
+    if horizon is None:
+        return 0
+
+    query = db.query(StoreRollupState.store_id).filter(StoreRollupState.dirty_from_utc.isnot(None))
+    if store_ids is not None:
+        query = query.filter(StoreRollupState.store_id.in_(store_ids))
+    dirty = [store_id for (store_id,) in query.order_by(StoreRollupState.store_id).all()]
+
+    written = 0
+    for chunk_start in range(0, len(dirty), ROLLUP_CHUNK):
+        written += _rollup_chunk(db, dirty[chunk_start:chunk_start + ROLLUP_CHUNK], horizon)
+
+    if store_ids is None:
+        db.query(StoreHourlyUptime).filter(StoreHourlyUptime.hour_utc < horizon).delete(synchronize_session=False)
+        db.commit()
+
+    logger.info(f"Rolled up {len(dirty)} dirty stores into {written} hourly rows")
+    return written
+
+
+def compute_rollup_rows(db: Session, store_ids: List[str], end_time: datetime) -> List[dict]:
+    """Compute report rows from at most one week of hourly rollup rows per store.
+
+    Matches compute_uptime_frame: a window counts the observations starting
+    in it, each held until the next one and the last until the report end.
+    Hours after the one containing the window start come from the rollup.
+    That hour is corrected from its raw observations, and the last
+    observation is extended from the rollup state. Stores the rollup does
+    not cover up to the report end (dirty, not rolled up yet, or observed
+    after it) are computed from raw observations; the report never writes.
+    """
+    end = as_utc(end_time)
+    horizon = rollup_horizon(db)
+    if horizon is None or horizon > floor_hour(end - max(REPORT_WINDOWS.values())):
+        logger.info("Hourly rollup does not reach back a week before the report end, using raw observations")
+        return compute_report_rows(db, store_ids, end_time, filter_stores=True)
+
+    edge_hours = {window: floor_hour(end - length) for window, length in REPORT_WINDOWS.items()}
+    columns = []
+    for window, edge_hour in edge_hours.items():
+        after_edge = StoreHourlyUptime.hour_utc > edge_hour
+        columns.append(func.sum(case((after_edge, StoreHourlyUptime.uptime_seconds), else_=0.0)))
+        columns.append(func.sum(case((after_edge, StoreHourlyUptime.downtime_seconds), else_=0.0)))
+
+    rows = {}
+    for chunk_start in range(0, len(store_ids), ROLLUP_CHUNK):
+        chunk = store_ids[chunk_start:chunk_start + ROLLUP_CHUNK]
+        states = {
+            state.store_id: state
+            for state in db.query(StoreRollupState).filter(StoreRollupState.store_id.in_(chunk)).all()
+            if state.dirty_from_utc is None and state.last_timestamp_utc is not None
+            and as_utc(state.last_timestamp_utc) <= end
+        }
+        raw = [store_id for store_id in chunk if store_id not in states]
+        if raw:
+            rows.update((row["store_id"], row) for row in compute_report_rows(db, raw, end_time, filter_stores=True))
+        if not states:
+            continue
+
+        rolled = list(states)
+        totals = {
+            store_id: dict(zip(REPORT_COLUMNS[1:], _interleave(sums)))
+            for store_id, *sums in db.query(StoreHourlyUptime.store_id, *columns).
+            filter(StoreHourlyUptime.store_id.in_(rolled), StoreHourlyUptime.hour_utc >= min(edge_hours.values())).
+            group_by(StoreHourlyUptime.store_id).all()
+        }
+        edge_buckets = {
+            (store_id, as_utc(hour)): (uptime, downtime)
+            for store_id, hour, uptime, downtime in db.query(
+                StoreHourlyUptime.store_id, StoreHourlyUptime.hour_utc,
+                StoreHourlyUptime.uptime_seconds, StoreHourlyUptime.downtime_seconds
+            ).filter(StoreHourlyUptime.store_id.in_(rolled), StoreHourlyUptime.hour_utc.in_(set(edge_hours.values())))
+        }
+        edges = _edge_observations(db, rolled, set(edge_hours.values()))
+        metadata = metadata_cache.get_many(db, rolled)
+        for store_id in rolled:
+            store_totals = totals.setdefault(store_id, dict.fromkeys(REPORT_COLUMNS[1:], 0.0))
+            timezone = store_timezone(store_id, metadata.get(store_id))
+            if timezone is None:
+                store_totals.update(dict.fromkeys(REPORT_COLUMNS[1:], 0.0))
+                continue
+            for window, length in REPORT_WINDOWS.items():
+                edge_up, edge_down = _edge_seconds(
+                    edges.get((store_id, edge_hours[window])), edge_buckets.get((store_id, edge_hours[window])),
+                    end - length, metadata.get(store_id), timezone
+                )
+                store_totals[f"uptime_last_{window}"] = (store_totals[f"uptime_last_{window}"] or 0.0) + edge_up
+                store_totals[f"downtime_last_{window}"] = (store_totals[f"downtime_last_{window}"] or 0.0) + edge_down
+            _add_tail(store_totals, states[store_id], metadata.get(store_id), timezone, end)
+            rows[store_id] = {
+                "store_id": store_id,
+                **{column: round(float(store_totals[column] or 0.0) / 3600, 2) for column in REPORT_COLUMNS[1:]}
+            }
+
+    return [rows[store_id] for store_id in store_ids]
+
+
+def _interleave(sums: list) -> list:
+    """Reorder (uptime, downtime) pairs per window into the REPORT_COLUMNS order."""
+    return sums[0::2] + sums[1::2]
+
+
+def _edge_observations(db: Session, store_ids: List[str], hours: set) -> Dict[tuple, pd.DataFrame]:
+    """Raw observations of the hours containing a window start, by (store_id, hour)."""
+    ranges = [
+        StoreStatus.timestamp_utc.between(hour, hour + timedelta(hours=1) - timedelta(microseconds=1))
+        for hour in hours
+    ]
+    observations = pd.DataFrame(
+        db.query(StoreStatus.store_id, StoreStatus.status, StoreStatus.timestamp_utc).
+        filter(StoreStatus.store_id.in_(store_ids), or_(*ranges)).
+        order_by(StoreStatus.store_id, StoreStatus.timestamp_utc).
+        all(),
+        columns=["store_id", "status", "timestamp_utc"]
+    )
+    if observations.empty:
+        return {}
+    observations["status"] = observations["status"].map(lambda status: getattr(status, "value", status))
+    observations["timestamp_utc"] = pd.to_datetime(observations["timestamp_utc"], utc=True)
+    observations["hour"] = observations["timestamp_utc"].dt.floor("h")
+    return {
+        (store_id, hour.to_pydatetime()): group
+        for (store_id, hour), group in observations.groupby(["store_id", "hour"], sort=False)
+    }
+
+
+def _edge_seconds(observations: Optional[pd.DataFrame], bucket: Optional[tuple], window_start: datetime,
+                  metadata: Optional[StoreMetadata], timezone: str) -> Tuple[float, float]:
+    """Uptime and downtime seconds of the observations from window_start to the end of its hour.
+
+    That is the hour's rollup bucket less the observations before the window
+    start. When nothing in the hour is at or after the window start, the
+    window gets nothing from it: the holds before it end in later hours.
+    """
+    if observations is None or bucket is None:
+        return 0.0, 0.0
+    epoch = timestamps_to_epoch(observations["timestamp_utc"])
+    before = int(np.searchsorted(epoch, to_epoch(window_start), side="left"))
+    if before == len(epoch):
+        return 0.0, 0.0
+    if before == 0:
+        return bucket
+    # Observations before the window start all hold until one inside this hour
+    held = held_seconds(epoch[:before + 1], metadata, timezone)
+    statuses = observations["status"].to_numpy()[:before]
+    return (
+        bucket[0] - float(held[statuses == StoreStatusEnum.active.value].sum()),
+        bucket[1] - float(held[statuses == StoreStatusEnum.inactive.value].sum()),
+    )
+
+
+def _add_tail(totals: dict, state: StoreRollupState, metadata: Optional[StoreMetadata], timezone: str,
+              end: datetime):
+    """Add the business-hours time from the store's last observation to the report end."""
+    last_timestamp = as_utc(state.last_timestamp_utc)
+    if last_timestamp >= end or state.last_status is None:
+        return
+
+    kind = "uptime" if state.last_status == StoreStatusEnum.active else "downtime"
+    for window, length in REPORT_WINDOWS.items():
+        # Like the other engines, a window without observations stays empty
+        if last_timestamp < end - length:
+            continue
+        start = last_timestamp
+        if metadata is None or metadata.hours_index.always_open:
+            seconds = (end - start).total_seconds()
+        else:
+            open_before = metadata.hours_index.open_seconds(timezone, start, end, [to_epoch(start), to_epoch(end)])
+            seconds = open_before[1] - open_before[0]
+        column = f"{kind}_last_{window}"
+        totals[column] = (totals.get(column) or 0.0) + seconds
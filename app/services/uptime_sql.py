@@ -0,0 +1,229 @@
+# app/services/uptime_sql.py
+
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, and_, case, func, literal, select
+from sqlalchemy.orm import Session
+from app.models.store import StoreStatus, StoreStatusEnum
+from app.services.business_hours import to_epoch
+from app.services.instrumentation import count_rows, phase
+from app.services.metadata_cache import metadata_cache
+from app.services.uptime_engine import (
+    DEFAULT_TIMEZONE, REPORT_COLUMNS, REPORT_WINDOWS, _valid_timezones, compute_report_rows, frame_to_report_rows
+)
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Offset between the Julian day number and the Unix epoch, for SQLite
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+SQL_DIALECTS = ("postgresql", "sqlite")
+INSERT_CHUNK = 10000
+
+# Session-scoped tables, kept out of Base.metadata so create_all never creates them
+_temp_metadata = MetaData()
+report_schedules = Table(
+    "tmp_report_schedules", _temp_metadata,
+    Column("schedule_id", Integer, nullable=False, index=True),
+    Column("open_start", Float, nullable=False),
+    Column("open_end", Float, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+report_store_schedules = Table(
+    "tmp_report_store_schedules", _temp_metadata,
+    Column("store_id", String, primary_key=True),
+    Column("schedule_id", Integer, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
+def check_sql_dialect(dialect: str):
+    """Reject databases the SQL engine has no epoch arithmetic for."""
+    if dialect not in SQL_DIALECTS:
+        raise ValueError(f"REPORT_ENGINE=sql supports {' and '.join(SQL_DIALECTS)}, not {dialect}")
+
+
+def epoch_seconds(column, dialect: str):
+    """SQL expression of a timestamp column as Unix epoch seconds."""
+    if dialect == "postgresql":
+        return func.extract("epoch", column)
+    check_sql_dialect(dialect)
+    # Timestamps are stored as ISO strings; julianday keeps millisecond precision
+    return (func.julianday(column) - UNIX_EPOCH_JULIAN_DAY) * 86400.0
+
+
+def sql_least(dialect: str, *values):
+    return func.min(*values) if dialect == "sqlite" else func.least(*values)
+
+
+def sql_greatest(dialect: str, *values):
+    return func.max(*values) if dialect == "sqlite" else func.greatest(*values)
+
+
+def store_schedules(db: Session, store_ids: List[str], start_time: datetime,
+                    end_time: datetime) -> Tuple[Dict[str, int], Dict[int, List[Tuple[float, float]]]]:
+    """Project business hours into UTC open intervals for the report week.
+
+    Stores sharing a timezone and weekly hours share a schedule. Stores
+    with an invalid timezone get none and count nothing, as in the
+    vectorized engine.
+    """
+    metadata = metadata_cache.get_many(db, store_ids)
+    timezones = {
+        store_id: (metadata[store_id].timezone_str if store_id in metadata else None) or DEFAULT_TIMEZONE
+        for store_id in store_ids
+    }
+    valid_timezones = _valid_timezones(set(timezones.values()))
+
+    schedule_of, intervals = {}, {}
+    keys = {}
+    for store_id in store_ids:
+        timezone = timezones[store_id]
+        if timezone not in valid_timezones:
+            continue
+        hours_index = metadata[store_id].hours_index if store_id in metadata else None
+        week_intervals = () if hours_index is None else hours_index.week_intervals
+        key = (timezone, week_intervals)
+        if key not in keys:
+            keys[key] = len(keys)
+            if hours_index is None or hours_index.always_open:
+                intervals[keys[key]] = [(to_epoch(start_time), to_epoch(end_time))]
+            else:
+                starts, ends = hours_index.utc_intervals(timezone, start_time, end_time)
+                intervals[keys[key]] = list(zip(starts.tolist(), ends.tolist()))
+        schedule_of[store_id] = keys[key]
+    return schedule_of, intervals
+
+
+def _load_schedules(db: Session, schedule_of: Dict[str, int], intervals: Dict[int, List[Tuple[float, float]]]):
+    connection = db.connection()
+    for table in (report_schedules, report_store_schedules):
+        table.drop(connection, checkfirst=True)
+        table.create(connection)
+
+    schedule_rows = [
+        {"schedule_id": schedule_id, "open_start": open_start, "open_end": open_end}
+        for schedule_id, schedule in intervals.items()
+        for open_start, open_end in schedule
+    ]
+    store_rows = [{"store_id": store_id, "schedule_id": schedule_id} for store_id, schedule_id in schedule_of.items()]
+    for table, rows in ((report_schedules, schedule_rows), (report_store_schedules, store_rows)):
+        for chunk_start in range(0, len(rows), INSERT_CHUNK):
+            connection.execute(table.insert(), rows[chunk_start:chunk_start + INSERT_CHUNK])
+
+
+def _drop_schedules(db: Session):
+    connection = db.connection()
+    for table in (report_store_schedules, report_schedules):
+        table.drop(connection, checkfirst=True)
+
+
+def uptime_query(dialect: str, start_time: datetime, end_time: datetime):
+    """Hour/day/week uptime and downtime seconds per store, aggregated in the database.
+
+    Each observation holds until the next one of its store (LEAD), the last
+    one until the end time. Only the overlap with the store's open intervals
+    counts, and an observation counts in every window it starts in.
+    """
+    end_epoch = to_epoch(end_time)
+    timestamp = epoch_seconds(StoreStatus.timestamp_utc, dialect)
+    observations = select(
+        StoreStatus.store_id.label("store_id"),
+        report_store_schedules.c.schedule_id.label("schedule_id"),
+        StoreStatus.status.label("status"),
+        timestamp.label("observed"),
+        func.lead(timestamp).over(
+            partition_by=StoreStatus.store_id, order_by=StoreStatus.timestamp_utc
+        ).label("next_observed"),
+    ).join(
+        report_store_schedules, report_store_schedules.c.store_id == StoreStatus.store_id
+    ).where(
+        StoreStatus.timestamp_utc >= start_time,
+        StoreStatus.timestamp_utc <= end_time
+    ).cte("observations")
+
+    held_until = func.coalesce(
+        observations.c.next_observed, sql_greatest(dialect, observations.c.observed, literal(end_epoch))
+    )
+    overlap = (
+        sql_least(dialect, held_until, report_schedules.c.open_end)
+        - sql_greatest(dialect, observations.c.observed, report_schedules.c.open_start)
+    )
+    sums = []
+    for window, length in REPORT_WINDOWS.items():
+        in_window = observations.c.observed >= end_epoch - length.total_seconds()
+        for prefix, status in (("uptime", StoreStatusEnum.active), ("downtime", StoreStatusEnum.inactive)):
+            sums.append(func.sum(case(
+                (and_(in_window, observations.c.status == status), overlap), else_=0.0
+            )).label(f"{prefix}_last_{window}"))
+
+    return select(observations.c.store_id, *sums).select_from(
+        observations.join(
+            report_schedules,
+            and_(report_schedules.c.schedule_id == observations.c.schedule_id,
+                 report_schedules.c.open_start < held_until,
+                 report_schedules.c.open_end > observations.c.observed)
+        )
+    ).group_by(observations.c.store_id)
+
+
+def compute_sql_rows(db: Session, store_ids: List[str], end_time: datetime) -> List[dict]:
+    """Compute report rows in the database; only six numbers per store come back."""
+    dialect = db.get_bind().dialect.name
+    check_sql_dialect(dialect)
+    start_time = end_time - max(REPORT_WINDOWS.values())
+
+    with phase("load"):
+        schedule_of, intervals = store_schedules(db, store_ids, start_time, end_time)
+        _load_schedules(db, schedule_of, intervals)
+    try:
+        with phase("compute"):
+            query = uptime_query(dialect, start_time, end_time)
+            totals = pd.DataFrame(db.execute(query).all(), columns=list(query.selected_columns.keys()))
+    finally:
+        _drop_schedules(db)
+    count_rows("sql_stores", len(totals))
+
+    result = pd.DataFrame(0.0, index=pd.Index(store_ids, name="store_id"), columns=REPORT_COLUMNS[1:])
+    totals = totals.set_index(totals["store_id"].astype(str)).drop(columns="store_id")
+    totals = totals[totals.index.isin(result.index)]
+    result.loc[totals.index, totals.columns] = totals.to_numpy(dtype=float) / 3600
+    return frame_to_report_rows(result)
+
+
+def compare_with_vectorized(db: Session, store_ids: Optional[List[str]] = None,
+                            end_time: Optional[datetime] = None, tolerance: float = 0.01) -> List[dict]:
+    """Compare the SQL engine against the vectorized engine; return mismatching cells."""
+    from app.services.report_generator import discover_stores
+
+    if store_ids is None or end_time is None:
+        discovered, latest_timestamp = discover_stores(db)
+        store_ids = discovered if store_ids is None else store_ids
+        end_time = latest_timestamp if end_time is None else end_time
+    if not store_ids:
+        return []
+
+    expected = {row["store_id"]: row for row in compute_report_rows(db, store_ids, end_time, filter_stores=True)}
+    mismatches = []
+    for row in compute_sql_rows(db, store_ids, end_time):
+        for column in REPORT_COLUMNS[1:]:
+            if abs(row[column] - expected[row["store_id"]][column]) > tolerance:
+                mismatches.append({
+                    "store_id": row["store_id"],
+                    "column": column,
+                    "vectorized": expected[row["store_id"]][column],
+                    "sql": row[column]
+                })
+
+    logger.info(f"Compared {len(store_ids)} stores, found {len(mismatches)} mismatches")
+    return mismatches
+
+
+if __name__ == "__main__":
+    from app.db.database import get_db
+
+    logging.basicConfig(level=logging.INFO)
+    db = next(get_db())
+    for mismatch in compare_with_vectorized(db):
+        print(mismatch)
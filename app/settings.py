@@ -15,6 +15,43 @@ class Settings(BaseSettings):
   JWT_SECRET: str               # a string that contains the JWT secret   
   CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
   CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+  DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL", "")  # read-only replica for report scans and store reads, empty = primary only
+  REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))  # observation lag tolerated for report scans and store reads
+  REPLICA_CHECK_SECONDS: float = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))  # how long a replica lag check is reused
+  DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+  DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+  DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+  DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+  DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+  METADATA_CACHE_SIZE: int = int(os.getenv("METADATA_CACHE_SIZE", "100000"))
+  METADATA_CACHE_TTL_SECONDS: float = float(os.getenv("METADATA_CACHE_TTL_SECONDS", "3600"))
+  UPTIME_INDEX_SIZE: int = int(os.getenv("UPTIME_INDEX_SIZE", "10000"))  # stores kept in the range-query uptime index
+  STATUS_SNAPSHOT_SYNC_SECONDS: float = float(os.getenv("STATUS_SNAPSHOT_SYNC_SECONDS", "5"))  # catch-up with other processes' ingests
+  INGEST_CHUNK_SIZE: int = int(os.getenv("INGEST_CHUNK_SIZE", "100000"))
+  STATUS_BUFFER_MAX_ROWS: int = int(os.getenv("STATUS_BUFFER_MAX_ROWS", "500000"))  # POST /status backpressure limit
+  STATUS_BUFFER_FLUSH_ROWS: int = int(os.getenv("STATUS_BUFFER_FLUSH_ROWS", "50000"))
+  STATUS_BUFFER_FLUSH_SECONDS: float = float(os.getenv("STATUS_BUFFER_FLUSH_SECONDS", "1"))
+  STATUS_BUFFER_PUT_TIMEOUT_SECONDS: float = float(os.getenv("STATUS_BUFFER_PUT_TIMEOUT_SECONDS", "5"))
+  STATUS_BUFFER_MAX_ATTEMPTS: int = int(os.getenv("STATUS_BUFFER_MAX_ATTEMPTS", "5"))  # failed writes before a batch is split
+  STATUS_BUFFER_DEAD_LETTER_PATH: str = os.getenv("STATUS_BUFFER_DEAD_LETTER_PATH", "dead_letter/status.csv")
+  REPORT_ENGINE: str = os.getenv("REPORT_ENGINE", "vectorized")  # "vectorized", "intervals", "rollup", "sql" (primary only, writes temp tables) or "per_store"
+  ROLLUP_REFRESH_SECONDS: int = int(os.getenv("ROLLUP_REFRESH_SECONDS", "300"))
+  INTERVAL_COMPACTION_SECONDS: int = int(os.getenv("INTERVAL_COMPACTION_SECONDS", "3600"))
+  REPORT_SCAN: str = os.getenv("REPORT_SCAN", "stream")  # "stream" (server-side cursor) or "bulk"
+  REPORT_SCAN_CHUNK_ROWS: int = int(os.getenv("REPORT_SCAN_CHUNK_ROWS", "50000"))
+  REPORT_EXECUTION: str = os.getenv("REPORT_EXECUTION", "celery")  # "celery", "local" or "serial"
+  REPORT_SHARD_SIZE: int = int(os.getenv("REPORT_SHARD_SIZE", "500"))
+  REPORT_SHARD_MAX_RETRIES: int = int(os.getenv("REPORT_SHARD_MAX_RETRIES", "3"))
+  REPORT_TASK_MAX_RETRIES: int = int(os.getenv("REPORT_TASK_MAX_RETRIES", "3"))  # resumed reruns of a report task
+  REPORT_VISIBILITY_TIMEOUT_SECONDS: int = int(os.getenv("REPORT_VISIBILITY_TIMEOUT_SECONDS", "43200"))
+  REPORT_COMPRESSION: str = os.getenv("REPORT_COMPRESSION", "none")  # "none" or "gzip"
+  REPORT_PARQUET: bool = os.getenv("REPORT_PARQUET", "true").lower() == "true"  # also store reports as Parquet
+  REPORT_EVENTS_URL: str = os.getenv("REPORT_EVENTS_URL", os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))  # pub/sub for report waiters
+  REPORT_WAIT_CHECK_SECONDS: float = float(os.getenv("REPORT_WAIT_CHECK_SECONDS", "5"))  # batched DB check behind pub/sub
+  REPORT_PROGRESS_INTERVAL_SECONDS: float = float(os.getenv("REPORT_PROGRESS_INTERVAL_SECONDS", "2"))
+  WORKER_WARMUP: bool = os.getenv("WORKER_WARMUP", "true").lower() == "true"  # connect and fill caches as a worker starts
+  REPORT_PROFILE_SAMPLE_SECONDS: float = float(os.getenv("REPORT_PROFILE_SAMPLE_SECONDS", "1"))  # tracemalloc sampling of profiled runs
+  REPORT_LOCAL_WORKERS: int = int(os.getenv("REPORT_LOCAL_WORKERS", "0"))  # 0 = one per CPU
   
   class Config:
     env_file = ".env"
@@ -1,3 +1,5 @@
 from app.tasks.report_tasks import generate_store_report
+from app.tasks.rollup_tasks import refresh_uptime_rollup
+from app.tasks.interval_tasks import compact_status_intervals_task
 
-__all__ = ['generate_store_report'] 
\ No newline at end of file
+__all__ = ['generate_store_report', 'refresh_uptime_rollup', 'compact_status_intervals_task'] 
\ No newline at end of file
@@ -0,0 +1,19 @@
+from app.celery_app import celery_app
+from app.services.status_intervals import compact_status_intervals
+from app.db.database import get_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(name='compact_status_intervals')
+def compact_status_intervals_task():
+    """Periodically rebuild status runs that disagree with the raw observations."""
+    db = next(get_db())
+    try:
+        return compact_status_intervals(db)
+    except Exception as e:
+        logger.error(f"Error compacting status intervals: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
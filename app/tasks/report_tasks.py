@@ -1,11 +1,26 @@
 from app.celery_app import celery_app
-from app.services.report_generator import generate_report
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.services.report_generator import (
+    generate_report, discover_stores, compute_store_rows, check_report_engine, split_shards
+)
+from app.services.business_hours import as_utc
+from app.services.instrumentation import PhaseTimer
+from app.services.metrics import REPORT_DURATION_SECONDS, REPORT_QUEUE_LATENCY_SECONDS
+from app.services.read_replica import read_replica
+from app.services.report_checkpoint import ReportCheckpoint
+from app.services.report_events import publish_report_event, report_event
+from app.services.report_profiler import ReportProfiler, combine_profiles
+from app.services.report_progress import ProgressReporter, record_progress
+from app.services.report_writer import ReportWriter
+from app.settings import settings
+from celery import chord
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from app.db.database import ReadSessionLocal, engine, get_db, uses_read_replica
 from app.models.report import Report
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 import json
+import os
 from uuid import UUID
 
 logger = logging.getLogger(__name__)
@@ -22,13 +37,35 @@ def update_report_status(report_id: str, status: str, error: str = None, result:
     try:
         report = db.query(Report).filter(Report.id == report_id).first()
         if report:
+            # A redelivered task resumes a run that already started
+            resumed = report.status == "Running" and report.started_at is not None
             report.status = status
+            now = datetime.now(timezone.utc)
+            if status == "Running":
+                if not resumed:
+                    report.started_at = now
+                    REPORT_QUEUE_LATENCY_SECONDS.observe((now - as_utc(report.created_at)).total_seconds())
+                report.stores_done = 0
+                report.progress = 0.0
+            elif status in ("Complete", "Failed") and report.started_at:
+                REPORT_DURATION_SECONDS.labels(execution=settings.REPORT_EXECUTION, status=status).observe(
+                    (now - as_utc(report.started_at)).total_seconds()
+                )
+            if status == "Complete":
+                report.progress = 100.0
+                report.eta_seconds = 0.0
+            if status == "Failed":
+                # Free the watermark so the next trigger starts a new run
+                report.watermark_key = None
             if error is not None:
                 report.error = error
             if result is not None:
                 # Convert UUIDs to strings in the result
                 report.result = json.loads(json.dumps(result, cls=UUIDEncoder))
+            # Read before the commit expires the row
+            event = report_event(report)
             db.commit()
+            publish_report_event(event)
             logger.info(f"Updated report {report_id} status to {status}")
             if result and "total_stores_processed" in result:
                 logger.info(f"Processed {result['total_stores_processed']} out of {result['total_stores']} stores")
@@ -42,48 +79,274 @@ def update_report_status(report_id: str, status: str, error: str = None, result:
     finally:
         db.close()
 
-@celery_app.task(name='generate_store_report')
-def generate_store_report(report_id: str):
-    """Generate a report for all stores."""
+
+def get_report_status(report_id: str):
+    """Current status of a report, None when it does not exist."""
+    db = next(get_db())
+    try:
+        return db.query(Report.status).filter(Report.id == report_id).scalar()
+    finally:
+        db.close()
+
+
+def record_profile(report_id: str, profile: dict):
+    """Store the CPU time and peak memory of a profiled run on its report."""
+    db = next(get_db())
+    try:
+        report = db.query(Report).filter(Report.id == report_id).first()
+        if report:
+            report.cpu_seconds = profile["cpu_seconds"]
+            report.peak_memory_mb = profile["peak_memory_mb"]
+            db.commit()
+    except Exception as e:
+        logger.error(f"Error recording profile of report {report_id}: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def fail_report_run(report_id: str, error_msg: str):
+    """Mark a report failed and drop its checkpoint."""
+    logger.error(error_msg)
+    update_report_status(report_id, "Failed", error=error_msg)
+    ReportCheckpoint.discard(report_id)
+
+
+@celery_app.task(name='compute_report_shard', bind=True, max_retries=settings.REPORT_SHARD_MAX_RETRIES,
+                 acks_late=True, reject_on_worker_lost=True)
+def compute_report_shard(self, report_id: str, index: int, store_ids: list, latest_timestamp: str,
+                         profile: bool = False, read_replica: bool = False):
+    """Compute one shard of stores into a partial report file.
+
+    Idempotent: a redelivered shard whose part file was already written
+    returns it without recomputing. A profiled shard saves its own profile.
+    With read_replica the shard scans the replica; retries use the primary.
+    """
+    part_path = ReportWriter.part_path(report_id, index)
+    if os.path.exists(part_path):
+        with open(part_path) as part:
+            rows = sum(1 for _ in part)
+        logger.info(f"Shard {index} of report {report_id} already written, reusing it")
+        return {"index": index, "part": part_path, "rows": rows, "failed_stores": 0}
+    
+    db = ReadSessionLocal() if read_replica and not self.request.retries else next(get_db())
+    writer = ReportWriter.for_part(report_id, index)
+    timer = PhaseTimer()
+    profiler = ReportProfiler(report_id, f"shard-{index:05d}") if profile else None
+    try:
+        with timer.activate(), profiler.run() if profiler else nullcontext():
+            with timer.phase("compute"):
+                rows = compute_store_rows(db, store_ids, datetime.fromisoformat(latest_timestamp), filter_stores=True)
+            with timer.phase("write"):
+                writer.write_rows(rows)
+                summary = writer.close(len(store_ids))
+        timer.rows["report_rows"] += len(rows)
+        timer.observe()
+        record_progress(report_id, len(store_ids))
+        shard = {
+            "index": index,
+            "part": summary["filepath"],
+            "rows": summary["total_stores_processed"],
+            "failed_stores": 0,
+            "timings": timer.summary()
+        }
+        if profiler:
+            shard["profile"] = profiler.summary()
+        return shard
+    except Exception as e:
+        writer.abort()
+        db.rollback()
+        if self.request.retries < self.max_retries:
+            logger.warning(f"Shard {index} of report {report_id} failed, retrying: {str(e)}")
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        # Let the other shards finish; the merge fails the report
+        logger.error(f"Shard {index} of report {report_id} failed after {self.max_retries} retries: {str(e)}")
+        record_progress(report_id, len(store_ids))
+        return {"index": index, "part": None, "rows": 0, "failed_stores": len(store_ids), "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name='merge_report_shards', acks_late=True, reject_on_worker_lost=True)
+def merge_report_shards(shard_results: list, report_id: str, total_stores: int, dispatch_timings: dict = None):
+    """Concatenate the partial shard files into the report CSV and complete the report.
+
+    A shard that ran out of retries fails the whole report, rather than
+    completing it with its stores missing from the CSV.
+    """
+    if get_report_status(report_id) == "Complete":
+        logger.info(f"Report {report_id} is already complete, skipping redelivered merge")
+        return None
+    
+    writer = None
+    timer = PhaseTimer()
+    try:
+        # A redelivered shard may report twice
+        shard_results = sorted(
+            {shard["index"]: shard for shard in shard_results}.values(), key=lambda shard: shard["index"]
+        )
+        
+        failed = [shard for shard in shard_results if shard["failed_stores"]]
+        if failed:
+            fail_report_run(report_id, (
+                f"{sum(shard['failed_stores'] for shard in failed)} of {total_stores} stores failed "
+                f"in {len(failed)} shards: {failed[0].get('error')}"
+            ))
+            return None
+        if not any(shard["rows"] for shard in shard_results):
+            fail_report_run(report_id, "No report data generated")
+            return None
+        
+        with timer.phase("write"):
+            writer = ReportWriter.create()
+            for shard in shard_results:
+                if shard["part"]:
+                    writer.append_part(shard["part"], shard["rows"])
+            result = writer.close(total_stores)
+        
+        # Shards and the dispatch exported their own metrics, only the totals are stored
+        timings = PhaseTimer()
+        for summary in [dispatch_timings or {}, timer.summary()] + [shard.get("timings", {}) for shard in shard_results]:
+            timings.merge(summary)
+        result["timings"] = timings.summary()
+        profiles = [shard["profile"] for shard in shard_results if shard.get("profile")]
+        if profiles:
+            result["profile"] = combine_profiles(report_id, profiles)
+            record_profile(report_id, result["profile"])
+        
+        with timer.phase("persist"):
+            update_report_status(report_id, "Complete", result=result)
+        # Only now, a merge redelivered before the report completed still finds the parts
+        ReportCheckpoint.discard(report_id)
+        timer.observe()
+        timings.log(f"Report {report_id}")
+        
+        logger.info(f"Successfully generated report {report_id} from {len(shard_results)} shards")
+        return result
+        
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        fail_report_run(report_id, f"Error merging report shards: {str(e)}")
+        raise
+
+
+@celery_app.task(name='fail_report')
+def fail_report(request, exc, traceback, report_id: str):
+    """Error callback marking the report failed when the shard chord breaks."""
+    update_report_status(report_id, "Failed", error=f"Error generating report: {str(exc)}")
+    ReportCheckpoint.discard(report_id)
+
+
+def dispatch_report_shards(report_id: str, checkpoint: ReportCheckpoint, profile: bool = False) -> dict:
+    """Fan the report out as a chord of shard tasks followed by a merge."""
+    # Shards scan the replica only if it was fresh enough when the stores were discovered
+    db = read_replica.scan_session()
+    timer = PhaseTimer()
+    try:
+        replica = uses_read_replica(db)
+        with timer.activate(), timer.phase("discovery"):
+            store_ids, latest_timestamp = discover_stores(db)
+    finally:
+        db.close()
+    timer.observe()
+    
+    if not store_ids:
+        fail_report_run(report_id, "No report data generated")
+        return None
+    
+    record_progress(report_id, 0, len(store_ids))
+    shards = split_shards(store_ids, settings.REPORT_SHARD_SIZE)
+    chord([
+        compute_report_shard.s(report_id, index, shard, latest_timestamp.isoformat(), profile, replica)
+        for index, shard in enumerate(shards)
+    ])(merge_report_shards.s(report_id, len(store_ids), timer.summary()).on_error(fail_report.s(report_id)))
+    # The shards are now queued; a redelivered generate_store_report must not send them again
+    checkpoint.mark_dispatched()
+    
+    logger.info(f"Dispatched report {report_id} as {len(shards)} shards for {len(store_ids)} stores")
+    return {"report_id": report_id, "shards": len(shards)}
+
+
+@celery_app.task(name='generate_store_report', bind=True, max_retries=None,
+                 acks_late=True, reject_on_worker_lost=True)
+def generate_store_report(self, report_id: str, profile: bool = False):
+    """Generate a report for all stores.
+
+    The task is acknowledged once it finishes, so a worker lost mid-run
+    gets it redelivered; like a failed attempt, the rerun resumes from the
+    report's checkpoint. REPORT_TASK_MAX_RETRIES bounds the reruns.
+
+    With profile, the run (or every shard) is wrapped in cProfile and
+    tracemalloc sampling. A profiled local run computes serially, so the
+    work happens in the profiled process.
+    """
+    status = get_report_status(report_id)
+    if status in ("Complete", "Failed"):
+        logger.info(f"Report {report_id} is already {status}, skipping redelivered task")
+        return None
+    
+    checkpoint = ReportCheckpoint.open(report_id)
+    if checkpoint.dispatched:
+        logger.info(f"Shards of report {report_id} were already dispatched, not dispatching again")
+        return {"report_id": report_id, "shards": None}
+    if checkpoint.start_attempt() > settings.REPORT_TASK_MAX_RETRIES + 1:
+        fail_report_run(report_id, f"Report abandoned after {checkpoint.attempts - 1} attempts")
+        return None
+    try:
+        check_report_engine(engine.dialect.name)
+    except ValueError as e:
+        fail_report_run(report_id, f"Unsupported report engine: {str(e)}")
+        return None
+    
     # Update initial status
     update_report_status(report_id, "Running")
     
-    try:
-        # Get a new session for report generation
-        db = next(get_db())
+    if settings.REPORT_EXECUTION == "celery":
         try:
-            # Generate the report
-            report_data = generate_report(db)
-            
-            if not report_data:
-                error_msg = "No report data generated"
-                logger.error(error_msg)
-                update_report_status(report_id, "Failed", error=error_msg)
-                return None
-            
-            # Update report with results using a new session
-            update_report_status(report_id, "Complete", result=report_data)
-            
-            logger.info(f"Successfully generated report {report_id}")
-            return report_data
-            
-        except SQLAlchemyError as e:
-            error_msg = f"Database error generating report: {str(e)}"
-            logger.error(error_msg)
-            db.rollback()
-            update_report_status(report_id, "Failed", error=error_msg)
-            raise
+            return dispatch_report_shards(report_id, checkpoint, profile)
         except Exception as e:
-            error_msg = f"Error generating report: {str(e)}"
-            logger.error(error_msg)
-            db.rollback()
-            update_report_status(report_id, "Failed", error=error_msg)
+            fail_report_run(report_id, f"Error dispatching report shards: {str(e)}")
             raise
-        finally:
-            db.close()
-            
+    
+    # Get a new session for report generation, on the replica when it is fresh enough
+    db = read_replica.scan_session()
+    timer = PhaseTimer()
+    profiler = ReportProfiler(report_id, "run") if profile else None
+    try:
+        # Generate the report, sharded over a local process pool if configured
+        with timer.activate(), profiler.run() if profiler else nullcontext():
+            report_data = generate_report(
+                db, parallel=settings.REPORT_EXECUTION == "local" and not profile,
+                on_progress=ProgressReporter(report_id), checkpoint=checkpoint
+            )
     except Exception as e:
-        error_msg = f"Unexpected error in report generation task: {str(e)}"
-        logger.error(error_msg)
-        update_report_status(report_id, "Failed", error=error_msg)
-        raise 
\ No newline at end of file
+        db.rollback()
+        if checkpoint.attempts <= settings.REPORT_TASK_MAX_RETRIES:
+            logger.warning(f"Attempt {checkpoint.attempts} of report {report_id} failed, "
+                           f"retrying from its checkpoint: {str(e)}")
+            raise self.retry(exc=e, countdown=2 ** checkpoint.attempts)
+        kind = "Database error" if isinstance(e, SQLAlchemyError) else "Error"
+        fail_report_run(report_id, f"{kind} generating report: {str(e)}")
+        raise
+    finally:
+        db.close()
+        if profiler:
+            record_profile(report_id, profiler.summary())
+    
+    if not report_data:
+        fail_report_run(report_id, "No report data generated")
+        return None
+    
+    # Update report with results using a new session
+    report_data["timings"] = timer.summary()
+    if profiler:
+        report_data["profile"] = profiler.summary()
+    with timer.phase("persist"):
+        update_report_status(report_id, "Complete", result=report_data)
+    ReportCheckpoint.discard(report_id)
+    timer.observe()
+    timer.log(f"Report {report_id}")
+    
+    logger.info(f"Successfully generated report {report_id}")
+    return report_data
@@ -0,0 +1,19 @@
+from app.celery_app import celery_app
+from app.services.uptime_rollup import refresh_rollup
+from app.db.database import get_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(name='refresh_uptime_rollup')
+def refresh_uptime_rollup():
+    """Periodically roll up new observations into the hourly uptime table."""
+    db = next(get_db())
+    try:
+        return refresh_rollup(db)
+    except Exception as e:
+        logger.error(f"Error refreshing uptime rollup: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
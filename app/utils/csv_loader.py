@@ -1,10 +1,24 @@
+import argparse
+import csv
+import time
 import pandas as pd
 from sqlalchemy.orm import Session
-from app.models.store import StoreStatus, StoreStatusEnum
 from app.models.timezone import StoreTimezone
 from app.models.hours import BusinessHour
+from app.models.ingest import IngestCheckpoint
 from datetime import datetime
+from functools import partial
+from uuid import uuid4
 from app.db.database import get_db
+from app.services.metadata_cache import metadata_cache
+from app.services.metrics import INGEST_BATCH_SECONDS, INGEST_ROWS
+from app.services.report_watermark import bump_ingest_version, init_store_directory
+from app.services.status_ingest import normalize_status_frame, bulk_insert, ingest_status_frame
+from app.services.status_intervals import compact_status_intervals
+from app.services.store_directory import add_stores
+from app.services.uptime_rollup import mark_all_rollup_dirty, rollup_horizon
+from app.settings import settings
+from typing import Callable
 import os
 
 
@@ -12,44 +26,123 @@ def parse_timestamp(timestamp_str: str) -> datetime:
     return datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S.%f %Z")
 
 
-def load_and_insert_csv_data(db: Session):
-    # 1. Load store_status.csv
-    df_status = pd.read_csv("../data/store_status.csv")
-    status_data = [
-        StoreStatus(
-            store_id=row["store_id"],
-            status=StoreStatusEnum(row["status"]),
-            timestamp_utc=parse_timestamp(row["timestamp_utc"])
-        )
-        for _, row in df_status.iterrows()
-    ]
-    db.bulk_save_objects(status_data)
+def file_identity(path: str) -> str:
+    """Checkpoint key of a file; a newer export of the same name gets a fresh checkpoint."""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def skip_csv_rows(csv_file, rows: int):
+    """Move a CSV file past its next `rows` rows, counted the way pd.read_csv counts them.
+
+    Blank and whitespace-only lines are not rows, and a quoted field may
+    span lines, so physical lines cannot be skipped by count.
+    """
+    if not rows:
+        return
+    for row in csv.reader(csv_file):
+        if len(row) > 1 or (row and row[0].strip()):
+            rows -= 1
+            if not rows:
+                return
+
+
+def load_csv_in_chunks(db: Session, path: str, prepare: Callable[[pd.DataFrame, str, int], pd.DataFrame],
+                       write: Callable[[Session, pd.DataFrame], None], chunksize: int) -> int:
+    """Stream a CSV file into the database chunk by chunk, resuming from its checkpoint.
+
+    Each chunk and the checkpoint advance are committed together, so an
+    interrupted load restarts right after the last committed chunk. The
+    checkpoint is deleted with the last chunk of a completed load.
+    """
+    source, identity = os.path.basename(path), file_identity(path)
+    checkpoint = db.get(IngestCheckpoint, identity)
+    if checkpoint is None:
+        checkpoint = IngestCheckpoint(source=identity, load_id=uuid4().hex, rows_loaded=0)
+        db.add(checkpoint)
+        db.commit()
+
+    if checkpoint.rows_loaded:
+        print(f"[INFO] Resuming {source} after {checkpoint.rows_loaded} rows")
+
+    started = time.monotonic()
+    loaded = 0
+    with open(path, newline="") as csv_file:
+        columns = next(csv.reader([csv_file.readline()]))
+        # Skip committed rows as they stream by rather than handing pandas every skipped row number
+        skip_csv_rows(csv_file, checkpoint.rows_loaded)
+        reader = pd.read_csv(csv_file, dtype=str, chunksize=chunksize, header=None, names=columns)
+        for chunk in reader:
+            if chunk.empty:
+                continue
+            batch_started = time.monotonic()
+            write(db, prepare(chunk, checkpoint.load_id, checkpoint.rows_loaded))
+            checkpoint.rows_loaded += len(chunk)
+            db.commit()
+            INGEST_BATCH_SECONDS.labels(source=source).observe(time.monotonic() - batch_started)
+            INGEST_ROWS.labels(source=source).inc(len(chunk))
+
+            loaded += len(chunk)
+            elapsed = time.monotonic() - started
+            print(f"[INFO] {source}: {checkpoint.rows_loaded} rows loaded ({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    db.delete(checkpoint)
     db.commit()
+    return loaded
+
+
+def prepare_status_chunk(chunk: pd.DataFrame, load_id: str, first_row: int) -> pd.DataFrame:
+    """Generate ids from the load and the row position, so re-running a chunk of this load produces the same keys."""
+    chunk = chunk.copy()
+    chunk["id"] = f"{load_id}:" + pd.Series(range(first_row, first_row + len(chunk)), index=chunk.index).astype(str)
+    return normalize_status_frame(chunk)
+
+
+def prepare_business_hours_chunk(chunk: pd.DataFrame, load_id: str, first_row: int) -> pd.DataFrame:
+    chunk = chunk[["store_id", "dayOfWeek", "start_time_local", "end_time_local"]].copy()
+    chunk["dayOfWeek"] = chunk["dayOfWeek"].astype(int)
+    return chunk
+
+
+def prepare_timezone_chunk(chunk: pd.DataFrame, load_id: str, first_row: int) -> pd.DataFrame:
+    return chunk[["store_id", "timezone_str"]]
+
+
+def load_and_insert_csv_data(db: Session, data_dir: str = "../data", chunksize: int = None):
+    chunksize = chunksize or settings.INGEST_CHUNK_SIZE
+    # A first load fills the stores dimension as it goes
+    init_store_directory(db)
+
+    # 1. Load store_status.csv
+    load_csv_in_chunks(
+        db, os.path.join(data_dir, "store_status.csv"),
+        prepare_status_chunk, partial(ingest_status_frame, defer_intervals=True), chunksize
+    )
+    # Compact the loaded observations into status runs in one pass
+    compact_status_intervals(db)
 
     # 2. Load menu_hours.csv
-    df_menu = pd.read_csv("../data/menu_hours.csv")
-    menu_data = [
-        BusinessHour(
-            store_id=row["store_id"],
-            dayOfWeek=row["dayOfWeek"],
-            start_time_local=row["start_time_local"],
-            end_time_local=row["end_time_local"]
-        )
-        for _, row in df_menu.iterrows()
-    ]
-    db.bulk_save_objects(menu_data)
-    db.commit()
+    load_csv_in_chunks(
+        db, os.path.join(data_dir, "menu_hours.csv"),
+        prepare_business_hours_chunk,
+        lambda session, frame: bulk_insert(session, BusinessHour.__table__, add_stores(session, frame)),
+        chunksize
+    )
 
     # 3. Load timezones.csv
-    df_tz = pd.read_csv("../data/timezones.csv")
-    tz_data = [
-        StoreTimezone(
-            store_id=row["store_id"],
-            timezone_str=row["timezone_str"]
-        )
-        for _, row in df_tz.iterrows()
-    ]
-    db.bulk_save_objects(tz_data)
+    load_csv_in_chunks(
+        db, os.path.join(data_dir, "timezones.csv"),
+        prepare_timezone_chunk,
+        lambda session, frame: bulk_insert(session, StoreTimezone.__table__, add_stores(session, frame)),
+        chunksize
+    )
+
+    # Business hours and timezones changed, drop cached store metadata and re-roll
+    metadata_cache.invalidate()
+    horizon = rollup_horizon(db)
+    if horizon is not None:
+        mark_all_rollup_dirty(db, horizon)
+    bump_ingest_version(db)
     db.commit()
 
     print("[INFO] ✅ All CSV files successfully inserted into the database.")
@@ -77,5 +170,14 @@ def get_report_file(report_id: str = "b7bda8fc-7dde-4c96-aba4-276c75989e43") ->
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the store CSV files into the database")
+    parser.add_argument("--data-dir", default="../data")
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="drop the checkpoints of interrupted loads and load every file from its first row")
+    args = parser.parse_args()
+
     db = next(get_db())
-    load_and_insert_csv_data(db)
\ No newline at end of file
+    if args.restart:
+        db.query(IngestCheckpoint).delete()
+        db.commit()
+    load_and_insert_csv_data(db, args.data_dir, args.chunksize)
\ No newline at end of file
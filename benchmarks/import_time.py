@@ -0,0 +1,90 @@
+# benchmarks/import_time.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What the API and a Celery worker import before they can serve anything
+DEFAULT_TARGETS = ("app.main", "app.tasks.report_tasks")
+# Modules a cold API start should not pay for
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "celery", "pytz")
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Parse the `-X importtime` lines into self and cumulative milliseconds per module."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2),
+        })
+    return modules
+
+
+def measure_import(target: str) -> dict:
+    """Import one module in a fresh interpreter and break its import time down per module."""
+    code = (
+        f"import sys, time; started = time.perf_counter(); import {target}; "
+        f"print(time.perf_counter() - started); print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    process_seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr[-2000:]}")
+
+    import_seconds, heavy = completed.stdout.splitlines()[-2:]
+    return {
+        "import_seconds": round(float(import_seconds), 4),
+        "process_seconds": round(process_seconds, 4),
+        "heavy_modules": [module for module in heavy.split(",") if module],
+        "modules": parse_importtime(completed.stderr),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the API and worker entry points")
+    parser.add_argument("targets", nargs="*", default=list(DEFAULT_TARGETS), help="modules to import")
+    parser.add_argument("--top", type=int, default=15, help="modules listed per target")
+    parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative",
+                        help="rank modules by cumulative (with their imports) or self time")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.targets:
+        result = results[target] = measure_import(target)
+        print(f"[INFO] {target}: import {result['import_seconds']:.3f}s, "
+              f"interpreter {result['process_seconds']:.3f}s, "
+              f"heavy modules loaded: {', '.join(result['heavy_modules']) or 'none'}")
+        key = f"{args.sort}_ms"
+        # The target and its parent packages top the cumulative ranking and say nothing new
+        ranked = sorted(
+            (m for m in result["modules"] if not (target + ".").startswith(m["module"] + ".")),
+            key=lambda m: m[key], reverse=True
+        )
+        for module in ranked[:args.top]:
+            print(f"  {module['module']:50} {module['cumulative_ms']:>9.1f} ms cumulative  {module['self_ms']:>8.1f} ms self")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+        print(f"[INFO] Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
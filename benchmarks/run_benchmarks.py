@@ -0,0 +1,238 @@
+# benchmarks/run_benchmarks.py
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from benchmarks.synthetic_data import add_config_arguments, config_from_arguments, generate_dataset
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metrics checked against the baseline; lower is better for all of them
+COMPARED_METRICS = ("seconds", "peak_memory_mb")
+# Stages faster than this are dominated by noise and never count as a timing regression
+NOISE_FLOOR_SECONDS = 0.05
+
+
+def measure(run: Callable[[], object], items: int, unit: str) -> Tuple[dict, object]:
+    """Run one stage, recording wall time, CPU time and the tracemalloc peak."""
+    gc.collect()
+    tracemalloc.start()
+    started, cpu_started = time.perf_counter(), time.process_time()
+    value = run()
+    seconds, cpu_seconds = time.perf_counter() - started, time.process_time() - cpu_started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / seconds, 2) if seconds else None,
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+    }, value
+
+
+def run_stages(data_dir: str, sample_stores: int, engines: List[str]) -> dict:
+    """Time every stage against the database in DATABASE_URL, which is wiped first."""
+    # Imported here so the worker picks up the DATABASE_URL set by the parent
+    import app.models
+    import app.models.report
+    from app.db.database import Base, SessionLocal, engine
+    from app.services.metadata_cache import metadata_cache
+    from app.services.report_generator import calculate_uptime_downtime, discover_stores, generate_report
+    from app.services.uptime_engine import REPORT_WINDOWS
+    from app.services.uptime_rollup import refresh_rollup
+    from app.settings import settings
+    from app.utils.csv_loader import load_and_insert_csv_data
+
+    with open(os.path.join(data_dir, "dataset.json")) as manifest:
+        status_rows = json.load(manifest)["rows"]["store_status.csv"]
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    results = {}
+    db = SessionLocal()
+    try:
+        results["load_and_insert_csv_data"], _ = measure(
+            lambda: load_and_insert_csv_data(db, data_dir), status_rows, "rows"
+        )
+
+        store_ids, latest_timestamp = discover_stores(db)
+        sample = store_ids[:sample_stores]
+        metadata_cache.invalidate()
+        results["calculate_uptime_downtime"], _ = measure(
+            lambda: [
+                calculate_uptime_downtime(db, store_id, latest_timestamp - length, latest_timestamp)
+                for store_id in sample
+                for length in REPORT_WINDOWS.values()
+            ],
+            len(sample), "stores"
+        )
+
+        for report_engine in engines:
+            settings.REPORT_ENGINE = report_engine
+            if report_engine == "rollup":
+                results["refresh_rollup"], _ = measure(lambda: refresh_rollup(db), len(store_ids), "stores")
+
+            metadata_cache.invalidate()
+            results[f"generate_report[{report_engine}]"], summary = measure(
+                lambda: generate_report(db), len(store_ids), "stores"
+            )
+            if not summary:
+                raise RuntimeError(f"generate_report produced no report with REPORT_ENGINE={report_engine}")
+            for path in (summary["filepath"], summary.get("parquet_path")):
+                if path and os.path.exists(path):
+                    os.remove(path)
+    finally:
+        db.close()
+    return results
+
+
+def run_backend(database_url: str, data_dir: str, sample_stores: int, engines: List[str]) -> dict:
+    """Run the stages in a fresh interpreter bound to the given database."""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as output:
+        output_path = output.name
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "ENVIRONMENT": os.getenv("ENVIRONMENT", "development"),
+        "JWT_SECRET": os.getenv("JWT_SECRET", "benchmark"),
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.run_benchmarks", "--worker",
+        "--data-dir", data_dir, "--worker-output", output_path,
+        "--sample-stores", str(sample_stores), "--engines", ",".join(engines),
+    ]
+    try:
+        completed = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stdout[-5000:], completed.stderr[-5000:], sep="\n", file=sys.stderr)
+            raise RuntimeError(f"Benchmark worker failed with exit code {completed.returncode}")
+        with open(output_path) as results:
+            return json.load(results)
+    finally:
+        os.remove(output_path)
+
+
+def compare_results(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Return a description of every stage metric that got worse than the allowed ratio."""
+    if current["dataset"] != baseline.get("dataset"):
+        print("[WARN] Baseline was recorded on a different dataset, comparison may be meaningless")
+
+    regressions = []
+    for backend, stages in current["results"].items():
+        for stage, metrics in stages.items():
+            previous = baseline.get("results", {}).get(backend, {}).get(stage)
+            if not previous:
+                continue
+            for metric in COMPARED_METRICS:
+                before, after = previous.get(metric), metrics.get(metric)
+                if not before or after is None:
+                    continue
+                if metric == "seconds" and before < NOISE_FLOOR_SECONDS and after < NOISE_FLOOR_SECONDS:
+                    continue
+                if after > before * (1 + max_regression):
+                    regressions.append(
+                        f"{backend} {stage} {metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest and report generation on synthetic data")
+    add_config_arguments(parser)
+    parser.add_argument("--data-dir", default=None, help="keep the generated CSV files in this directory")
+    parser.add_argument("--sample-stores", type=int, default=200,
+                        help="stores timed with the per-store calculate_uptime_downtime")
+    parser.add_argument("--engines", default="vectorized,intervals,rollup,sql", help="comma-separated REPORT_ENGINE values")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed relative slowdown or memory growth before failing")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+
+    if args.worker:
+        results = run_stages(args.data_dir, args.sample_stores, engines)
+        with open(args.worker_output, "w") as output:
+            json.dump(results, output)
+        return
+
+    config = config_from_arguments(args)
+    workdir = tempfile.mkdtemp(prefix="store-monitor-benchmark-")
+    data_dir = os.path.abspath(args.data_dir or os.path.join(workdir, "data"))
+    print(f"[INFO] Generating {config.stores} stores into {data_dir}")
+    rows = generate_dataset(data_dir, config)
+
+    backends = {"sqlite": f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"}
+    if os.getenv("BENCHMARK_POSTGRES_URL"):
+        # Every table in this database is dropped and recreated
+        backends["postgresql"] = os.getenv("BENCHMARK_POSTGRES_URL")
+    else:
+        print("[INFO] BENCHMARK_POSTGRES_URL not set, skipping PostgreSQL")
+
+    report = {
+        "dataset": {"config": asdict(config), "rows": rows},
+        "environment": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "recorded_at": datetime.now().isoformat(),
+        "results": {},
+    }
+    try:
+        for backend, database_url in backends.items():
+            print(f"[INFO] Running stages on {backend}")
+            report["results"][backend] = run_backend(database_url, data_dir, args.sample_stores, engines)
+            for stage, metrics in report["results"][backend].items():
+                print(f"  {stage:40} {metrics['seconds']:>9.3f}s  {metrics['throughput'] or 0:>12,.0f} "
+                      f"{metrics['unit']}/s  peak {metrics['peak_memory_mb']:>8.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output_path = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", "results", f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"[INFO] Results saved to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare_results(report, json.load(baseline), args.max_regression)
+        if regressions:
+            print("[ERROR] Performance regressions against the baseline:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("[INFO] No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
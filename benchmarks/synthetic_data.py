@@ -0,0 +1,142 @@
+# benchmarks/synthetic_data.py
+
+import argparse
+import json
+import os
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+# Zones that switch to daylight saving time inside the default window, and zones that never do
+DST_TIMEZONES = ["America/Chicago", "America/New_York", "America/Denver", "America/Los_Angeles"]
+FIXED_TIMEZONES = ["UTC", "Asia/Kolkata", "Asia/Tokyo", "Africa/Lagos"]
+
+STATUS_VALUES = np.array(["active", "inactive"])
+
+
+@dataclass
+class SyntheticDataConfig:
+    """Shape of a generated dataset."""
+    stores: int = 1000
+    observations_per_hour: float = 1.0
+    days: int = 8  # history before end_utc, the report needs one week
+    always_open_share: float = 0.1  # stores without business hours, i.e. open 24/7
+    dst_share: float = 0.5  # stores in zones whose week crosses a DST switch
+    missing_timezone_share: float = 0.05  # stores without a timezones.csv row
+    overnight_share: float = 0.05  # stores closing after midnight
+    inactive_share: float = 0.1  # chance an observation reports the store inactive
+    end_utc: str = "2023-03-14 12:00:00"  # US DST starts 2023-03-12, inside the report week
+    seed: int = 42
+
+
+def _store_ids(rng: np.random.Generator, count: int) -> np.ndarray:
+    return np.array([str(uuid.UUID(bytes=rng.bytes(16))) for _ in range(count)])
+
+
+def _format_timestamps(epoch_us: np.ndarray) -> pd.Series:
+    """Render epoch microseconds in the 'YYYY-MM-DD HH:MM:SS.ffffff UTC' format of store_status.csv."""
+    text = np.datetime_as_string(epoch_us.astype("datetime64[us]"), unit="us")
+    return pd.Series(text).str.replace("T", " ", regex=False) + " UTC"
+
+
+def generate_timezones(rng: np.random.Generator, store_ids: np.ndarray, config: SyntheticDataConfig) -> pd.DataFrame:
+    in_dst_zone = rng.random(len(store_ids)) < config.dst_share
+    zones = np.where(
+        in_dst_zone,
+        rng.choice(DST_TIMEZONES, len(store_ids)),
+        rng.choice(FIXED_TIMEZONES, len(store_ids))
+    )
+    has_row = rng.random(len(store_ids)) >= config.missing_timezone_share
+    return pd.DataFrame({"store_id": store_ids[has_row], "timezone_str": zones[has_row]})
+
+
+def generate_business_hours(rng: np.random.Generator, store_ids: np.ndarray,
+                            config: SyntheticDataConfig) -> pd.DataFrame:
+    scheduled = store_ids[rng.random(len(store_ids)) >= config.always_open_share]
+    stores = np.repeat(scheduled, 7)
+    days = np.tile(np.arange(7), len(scheduled))
+
+    opens = rng.integers(5 * 3600, 11 * 3600, len(stores)) // 60 * 60
+    closes = rng.integers(15 * 3600, 23 * 3600, len(stores)) // 60 * 60
+    overnight = np.repeat(rng.random(len(scheduled)) < config.overnight_share, 7)
+    closes = np.where(overnight, rng.integers(0, 3 * 3600, len(stores)) // 60 * 60, closes)
+
+    def as_time(seconds: np.ndarray) -> list:
+        return [f"{value // 3600:02d}:{value % 3600 // 60:02d}:00" for value in seconds.tolist()]
+
+    return pd.DataFrame({
+        "store_id": stores,
+        "dayOfWeek": days,
+        "start_time_local": as_time(opens),
+        "end_time_local": as_time(closes),
+    })
+
+
+def generate_status(rng: np.random.Generator, store_ids: np.ndarray, config: SyntheticDataConfig) -> pd.DataFrame:
+    end_us = int(pd.Timestamp(config.end_utc, tz="UTC").value // 1000)
+    span_us = int(timedelta(days=config.days) / timedelta(microseconds=1))
+    per_store = rng.poisson(config.observations_per_hour * config.days * 24, len(store_ids))
+
+    stores = np.repeat(store_ids, per_store)
+    timestamps = end_us - rng.integers(0, span_us, len(stores))
+    statuses = np.where(rng.random(len(stores)) < config.inactive_share, STATUS_VALUES[1], STATUS_VALUES[0])
+    return pd.DataFrame({
+        "store_id": stores,
+        "status": statuses,
+        "timestamp_utc": _format_timestamps(timestamps),
+    })
+
+
+def generate_dataset(output_dir: str, config: SyntheticDataConfig) -> dict:
+    """Write store_status.csv, menu_hours.csv and timezones.csv; return row counts."""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(config.seed)
+    store_ids = _store_ids(rng, config.stores)
+
+    frames = {
+        "timezones.csv": generate_timezones(rng, store_ids, config),
+        "menu_hours.csv": generate_business_hours(rng, store_ids, config),
+        "store_status.csv": generate_status(rng, store_ids, config),
+    }
+    counts = {}
+    for filename, frame in frames.items():
+        frame.to_csv(os.path.join(output_dir, filename), index=False)
+        counts[filename] = len(frame)
+
+    with open(os.path.join(output_dir, "dataset.json"), "w") as manifest:
+        json.dump({"config": asdict(config), "rows": counts, "generated_at": datetime.now().isoformat()}, manifest, indent=2)
+    return counts
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    defaults = SyntheticDataConfig()
+    parser.add_argument("--stores", type=int, default=defaults.stores)
+    parser.add_argument("--observations-per-hour", type=float, default=defaults.observations_per_hour)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--always-open-share", type=float, default=defaults.always_open_share)
+    parser.add_argument("--dst-share", type=float, default=defaults.dst_share)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_arguments(args: argparse.Namespace) -> SyntheticDataConfig:
+    return SyntheticDataConfig(
+        stores=args.stores,
+        observations_per_hour=args.observations_per_hour,
+        days=args.days,
+        always_open_share=args.always_open_share,
+        dst_share=args.dst_share,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic store CSV files")
+    parser.add_argument("--output-dir", default="benchmarks/data")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    counts = generate_dataset(args.output_dir, config_from_arguments(args))
+    for filename, rows in counts.items():
+        print(f"[INFO] {filename}: {rows} rows")
@@ -0,0 +1,53 @@
+# tests/conftest.py
+
+import os
+import shutil
+import tempfile
+
+# The app reads its settings on import, so point it at a throwaway database first
+WORKDIR = tempfile.mkdtemp(prefix="store-monitor-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ.setdefault("ENVIRONMENT", "development")
+os.environ.setdefault("JWT_SECRET", "test")
+
+import pytest
+from benchmarks.synthetic_data import SyntheticDataConfig, generate_dataset
+
+# Enough stores to cover DST zones, overnight hours, 24/7 stores and missing timezones
+TEST_STORES = 150
+
+
+@pytest.fixture(scope="session")
+def loaded_db():
+    """Session on a SQLite database loaded with a small synthetic dataset."""
+    import app.models
+    import app.models.report
+    from app.db.database import Base, SessionLocal, engine
+    from app.utils.csv_loader import load_and_insert_csv_data
+
+    Base.metadata.create_all(engine)
+    data_dir = os.path.join(WORKDIR, "data")
+    generate_dataset(data_dir, SyntheticDataConfig(stores=TEST_STORES))
+    db = SessionLocal()
+    load_and_insert_csv_data(db, data_dir)
+    yield db
+    db.close()
+    engine.dispose()
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def report_input(loaded_db):
+    """Store ids and report end time, as a report run discovers them."""
+    from app.services.report_generator import discover_stores
+
+    return discover_stores(loaded_db)
+
+
+@pytest.fixture(scope="session")
+def reference_rows(loaded_db, report_input):
+    """Report rows of the per-store reference calculation, by store."""
+    from app.services.report_generator import generate_report_per_store
+
+    store_ids, latest_timestamp = report_input
+    return {row["store_id"]: row for row in generate_report_per_store(loaded_db, store_ids, latest_timestamp)}
@@ -0,0 +1,79 @@
+# tests/test_business_hours.py
+
+import numpy as np
+import pytest
+from collections import namedtuple
+from datetime import datetime, timezone
+from app.services.business_hours import DAY_SECONDS, WEEK_SECONDS, BusinessHoursIndex, to_epoch
+
+HOUR = 3600
+Hours = namedtuple("Hours", "dayOfWeek start_time_local end_time_local")
+
+
+def open_hours(index, timezone_str, start_time, end_time):
+    starts, ends = index.utc_intervals(timezone_str, start_time, end_time)
+    return float(np.sum(ends - starts)) / HOUR
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_overnight_hours_close_on_the_next_day():
+    index = BusinessHoursIndex.from_rows([Hours(0, "22:00:00", "02:00:00")])
+    assert index.week_intervals == ((22 * HOUR, DAY_SECONDS + 2 * HOUR),)
+    assert index.is_open(DAY_SECONDS + HOUR)
+    assert not index.is_open(21 * HOUR)
+    assert not index.is_open(DAY_SECONDS + 2 * HOUR)
+
+
+def test_sunday_night_spills_into_monday():
+    index = BusinessHoursIndex.from_seconds([(6, 22 * HOUR, 3 * HOUR)])
+    assert index.week_intervals == ((0, 3 * HOUR), (6 * DAY_SECONDS + 22 * HOUR, WEEK_SECONDS))
+    assert index.is_open(2 * HOUR)
+    assert index.is_open(WEEK_SECONDS - 1)
+    assert not index.is_open(4 * HOUR)
+
+
+def test_overlapping_entries_merge():
+    index = BusinessHoursIndex.from_seconds([(2, 9 * HOUR, 13 * HOUR), (2, 12 * HOUR, 17 * HOUR)])
+    assert index.week_intervals == ((2 * DAY_SECONDS + 9 * HOUR, 2 * DAY_SECONDS + 17 * HOUR),)
+
+
+def test_invalid_times_parse_as_midnight():
+    index = BusinessHoursIndex.from_rows([Hours(1, "9am", "17:00:00")])
+    assert index.week_intervals == ((DAY_SECONDS, DAY_SECONDS + 17 * HOUR),)
+
+
+@pytest.mark.parametrize("day, expected", [
+    # 2023-03-12 02:00 does not exist in New York, the night is an hour shorter
+    (utc(2023, 3, 12), 5.0),
+    # 2023-11-05 01:00-02:00 happens twice, the night is an hour longer
+    (utc(2023, 11, 5), 7.0),
+    (utc(2023, 3, 19), 6.0),
+])
+def test_dst_changes_the_length_of_a_night(day, expected):
+    # Sunday 00:00-06:00 local time
+    index = BusinessHoursIndex.from_seconds([(6, 0, 6 * HOUR)])
+    assert open_hours(index, "America/New_York", day, utc(day.year, day.month, day.day + 1)) == expected
+
+
+def test_overnight_hours_across_spring_forward():
+    # Saturday 22:00 to Sunday 04:00 local time, through the skipped hour
+    index = BusinessHoursIndex.from_seconds([(5, 22 * HOUR, 4 * HOUR)])
+    starts, ends = index.utc_intervals("America/New_York", utc(2023, 3, 11), utc(2023, 3, 13))
+    assert list(zip(starts, ends)) == [(to_epoch(utc(2023, 3, 12, 3)), to_epoch(utc(2023, 3, 12, 8)))]
+
+
+def test_open_seconds_clip_to_the_window():
+    # Monday 09:00-17:00 local time, 16:00-24:00 UTC in Los Angeles summer time
+    index = BusinessHoursIndex.from_seconds([(0, 9 * HOUR, 17 * HOUR)])
+    start_time, end_time = utc(2023, 7, 10, 15), utc(2023, 7, 11)
+    points = np.array([to_epoch(utc(2023, 7, 10, 12)), to_epoch(utc(2023, 7, 10, 18)), to_epoch(end_time)])
+    assert list(index.open_seconds("America/Los_Angeles", start_time, end_time, points)) == [0, 2 * HOUR, 8 * HOUR]
+
+
+def test_stores_without_hours_are_always_open():
+    index = BusinessHoursIndex.from_rows([])
+    assert index.always_open and index.is_open(0)
+    assert open_hours(index, "America/Chicago", utc(2023, 3, 12), utc(2023, 3, 13)) == 24.0
@@ -0,0 +1,45 @@
+# tests/test_csv_loader.py
+
+import pytest
+from app.models.ingest import IngestCheckpoint
+from app.utils.csv_loader import file_identity, load_csv_in_chunks, prepare_status_chunk
+
+HEADER = "store_id,status,timestamp_utc\n"
+ROWS = [f"store-{row},active,2000-01-01 00:{row:02d}:00.000000 UTC\n" for row in range(10)]
+
+
+def write_csv(path, blank_after=()):
+    with open(path, "w") as csv_file:
+        csv_file.write(HEADER)
+        for row, line in enumerate(ROWS):
+            csv_file.write(line)
+            if row in blank_after:
+                csv_file.write("\n   \n")
+
+
+@pytest.mark.parametrize("blank_after", [(), (0, 1, 4, 6)])
+def test_interrupted_load_resumes_after_the_committed_rows(loaded_db, tmp_path, blank_after):
+    path = tmp_path / "store_status.csv"
+    write_csv(path, blank_after)
+    written = []
+
+    def write_until_third_chunk(db, frame):
+        if len(written) == 2:
+            raise RuntimeError("connection lost")
+        written.append(frame)
+
+    with pytest.raises(RuntimeError):
+        load_csv_in_chunks(loaded_db, str(path), prepare_status_chunk, write_until_third_chunk, chunksize=3)
+    loaded_db.rollback()
+    checkpoint = loaded_db.get(IngestCheckpoint, file_identity(str(path)))
+    assert checkpoint.rows_loaded == 6
+
+    def write(db, frame):
+        written.append(frame)
+
+    assert load_csv_in_chunks(loaded_db, str(path), prepare_status_chunk, write, chunksize=3) == 4
+    assert loaded_db.get(IngestCheckpoint, file_identity(str(path))) is None
+
+    loaded = [row for frame in written for row in frame.itertuples()]
+    assert [row.store_id for row in loaded] == [f"store-{row}" for row in range(10)]
+    assert [row.id for row in loaded] == [f"{checkpoint.load_id}:{row}" for row in range(10)]
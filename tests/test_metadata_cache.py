@@ -0,0 +1,86 @@
+# tests/test_metadata_cache.py
+
+import pytest
+from app.services import metadata_cache as cache_module
+from app.services.metadata_cache import StoreMetadataCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def comparable(metadata):
+    return {
+        store_id: (entry.timezone_str, sorted(entry.business_hours), entry.hours_index.week_intervals)
+        for store_id, entry in metadata.items()
+    }
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_repeated_lookups_hit_the_cache(loaded_db, report_input):
+    store_ids = report_input[0][:20]
+    cache = StoreMetadataCache(maxsize=100, ttl_seconds=60)
+    first = cache.get_many(loaded_db, store_ids)
+    assert cache.get_many(loaded_db, store_ids) == first
+    assert cache.stats() == {"hits": 20, "misses": 20, "evictions": 0, "size": 20}
+
+
+def test_bulk_and_chunked_loads_agree(loaded_db, report_input, monkeypatch):
+    store_ids = report_input[0]
+    chunked = StoreMetadataCache(maxsize=1000, ttl_seconds=60).get_many(loaded_db, store_ids)
+    monkeypatch.setattr(cache_module, "BULK_LOAD_THRESHOLD", 10)
+    bulk = StoreMetadataCache(maxsize=1000, ttl_seconds=60).get_many(loaded_db, store_ids)
+    assert comparable(bulk) == comparable(chunked)
+    assert any(metadata.business_hours for metadata in chunked.values())
+    assert any(metadata.timezone_str is None for metadata in chunked.values())
+
+
+def test_entries_expire_after_the_ttl(loaded_db, report_input, clock):
+    store_id = report_input[0][0]
+    cache = StoreMetadataCache(maxsize=100, ttl_seconds=60)
+    cache.get(loaded_db, store_id)
+    clock.now += 60
+    cache.get(loaded_db, store_id)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    clock.now += 61
+    generation = cache.generation
+    cache.get(loaded_db, store_id)
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 2, 1)
+    assert cache.generation == generation + 1
+
+
+def test_least_recently_used_entries_are_evicted(loaded_db, report_input):
+    first, second, third = report_input[0][:3]
+    cache = StoreMetadataCache(maxsize=2, ttl_seconds=60)
+    cache.get_many(loaded_db, [first, second])
+    cache.get(loaded_db, first)
+    cache.get(loaded_db, third)
+    assert list(cache._entries) == [first, third]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_entries(loaded_db, report_input):
+    store_ids = report_input[0][:5]
+    cache = StoreMetadataCache(maxsize=100, ttl_seconds=60)
+    cache.warm(loaded_db, store_ids)
+    generation = cache.generation
+
+    cache.invalidate(store_ids[:2])
+    assert set(cache._entries) == set(store_ids[2:])
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+    assert cache.generation == generation + 2
+
+    cache.get_many(loaded_db, store_ids)
+    assert cache.misses == 5
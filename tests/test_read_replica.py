@@ -0,0 +1,61 @@
+# tests/test_read_replica.py
+
+import pytest
+from app.services import read_replica as replica_module
+from app.services.read_replica import ReadReplica, ReplicaState
+from app.settings import settings
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """A configured replica whose sessions name their target, with a settable state."""
+    monkeypatch.setattr(ReadReplica, "configured", True)
+    monkeypatch.setattr(replica_module, "ReadSessionLocal", lambda: "replica")
+    monkeypatch.setattr(replica_module, "SessionLocal", lambda: "primary")
+    monkeypatch.setattr(settings, "REPORT_ENGINE", "vectorized")
+    states = []
+
+    def check_replica():
+        if isinstance(states[-1], Exception):
+            raise states[-1]
+        return states[-1]
+
+    monkeypatch.setattr(replica_module, "check_replica", check_replica)
+    return ReadReplica(max_lag_seconds=30, check_seconds=5), states
+
+
+@pytest.mark.parametrize("state, target", [
+    (ReplicaState(caught_up=True, lag_seconds=0.0), "replica"),
+    (ReplicaState(caught_up=False, lag_seconds=12.0), "replica"),
+    (ReplicaState(caught_up=False, lag_seconds=30.0), "replica"),
+    (ReplicaState(caught_up=False, lag_seconds=31.0), "primary"),
+    (ReplicaState(caught_up=False, lag_seconds=float("inf")), "primary"),
+    (ConnectionError("replica down"), "primary"),
+])
+def test_scan_session_routes_by_lag(routed, state, target):
+    replica, states = routed
+    states.append(state)
+    assert replica.scan_session() == target
+
+
+def test_scan_session_rechecks_every_run(routed):
+    replica, states = routed
+    states.append(ReplicaState(caught_up=False, lag_seconds=5.0))
+    assert replica.scan_session() == "replica"
+    states.append(ReplicaState(caught_up=False, lag_seconds=300.0))
+    assert replica.scan_session() == "primary"
+
+
+def test_read_session_reuses_a_check(routed):
+    replica, states = routed
+    states.append(ReplicaState(caught_up=False, lag_seconds=5.0))
+    assert replica.read_session() == "replica"
+    states.append(ReplicaState(caught_up=False, lag_seconds=300.0))
+    assert replica.read_session() == "replica"
+
+
+def test_sql_engine_scans_the_primary(routed, monkeypatch):
+    replica, states = routed
+    monkeypatch.setattr(settings, "REPORT_ENGINE", "sql")
+    states.append(ReplicaState(caught_up=True, lag_seconds=0.0))
+    assert replica.scan_session() == "primary"
@@ -0,0 +1,109 @@
+# tests/test_report_checkpoint.py
+
+import importlib
+import os
+import pytest
+from uuid import uuid4
+from app.models.report import Report
+from app.services import report_generator, report_progress, report_writer
+from app.services.report_checkpoint import ReportCheckpoint
+from app.services.report_writer import report_parts_dir
+from app.settings import settings
+
+# The package attribute `app.tasks` is the legacy tasks module, import the task module itself
+report_tasks = importlib.import_module("app.tasks.report_tasks")
+
+BATCH_SIZE = 40
+
+
+@pytest.fixture
+def new_report(loaded_db, tmp_path, monkeypatch):
+    """Factory of running reports executed serially in batches, writing to a throwaway reports directory."""
+    monkeypatch.setattr(report_writer, "REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(report_tasks, "publish_report_event", lambda event: None)
+    monkeypatch.setattr(report_progress, "publish_report_event", lambda event: None)
+    monkeypatch.setattr(settings, "REPORT_PARQUET", False)
+    monkeypatch.setattr(settings, "REPORT_EXECUTION", "serial")
+    monkeypatch.setattr(settings, "REPORT_SCAN", "bulk")
+    monkeypatch.setattr(settings, "REPORT_SHARD_SIZE", BATCH_SIZE)
+
+    def create():
+        report_id = f"checkpoint-test-{uuid4()}"
+        loaded_db.add(Report(id=report_id, status="Pending"))
+        loaded_db.commit()
+        return report_id
+
+    return create
+
+
+def run_report(report_id):
+    return report_tasks.generate_store_report.apply(args=[report_id]).get()
+
+
+def read_report(result):
+    with open(result["filepath"]) as report_file:
+        return report_file.read()
+
+
+def test_resumed_run_matches_a_clean_run(loaded_db, report_input, new_report, monkeypatch):
+    store_ids, _ = report_input
+    clean = run_report(new_report())
+
+    report_id = new_report()
+    compute_store_rows = report_generator.compute_store_rows
+    batches, interrupted = [], []
+
+    def interrupt_third_batch(db, shard, *args, **kwargs):
+        batches.append(shard)
+        if len(batches) == 3:
+            interrupted.append(ReportCheckpoint.load(report_id))
+            raise RuntimeError("worker lost")
+        return compute_store_rows(db, shard, *args, **kwargs)
+
+    monkeypatch.setattr(report_generator, "compute_store_rows", interrupt_third_batch)
+    resumed = run_report(report_id)
+
+    # The first attempt saved two batches before it broke off
+    [checkpoint] = interrupted
+    assert checkpoint.attempts == 1
+    assert not checkpoint.dispatched
+    assert checkpoint.stores_done == 2 * BATCH_SIZE
+    assert checkpoint.cursor == store_ids[2 * BATCH_SIZE - 1]
+    assert [os.path.basename(part["path"]) for part in checkpoint.parts] == ["part-00000.csv", "part-00001.csv"]
+    # The retry started after the cursor, with the cut-off of the first attempt
+    assert batches[3][0] == store_ids[2 * BATCH_SIZE]
+    assert sum(len(shard) for shard in batches[3:]) == len(store_ids) - 2 * BATCH_SIZE
+
+    assert read_report(resumed) == read_report(clean)
+    assert resumed["total_stores_processed"] == clean["total_stores_processed"] == len(store_ids)
+    loaded_db.expire_all()
+    assert loaded_db.get(Report, report_id).status == "Complete"
+    assert not os.path.exists(report_parts_dir(report_id))
+
+
+def test_redelivered_task_does_not_dispatch_shards_again(loaded_db, new_report, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_EXECUTION", "celery")
+    report_id = new_report()
+    ReportCheckpoint.open(report_id).mark_dispatched()
+
+    def dispatch(*args, **kwargs):
+        raise AssertionError("shards were already dispatched")
+
+    monkeypatch.setattr(report_tasks, "dispatch_report_shards", dispatch)
+    assert run_report(report_id) == {"report_id": report_id, "shards": None}
+    assert ReportCheckpoint.load(report_id).attempts == 0
+
+
+def test_report_fails_after_max_retries(loaded_db, new_report, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_TASK_MAX_RETRIES", 2)
+    report_id = new_report()
+    checkpoint = ReportCheckpoint.open(report_id)
+    for _ in range(3):
+        checkpoint.start_attempt()
+
+    assert run_report(report_id) is None
+    loaded_db.expire_all()
+    report = loaded_db.get(Report, report_id)
+    assert report.status == "Failed"
+    assert report.error == "Report abandoned after 3 attempts"
+    assert ReportCheckpoint.load(report_id) is None
@@ -0,0 +1,91 @@
+# tests/test_report_download.py
+
+import csv
+import gzip
+import io
+import os
+import pytest
+import zlib
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.api import report as report_api
+from app.api.report import iter_file
+from app.main import app
+from app.models.report import Report
+from app.services.report_schema import REPORT_COLUMNS
+from app.services.report_writer import ReportWriter
+
+
+def report_row(number):
+    return {"store_id": f"store-{number:05d}", **{column: float(number) for column in REPORT_COLUMNS[1:]}}
+
+
+@pytest.fixture
+def client(loaded_db):
+    with TestClient(app) as client:
+        yield client
+
+
+def complete_report(db, result):
+    report_id = f"download-test-{uuid4()}"
+    db.add(Report(id=report_id, status="Complete", result=result))
+    db.commit()
+    return report_id
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_writer_publishes_the_file_on_close(tmp_path, compression):
+    path = str(tmp_path / ("report.csv.gz" if compression else "report.csv"))
+    writer = ReportWriter(path, compression=compression)
+    writer.write_rows([report_row(0), report_row(1)])
+    writer.write_rows([report_row(2)])
+    assert not os.path.exists(path)
+
+    summary = writer.close(total_stores=4)
+    assert (summary["total_stores_processed"], summary["total_stores"], summary["compression"]) == (3, 4, compression)
+    with (gzip.open(path, "rt") if compression else open(path)) as report_file:
+        assert list(csv.reader(report_file))[0] == REPORT_COLUMNS
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_aborted_writer_leaves_nothing(tmp_path):
+    writer = ReportWriter(str(tmp_path / "report.csv"))
+    writer.write_rows([report_row(0)])
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+
+
+def test_iter_file_streams_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_api, "CHUNK_SIZE", 1024)
+    path = tmp_path / "report.csv"
+    content = os.urandom(10 * 1024).hex().encode()
+    path.write_bytes(content)
+
+    chunks = list(iter_file(str(path)))
+    assert len(chunks) == 20 and max(map(len, chunks)) == 1024
+    assert b"".join(chunks) == content
+    assert zlib.decompress(b"".join(iter_file(str(path), gzip_output=True)), wbits=zlib.MAX_WBITS | 16) == content
+
+
+@pytest.mark.parametrize("stored, requested", [(None, None), (None, "gzip"), ("gzip", None)])
+def test_get_report_streams_the_csv(loaded_db, client, tmp_path, stored, requested):
+    path = str(tmp_path / ("report.csv.gz" if stored else "report.csv"))
+    writer = ReportWriter(path, compression=stored)
+    writer.write_rows(report_row(number) for number in range(2000))
+    report_id = complete_report(loaded_db, writer.close(total_stores=2000))
+
+    response = client.get(f"/get_report/{report_id}", params={"compression": requested} if requested else {})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="report.csv"'
+    assert response.headers.get("content-encoding") == ("gzip" if stored or requested else None)
+    assert response.headers["x-stores-processed"] == "2000"
+    # httpx decodes the gzip transfer, the body is the plain CSV either way
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 2000 and rows[-1]["store_id"] == "store-01999"
+
+
+def test_get_report_without_its_file(loaded_db, client, tmp_path):
+    report_id = complete_report(loaded_db, {"filepath": str(tmp_path / "gone.csv")})
+    assert client.get(f"/get_report/{report_id}").status_code == 404
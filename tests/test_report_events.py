@@ -0,0 +1,124 @@
+# tests/test_report_events.py
+
+import asyncio
+import importlib
+import json
+import threading
+import time
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.report import Report
+from app.services.report_events import ReportNotifier
+from app.settings import settings
+
+# The package attribute `app.tasks` is the legacy tasks module, import the task module itself
+report_tasks = importlib.import_module("app.tasks.report_tasks")
+
+# Nothing listens here, so the pub/sub side fails fast and only the direct paths deliver
+NO_REDIS = "redis://127.0.0.1:1/0"
+
+
+def event(report_id, status, progress=None):
+    return {"report_id": report_id, "status": status, "progress": progress}
+
+
+def running_report(db):
+    report_id = f"events-test-{uuid4()}"
+    db.add(Report(id=report_id, status="Running", progress=10.0))
+    db.commit()
+    return report_id
+
+
+def later(seconds, action, *args, **kwargs):
+    timer = threading.Timer(seconds, action, args, kwargs)
+    timer.start()
+    return timer
+
+
+def test_wait_wakes_on_the_terminal_event_from_another_thread():
+    async def scenario():
+        notifier = ReportNotifier(NO_REDIS, fallback_seconds=60)
+        queue = notifier.subscribe("r1")
+        other = notifier.subscribe("r2")
+        later(0.05, notifier.notify_threadsafe, event("r1", "Running", 50.0))
+        later(0.1, notifier.notify_threadsafe, event("r1", "Complete", 100.0))
+        try:
+            started = time.monotonic()
+            assert await notifier.wait(queue, 5) == event("r1", "Complete", 100.0)
+            assert time.monotonic() - started < 1
+            assert other.empty()
+            assert await notifier.wait(other, 0.05) is None
+        finally:
+            await notifier.stop()
+
+    asyncio.run(scenario())
+
+
+def test_database_check_finishes_waiters_whose_event_was_lost(loaded_db):
+    report_id = running_report(loaded_db)
+    loaded_db.get(Report, report_id).status = "Failed"
+    loaded_db.commit()
+
+    async def scenario():
+        notifier = ReportNotifier(NO_REDIS, fallback_seconds=0.05)
+        queue = notifier.subscribe(report_id)
+        try:
+            finished = await notifier.wait(queue, 5)
+        finally:
+            await notifier.stop()
+        return finished
+
+    assert asyncio.run(scenario())["status"] == "Failed"
+
+
+def test_stream_ends_with_the_terminal_event():
+    async def scenario():
+        notifier = ReportNotifier(NO_REDIS, fallback_seconds=60)
+        queue = notifier.subscribe("r1")
+        for update in (event("r1", "Running", 40.0), event("r1", "Complete", 100.0), event("r1", "Running")):
+            notifier.dispatch(update)
+        try:
+            messages = [message async for message in notifier.stream("r1", queue, event("r1", "Running", 10.0))]
+        finally:
+            await notifier.stop()
+        return messages, notifier.waiting
+
+    messages, waiting = asyncio.run(scenario())
+    assert [json.loads(message.split("data: ")[1])["progress"] for message in messages] == [10.0, 40.0, 100.0]
+    assert waiting == 0
+
+
+@pytest.fixture
+def client(loaded_db):
+    with TestClient(app) as client:
+        yield client
+
+
+def test_get_report_wait_returns_when_the_report_finishes(loaded_db, client):
+    report_id = running_report(loaded_db)
+    later(0.2, report_tasks.update_report_status, report_id, "Failed", error="boom")
+
+    started = time.monotonic()
+    response = client.get(f"/get_report/{report_id}", params={"wait": 30})
+    assert response.json() == {"status": "Failed", "error": "boom"}
+    # Woken by the event, well before the batched database check
+    assert time.monotonic() - started < settings.REPORT_WAIT_CHECK_SECONDS
+
+
+def test_get_report_wait_times_out_with_the_current_status(loaded_db, client):
+    report_id = running_report(loaded_db)
+    response = client.get(f"/get_report/{report_id}", params={"wait": 0.2})
+    assert response.json()["status"] == "Running"
+    assert response.json()["progress"] == 10.0
+
+
+def test_events_stream_until_the_report_finishes(loaded_db, client):
+    report_id = running_report(loaded_db)
+    later(0.2, report_tasks.update_report_status, report_id, "Complete", result={"total_stores": 1})
+
+    with client.stream("GET", f"/get_report/{report_id}/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line.removeprefix("data: ")) for line in response.iter_lines() if line.startswith("data: ")]
+    assert [(update["status"], update["progress"]) for update in events] == [("Running", 10.0), ("Complete", 100.0)]
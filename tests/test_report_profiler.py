@@ -0,0 +1,67 @@
+# tests/test_report_profiler.py
+
+import os
+import pstats
+import pytest
+from app.services import report_profiler
+from app.services.report_profiler import ReportProfiler, combine_profiles, profile_dir
+
+REPORT_ID = "profile-test"
+
+
+@pytest.fixture(autouse=True)
+def reports_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_profiler, "REPORTS_DIR", str(tmp_path))
+
+
+def first_shard_work():
+    return [bytearray(1024) for _ in range(2000)]
+
+
+def second_shard_work():
+    return sum(range(200000))
+
+
+def profile_shard(name, work):
+    profiler = ReportProfiler(REPORT_ID, name, sample_seconds=0.01)
+    with profiler.run():
+        work()
+    return profiler.summary()
+
+
+def profiled_functions(path):
+    return {function for _, _, function in pstats.Stats(path).stats}
+
+
+def test_shard_profile_is_saved(tmp_path):
+    summary = profile_shard("shard-00000", first_shard_work)
+    assert summary["profile"] == os.path.join(profile_dir(REPORT_ID), "shard-00000.prof")
+    assert "first_shard_work" in profiled_functions(summary["profile"])
+    assert summary["peak_memory_mb"] >= 2000 * 1024 / 2 ** 20
+    assert sorted(os.listdir(profile_dir(REPORT_ID))) == [
+        "shard-00000-allocations.txt", "shard-00000.prof", "shard-00000.txt"
+    ]
+
+
+def test_combined_profile_adds_cpu_time_and_keeps_the_largest_peak():
+    summaries = [profile_shard("shard-00000", first_shard_work), profile_shard("shard-00001", second_shard_work)]
+    combined = combine_profiles(REPORT_ID, summaries)
+
+    assert combined["cpu_seconds"] == round(sum(summary["cpu_seconds"] for summary in summaries), 3)
+    assert combined["peak_memory_mb"] == max(summary["peak_memory_mb"] for summary in summaries)
+    assert combined["shards"] == 2
+    assert combined["profile"] == os.path.join(profile_dir(REPORT_ID), "report.prof")
+    assert {"first_shard_work", "second_shard_work"} <= profiled_functions(combined["profile"])
+    assert os.path.exists(os.path.join(profile_dir(REPORT_ID), "report.txt"))
+
+
+def test_shards_without_a_saved_profile_are_skipped():
+    saved = profile_shard("shard-00000", second_shard_work)
+    lost = {"cpu_seconds": 1.5, "peak_memory_mb": 999.0, "profile": os.path.join(profile_dir(REPORT_ID), "gone.prof")}
+
+    combined = combine_profiles(REPORT_ID, [saved, lost])
+    assert combined["cpu_seconds"] == round(saved["cpu_seconds"] + 1.5, 3)
+    assert combined["peak_memory_mb"] == 999.0
+    assert "second_shard_work" in profiled_functions(combined["profile"])
+
+    assert combine_profiles("no-profiles", [lost])["profile"] is None
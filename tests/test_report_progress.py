@@ -0,0 +1,23 @@
+# tests/test_report_progress.py
+
+from concurrent.futures import ThreadPoolExecutor
+from app.models.report import Report
+from app.services import report_progress
+from app.services.report_progress import record_progress
+
+SHARDS = 40
+
+
+def test_concurrent_shards_never_lose_counts(loaded_db, monkeypatch):
+    monkeypatch.setattr(report_progress, "publish_report_event", lambda event: None)
+    loaded_db.add(Report(id="progress-test", status="Running"))
+    loaded_db.commit()
+    record_progress("progress-test", 0, SHARDS * 5)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda shard: record_progress("progress-test", 5), range(SHARDS)))
+
+    loaded_db.expire_all()
+    report = loaded_db.get(Report, "progress-test")
+    assert report.stores_done == SHARDS * 5
+    assert report.progress == 100.0
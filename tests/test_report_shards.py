@@ -0,0 +1,120 @@
+# tests/test_report_shards.py
+
+import csv
+import importlib
+import pytest
+from uuid import uuid4
+from app.models.report import Report
+from app.services import report_progress, report_writer
+from app.services.report_schema import REPORT_COLUMNS
+from app.services.report_writer import ReportWriter
+from app.services.uptime_engine import compute_report_rows
+from app.settings import settings
+from tests.test_uptime_engines import mismatches
+
+# The package attribute `app.tasks` is the legacy tasks module, import the task module itself
+report_tasks = importlib.import_module("app.tasks.report_tasks")
+
+SHARD_SIZE = 40
+
+
+@pytest.fixture
+def report(loaded_db, tmp_path, monkeypatch):
+    """Id of a new running report writing to a throwaway reports directory."""
+    monkeypatch.setattr(report_writer, "REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(report_tasks, "publish_report_event", lambda event: None)
+    monkeypatch.setattr(report_progress, "publish_report_event", lambda event: None)
+    monkeypatch.setattr(settings, "REPORT_PARQUET", False)
+    report_id = f"shard-test-{uuid4()}"
+    loaded_db.add(Report(id=report_id, status="Running"))
+    loaded_db.commit()
+    return report_id
+
+
+def run_shard(report_id, index, store_ids, latest_timestamp):
+    return report_tasks.compute_report_shard.apply(
+        args=[report_id, index, store_ids, latest_timestamp.isoformat()]
+    ).get()
+
+
+def read_rows(path):
+    with open(path, newline="") as report_file:
+        return [
+            {column: row[column] if column == "store_id" else float(row[column]) for column in REPORT_COLUMNS}
+            for row in csv.DictReader(report_file)
+        ]
+
+
+def report_status(db, report_id):
+    db.expire_all()
+    return db.get(Report, report_id)
+
+
+def test_shard_retries_then_writes_its_part(report, report_input, monkeypatch):
+    store_ids, latest_timestamp = report_input
+    compute_store_rows = report_tasks.compute_store_rows
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        return compute_store_rows(*args, **kwargs)
+
+    monkeypatch.setattr(report_tasks, "compute_store_rows", flaky)
+    shard = run_shard(report, 0, store_ids[:SHARD_SIZE], latest_timestamp)
+
+    assert len(calls) == 2
+    assert shard["failed_stores"] == 0
+    assert shard["rows"] == SHARD_SIZE
+    assert shard["part"] == ReportWriter.part_path(report, 0)
+
+
+def test_redelivered_shard_reuses_its_part(report, report_input, monkeypatch):
+    store_ids, latest_timestamp = report_input
+    first = run_shard(report, 3, store_ids[:SHARD_SIZE], latest_timestamp)
+    with open(first["part"]) as part:
+        written = part.read()
+
+    def recompute(*args, **kwargs):
+        raise AssertionError("a written shard must not be recomputed")
+
+    monkeypatch.setattr(report_tasks, "compute_store_rows", recompute)
+    again = run_shard(report, 3, store_ids[:SHARD_SIZE], latest_timestamp)
+
+    assert (again["part"], again["rows"], again["failed_stores"]) == (first["part"], SHARD_SIZE, 0)
+    with open(again["part"]) as part:
+        assert part.read() == written
+
+
+def test_merge_writes_shards_in_order(loaded_db, report, report_input):
+    store_ids, latest_timestamp = report_input
+    expected = {row["store_id"]: row for row in compute_report_rows(loaded_db, store_ids, latest_timestamp, filter_stores=True)}
+    shards = [store_ids[start:start + SHARD_SIZE] for start in range(0, len(store_ids), SHARD_SIZE)]
+    results = [run_shard(report, index, shard, latest_timestamp) for index, shard in enumerate(shards)]
+    # Chord results arrive in any order, and a redelivered shard may report twice
+    results = results[::-1] + results[:1]
+
+    result = report_tasks.merge_report_shards.apply(args=[results, report, len(store_ids)]).get()
+
+    assert result["total_stores_processed"] == len(store_ids)
+    assert mismatches(read_rows(result["filepath"]), expected) == []
+    assert report_status(loaded_db, report).status == "Complete"
+
+
+def test_shard_out_of_retries_fails_the_report(loaded_db, report, report_input, monkeypatch):
+    store_ids, latest_timestamp = report_input
+    good = run_shard(report, 0, store_ids[:SHARD_SIZE], latest_timestamp)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(report_tasks, "compute_store_rows", broken)
+    bad = run_shard(report, 1, store_ids[SHARD_SIZE:2 * SHARD_SIZE], latest_timestamp)
+    assert (bad["part"], bad["failed_stores"]) == (None, SHARD_SIZE)
+
+    assert report_tasks.merge_report_shards.apply(args=[[good, bad], report, 2 * SHARD_SIZE]).get() is None
+    failed = report_status(loaded_db, report)
+    assert failed.status == "Failed"
+    assert f"{SHARD_SIZE} of {2 * SHARD_SIZE} stores failed" in failed.error
+    assert "disk full" in failed.error
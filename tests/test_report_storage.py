@@ -0,0 +1,104 @@
+# tests/test_report_storage.py
+
+import pyarrow.parquet as pq
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.report import Report
+from app.services.report_schema import REPORT_COLUMNS
+from app.services.report_storage import ParquetReportSink, query_report
+from app.services.report_writer import ReportWriter
+
+BATCH = 25
+BATCHES = 4
+
+
+def report_row(number):
+    return {"store_id": f"store-{number:05d}", **{column: float(number) for column in REPORT_COLUMNS[1:]}}
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    """Parquet report of BATCH * BATCHES rows, one row group per batch; the last batch arrives as a CSV part."""
+    part = ReportWriter(str(tmp_path / "part-00003.csv"), header=False)
+    part.write_rows(report_row(number) for number in range((BATCHES - 1) * BATCH, BATCHES * BATCH))
+    part.close(BATCH)
+
+    path = str(tmp_path / "report.parquet")
+    sink = ParquetReportSink(path)
+    for batch in range(BATCHES - 1):
+        sink.write_rows([report_row(number) for number in range(batch * BATCH, (batch + 1) * BATCH)])
+    sink.write_csv_part(str(tmp_path / "part-00003.csv"))
+    sink.close()
+    return path
+
+
+@pytest.fixture
+def read_groups(monkeypatch):
+    """Indices of the row groups query_report reads."""
+    read, read_row_group = [], pq.ParquetFile.read_row_group
+
+    def record(self, index, *args, **kwargs):
+        read.append(index)
+        return read_row_group(self, index, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "read_row_group", record)
+    return read
+
+
+def test_each_batch_is_a_row_group(parquet_path):
+    assert pq.ParquetFile(parquet_path).metadata.num_row_groups == BATCHES
+
+
+@pytest.mark.parametrize("limit", [7, BATCH, 2 * BATCH])
+def test_cursor_pages_through_every_row(parquet_path, limit):
+    store_ids, cursor = [], None
+    while True:
+        page = query_report(parquet_path, cursor=cursor, limit=limit)
+        assert len(page["rows"]) <= limit
+        store_ids.extend(row["store_id"] for row in page["rows"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert cursor == page["rows"][-1]["store_id"]
+    assert store_ids == [report_row(number)["store_id"] for number in range(BATCH * BATCHES)]
+
+
+def test_a_page_skips_the_row_groups_before_the_cursor(parquet_path, read_groups):
+    page = query_report(parquet_path, cursor=report_row(2 * BATCH + 3)["store_id"], limit=5)
+    assert [row["store_id"] for row in page["rows"]] == [report_row(number)["store_id"] for number in range(54, 59)]
+    assert read_groups == [2]
+
+
+def test_store_filter_reads_only_matching_row_groups(parquet_path, read_groups):
+    wanted = [report_row(3)["store_id"], report_row(80)["store_id"], "store-99999", "aaa"]
+    page = query_report(parquet_path, store_ids=wanted, limit=10)
+    assert [row["store_id"] for row in page["rows"]] == wanted[:2]
+    assert page["next_cursor"] is None
+    assert read_groups == [0, 3]
+
+
+def test_columns_are_projected(parquet_path):
+    page = query_report(parquet_path, columns=["downtime_last_week", "store_id"], limit=1)
+    assert page["rows"] == [{"store_id": "store-00000", "downtime_last_week": 0.0}]
+
+
+def test_get_report_pages_json(loaded_db, parquet_path):
+    report_id = f"storage-test-{uuid4()}"
+    loaded_db.add(Report(id=report_id, status="Complete", result={"parquet_path": parquet_path, "total_stores": 100}))
+    loaded_db.commit()
+
+    with TestClient(app) as client:
+        page = client.get(f"/get_report/{report_id}", params={"columns": "uptime_last_hour", "limit": 2,
+                                                              "cursor": "store-00010"}).json()
+        assert page == {
+            "status": "Complete",
+            "data": [{"store_id": "store-00011", "uptime_last_hour": 11.0},
+                     {"store_id": "store-00012", "uptime_last_hour": 12.0}],
+            "next_cursor": "store-00012",
+            "total_stores": 100,
+        }
+        response = client.get(f"/get_report/{report_id}", params={"columns": "uptime,store_id"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Unknown columns: uptime"
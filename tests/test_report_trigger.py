@@ -0,0 +1,93 @@
+# tests/test_report_trigger.py
+
+import pytest
+from fastapi.testclient import TestClient
+from app.api import report as report_api
+from app.main import app
+from app.models.report import Report
+from app.services.report_watermark import bump_ingest_version, data_watermark, watermark_key
+
+
+@pytest.fixture
+def queued(loaded_db, monkeypatch):
+    """Report ids sent to the broker, starting from a watermark no report holds yet."""
+    queued = []
+    monkeypatch.setattr(report_api, "queue_report", lambda report_id, profile=False: queued.append(report_id))
+    bump_ingest_version(loaded_db)
+    loaded_db.commit()
+    return queued
+
+
+@pytest.fixture
+def client(queued):
+    with TestClient(app) as client:
+        yield client
+
+
+def trigger(client, **params):
+    response = client.get("/trigger_report", params=params)
+    assert response.status_code == 200
+    return response.json()["report_id"]
+
+
+def get_report(db, report_id):
+    db.expire_all()
+    return db.get(Report, report_id)
+
+
+def test_trigger_reuses_the_report_of_the_watermark(loaded_db, client, queued):
+    report_id = trigger(client)
+    assert trigger(client) == report_id
+    assert queued == [report_id]
+    assert get_report(loaded_db, report_id).watermark_key == watermark_key(*data_watermark(loaded_db))
+
+    bump_ingest_version(loaded_db)
+    loaded_db.commit()
+    assert trigger(client) != report_id
+    assert len(queued) == 2
+
+
+def test_failed_report_frees_its_watermark(loaded_db, client, queued):
+    report_id = trigger(client)
+    failed = get_report(loaded_db, report_id)
+    failed.status, failed.watermark_key = "Failed", None
+    loaded_db.commit()
+    assert trigger(client) != report_id
+
+
+def test_profiled_runs_never_claim_the_watermark(loaded_db, client, queued):
+    profiled = trigger(client, profile="true")
+    assert get_report(loaded_db, profiled).watermark_key is None
+    regular = trigger(client)
+    assert regular != profiled
+    assert trigger(client, profile="true") not in (profiled, regular)
+    assert len(queued) == 3
+
+
+def test_concurrent_trigger_attaches_to_the_winner(loaded_db, client, queued, monkeypatch):
+    key = watermark_key(*data_watermark(loaded_db))
+    loaded_db.add(Report(id="concurrent-winner", status="Pending", watermark_key=key))
+    loaded_db.commit()
+    # The losing trigger looked before the winner committed
+    find_report = report_api.find_report_for_watermark
+    lookups = []
+
+    async def find_after_first(db, watermark):
+        lookups.append(watermark)
+        return None if len(lookups) == 1 else await find_report(db, watermark)
+
+    monkeypatch.setattr(report_api, "find_report_for_watermark", find_after_first)
+    assert trigger(client) == "concurrent-winner"
+    assert lookups == [key, key]
+    assert queued == []
+
+
+def test_queueing_failure_frees_the_watermark(loaded_db, client, monkeypatch):
+    def broker_down(report_id, profile=False):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(report_api, "queue_report", broker_down)
+    with pytest.raises(ConnectionError):
+        client.get("/trigger_report")
+    [report] = loaded_db.query(Report).filter(Report.error == "Error queueing report: broker down").all()
+    assert (report.status, report.watermark_key) == ("Failed", None)
@@ -0,0 +1,38 @@
+# tests/test_status_buffer.py
+
+import time
+import pandas as pd
+from app.models.store import StoreStatus
+from app.services.status_buffer import StatusWriteBuffer
+
+
+def observations(store_id, ids, statuses):
+    return pd.DataFrame({
+        "id": ids,
+        "store_id": store_id,
+        "status": statuses,
+        # Long before the report week, so the engine tests see the same data
+        "timestamp_utc": pd.date_range("2000-01-01", periods=len(ids), freq="h", tz="UTC"),
+    })
+
+
+def test_rejected_observation_is_dead_lettered(loaded_db, report_input, tmp_path):
+    store_ids, _ = report_input
+    dead_letter_path = tmp_path / "status.csv"
+    buffer = StatusWriteBuffer(max_rows=1000, flush_rows=1000, flush_seconds=0.01, max_attempts=2,
+                               dead_letter_path=str(dead_letter_path))
+    ids = [f"buffer-test:{row}" for row in range(8)]
+    statuses = ["active"] * 5 + [None] + ["inactive"] * 2
+
+    # A retried batch repeats ids, which must not fail the write
+    buffer.put(observations(store_ids[0], ids[:4], statuses[:4]))
+    buffer.put(observations(store_ids[0], ids, statuses))
+    deadline = time.monotonic() + 30
+    while buffer.rows and time.monotonic() < deadline:
+        time.sleep(0.01)
+    buffer.stop(timeout=30)
+
+    assert buffer.rows == 0
+    stored = {stored_id for (stored_id,) in loaded_db.query(StoreStatus.id).filter(StoreStatus.id.in_(ids))}
+    assert stored == set(ids) - {"buffer-test:5"}
+    assert pd.read_csv(dead_letter_path)["id"].tolist() == ["buffer-test:5"]
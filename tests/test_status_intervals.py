@@ -0,0 +1,30 @@
+# tests/test_status_intervals.py
+
+import pandas as pd
+from app.models.rollup import StoreRollupState
+from app.services.status_ingest import ingest_status_frame
+from app.services.status_intervals import compact_status_intervals
+
+
+def dirty_stores(db):
+    return [store_id for (store_id,) in db.query(StoreRollupState.store_id).filter(StoreRollupState.intervals_dirty)]
+
+
+def test_compaction_checks_only_stores_ingested_since_the_last_one(loaded_db, report_input):
+    store_ids, _ = report_input
+    compact_status_intervals(loaded_db)
+    assert dirty_stores(loaded_db) == []
+
+    # Bulk loads defer the runs to the compaction
+    ingest_status_frame(loaded_db, pd.DataFrame({
+        "id": ["intervals-test:0"],
+        "store_id": [store_ids[1]],
+        "status": ["active"],
+        "timestamp_utc": [pd.Timestamp("2000-01-01", tz="UTC")],
+    }), defer_intervals=True)
+    loaded_db.commit()
+    assert dirty_stores(loaded_db) == [store_ids[1]]
+
+    assert compact_status_intervals(loaded_db) == 1
+    assert dirty_stores(loaded_db) == []
+    assert compact_status_intervals(loaded_db, store_ids) == 0
@@ -0,0 +1,32 @@
+# tests/test_status_snapshot.py
+
+import pandas as pd
+from datetime import timedelta
+from app.models.store import Store
+from app.services.report_watermark import ingest_version
+from app.services.status_ingest import ingest_status_frame
+from app.services.status_snapshot import StatusSnapshot
+
+
+def test_sync_picks_up_other_processes_ingests(loaded_db):
+    snapshot = StatusSnapshot(sync_seconds=0)
+    snapshot.seed(loaded_db)
+    horizon = snapshot._horizon
+
+    # A store that fell behind: its next poll is still older than the latest one of any store
+    store_id, state = min(snapshot._states.items(), key=lambda item: item[1].last_seen)
+    assert state.last_seen < horizon - timedelta(minutes=2)
+    observed = state.last_seen + timedelta(minutes=1)
+    status = "inactive" if state.status == "active" else "active"
+    ingest_status_frame(loaded_db, pd.DataFrame({
+        "id": ["snapshot-test:0"],
+        "store_id": [store_id],
+        "status": [status],
+        "timestamp_utc": [pd.Timestamp(observed)],
+    }))
+    loaded_db.commit()
+
+    snapshot.sync(loaded_db)
+    assert snapshot._states[store_id] == state._replace(status=status, since=observed, last_seen=observed, polls=1)
+    changed = loaded_db.query(Store.store_id).filter(Store.change_version == ingest_version(loaded_db)).all()
+    assert [changed_id for (changed_id,) in changed] == [store_id]
@@ -0,0 +1,23 @@
+# tests/test_store_directory.py
+
+from sqlalchemy import delete, update
+from app.models.ingest import IngestVersion
+from app.models.store import Store
+from app.services.report_generator import discover_stores
+from app.services.report_watermark import STORE_DIRECTORY_SOURCE
+from app.services.store_directory import backfill_stores, store_directory_complete
+
+
+def test_partial_dimension_is_not_trusted_until_backfilled(loaded_db, report_input):
+    store_ids, latest_timestamp = report_input
+    assert store_directory_complete(loaded_db)
+
+    # A dimension created on a database that already had observations
+    loaded_db.execute(delete(IngestVersion).where(IngestVersion.source == STORE_DIRECTORY_SOURCE))
+    loaded_db.execute(update(Store).where(Store.store_id.in_(store_ids[::2])).values(last_seen_utc=None))
+    loaded_db.commit()
+    assert discover_stores(loaded_db) == (store_ids, latest_timestamp)
+
+    backfill_stores(loaded_db)
+    assert store_directory_complete(loaded_db)
+    assert discover_stores(loaded_db) == (store_ids, latest_timestamp)
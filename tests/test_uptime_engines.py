@@ -0,0 +1,134 @@
+# tests/test_uptime_engines.py
+
+import pytest
+from datetime import timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.services.read_replica import REPLICA_ENGINES
+from app.services.report_schema import REPORT_COLUMNS
+from app.services.uptime_engine import compute_report_rows
+from app.services.report_generator import compute_store_rows, generate_report_per_store
+from app.services.status_intervals import compact_status_intervals, compute_interval_rows
+from app.services.uptime_rollup import compute_rollup_rows, mark_rollup_dirty, refresh_rollup
+from app.services.uptime_sql import compute_sql_rows
+from app.settings import settings
+
+# Rows are rounded to two decimals, summation order may flip the last digit
+TOLERANCE = 0.011
+
+
+def mismatches(rows, reference_rows):
+    """Cells where an engine's report rows differ from the reference rows, by store."""
+    assert [row["store_id"] for row in rows] == list(reference_rows)
+    return [
+        (row["store_id"], column, row[column], reference_rows[row["store_id"]][column])
+        for row in rows
+        for column in REPORT_COLUMNS[1:]
+        if abs(row[column] - reference_rows[row["store_id"]][column]) > TOLERANCE
+    ]
+
+
+def test_reference_covers_every_window(reference_rows):
+    assert any(row["uptime_last_hour"] or row["downtime_last_hour"] for row in reference_rows.values())
+    assert any(row["downtime_last_week"] for row in reference_rows.values())
+
+
+@pytest.mark.parametrize("scan", ["stream", "bulk"])
+def test_vectorized_engine_matches_reference(loaded_db, report_input, reference_rows, monkeypatch, scan):
+    monkeypatch.setattr(settings, "REPORT_SCAN", scan)
+    store_ids, latest_timestamp = report_input
+    rows = compute_report_rows(loaded_db, store_ids, latest_timestamp, filter_stores=True)
+    assert mismatches(rows, reference_rows) == []
+
+
+def test_rollup_engine_matches_reference(loaded_db, report_input, reference_rows):
+    store_ids, latest_timestamp = report_input
+    refresh_rollup(loaded_db)
+    rows = compute_rollup_rows(loaded_db, store_ids, latest_timestamp)
+    assert mismatches(rows, reference_rows) == []
+
+
+def test_rollup_engine_matches_vectorized_before_latest(loaded_db, report_input):
+    store_ids, latest_timestamp = report_input
+    refresh_rollup(loaded_db)
+    end_time = latest_timestamp - timedelta(hours=30, minutes=17)
+    expected = {row["store_id"]: row for row in compute_report_rows(loaded_db, store_ids, end_time, filter_stores=True)}
+    assert mismatches(compute_rollup_rows(loaded_db, store_ids, end_time), expected) == []
+
+
+def test_rollup_engine_reads_dirty_stores_raw(loaded_db, report_input, reference_rows):
+    store_ids, latest_timestamp = report_input
+    refresh_rollup(loaded_db)
+    mark_rollup_dirty(loaded_db, {store_id: latest_timestamp - timedelta(days=2) for store_id in store_ids[::3]})
+    loaded_db.commit()
+    try:
+        rows = compute_rollup_rows(loaded_db, store_ids, latest_timestamp)
+        assert mismatches(rows, reference_rows) == []
+    finally:
+        refresh_rollup(loaded_db)
+
+
+def test_intervals_engine_matches_reference(loaded_db, report_input, reference_rows):
+    store_ids, latest_timestamp = report_input
+    compact_status_intervals(loaded_db, store_ids)
+    rows = compute_interval_rows(loaded_db, store_ids, latest_timestamp, filter_stores=True)
+    assert mismatches(rows, reference_rows) == []
+
+
+def test_intervals_engine_matches_vectorized_before_latest(loaded_db, report_input):
+    store_ids, latest_timestamp = report_input
+    compact_status_intervals(loaded_db, store_ids)
+    end_time = latest_timestamp - timedelta(hours=30, minutes=17)
+    expected = {row["store_id"]: row for row in compute_report_rows(loaded_db, store_ids, end_time, filter_stores=True)}
+    assert mismatches(compute_interval_rows(loaded_db, store_ids, end_time, filter_stores=True), expected) == []
+
+
+def test_sql_engine_matches_reference(loaded_db, report_input, reference_rows):
+    store_ids, latest_timestamp = report_input
+    rows = compute_sql_rows(loaded_db, store_ids, latest_timestamp)
+    assert mismatches(rows, reference_rows) == []
+
+
+def test_sql_engine_rejects_unsupported_dialect(loaded_db, report_input, monkeypatch):
+    store_ids, latest_timestamp = report_input
+    monkeypatch.setattr(settings, "REPORT_ENGINE", "sql")
+    monkeypatch.setattr(loaded_db.get_bind().dialect, "name", "mysql")
+    with pytest.raises(ValueError, match="REPORT_ENGINE=sql"):
+        compute_store_rows(loaded_db, store_ids[:10], latest_timestamp)
+
+
+@pytest.fixture
+def read_only_db(loaded_db):
+    """Session refusing writes, like a replica session."""
+    read_only = create_engine(loaded_db.get_bind().url)
+
+    @event.listens_for(read_only, "connect")
+    def _read_only(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA query_only=ON")
+
+    db = sessionmaker(bind=read_only)()
+    yield db
+    db.close()
+    read_only.dispose()
+
+
+@pytest.mark.parametrize("engine", REPLICA_ENGINES)
+def test_replica_engines_run_read_only(loaded_db, read_only_db, report_input, engine):
+    store_ids, latest_timestamp = report_input
+    refresh_rollup(loaded_db)
+    compute = {
+        "vectorized": lambda db: compute_report_rows(db, store_ids, latest_timestamp, filter_stores=True),
+        "intervals": lambda db: compute_interval_rows(db, store_ids, latest_timestamp, filter_stores=True),
+        "rollup": lambda db: compute_rollup_rows(db, store_ids, latest_timestamp),
+        "per_store": lambda db: generate_report_per_store(db, store_ids, latest_timestamp),
+    }[engine]
+    expected = {row["store_id"]: row for row in compute(loaded_db)}
+    assert mismatches(compute(read_only_db), expected) == []
+
+
+def test_sql_engine_needs_the_primary(read_only_db, report_input):
+    store_ids, latest_timestamp = report_input
+    assert "sql" not in REPLICA_ENGINES
+    with pytest.raises(OperationalError):
+        compute_sql_rows(read_only_db, store_ids, latest_timestamp)
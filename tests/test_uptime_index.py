@@ -0,0 +1,107 @@
+# tests/test_uptime_index.py
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.services.business_hours import DAY_SECONDS, BusinessHoursIndex
+from app.services.metadata_cache import StoreMetadata
+from app.services.uptime_index import StoreUptimeIndex, UptimeIndexCache, store_uptime
+
+MINUTE = 60
+HOUR = 3600
+# Monday 2023-01-02 00:00 UTC
+MONDAY = datetime(2023, 1, 2, tzinfo=timezone.utc)
+HORIZON = MONDAY + timedelta(days=4)
+
+
+def at(seconds):
+    return MONDAY + timedelta(seconds=int(seconds))
+
+
+def hours_metadata(entries):
+    return StoreMetadata("UTC", (), BusinessHoursIndex.from_seconds(entries))
+
+
+BUSINESS_HOURS = hours_metadata(
+    [(day, 9 * HOUR, 17 * HOUR) for day in range(7)] + [(1, 22 * HOUR, 2 * HOUR)]
+)
+
+
+@pytest.fixture
+def timeline():
+    """Status changes on whole minutes over three days, alternating from a random first status."""
+    rng = np.random.default_rng(7)
+    offsets = np.sort(rng.choice(np.arange(60, 3 * DAY_SECONDS // MINUTE), size=40, replace=False)) * MINUTE
+    active = np.resize([True, False], len(offsets)) ^ bool(rng.integers(2))
+    return offsets, active
+
+
+def brute_force(offsets, active, metadata, start, end):
+    """Uptime and downtime seconds between two minute offsets, minute by minute."""
+    uptime = downtime = 0
+    for minute in range(start, min(end, int((HORIZON - MONDAY).total_seconds())), MINUTE):
+        position = np.searchsorted(offsets, minute, side="right") - 1
+        if position < 0:
+            continue
+        if metadata is not None and not metadata.hours_index.is_open(minute % (7 * DAY_SECONDS)):
+            continue
+        if active[position]:
+            uptime += MINUTE
+        else:
+            downtime += MINUTE
+    return uptime, downtime
+
+
+def make_index(offsets, active):
+    return StoreUptimeIndex(offsets.astype(np.float64) + MONDAY.timestamp(), active, at(offsets[-1]))
+
+
+@pytest.mark.parametrize("metadata", [None, BUSINESS_HOURS])
+def test_range_queries_match_a_minute_by_minute_count(timeline, metadata):
+    offsets, active = timeline
+    index = make_index(offsets, active)
+    rng = np.random.default_rng(11)
+    for _ in range(50):
+        start, end = sorted(rng.integers(0, 5 * DAY_SECONDS // MINUTE, size=2) * MINUTE)
+        expected = brute_force(offsets, active, metadata, int(start), int(end))
+        assert index.query(metadata, at(start), at(end), HORIZON) == pytest.approx(expected)
+
+
+def test_last_status_holds_until_the_horizon(timeline):
+    offsets, active = timeline
+    index = make_index(offsets, active)
+    uptime, downtime = index.query(None, at(offsets[-1]), HORIZON + timedelta(days=1), HORIZON)
+    held = (HORIZON - at(offsets[-1])).total_seconds()
+    assert (uptime, downtime) == ((held, 0.0) if active[-1] else (0.0, held))
+
+
+def test_index_reprojects_when_hours_or_horizon_change(timeline):
+    offsets, active = timeline
+    index = make_index(offsets, active)
+    start, end = at(0), HORIZON
+    always_open = sum(index.query(None, start, end, HORIZON))
+    assert sum(index.query(BUSINESS_HOURS, start, end, HORIZON)) < always_open
+    assert sum(index.query(None, start, end, HORIZON)) == always_open
+    later = HORIZON + timedelta(hours=5)
+    assert sum(index.query(None, start, later, later)) == always_open + 5 * HOUR
+
+
+def test_cache_rebuilds_entries_behind_the_stores_table(loaded_db, report_input):
+    store_id = report_input[0][0]
+    cache = UptimeIndexCache(maxsize=2)
+    index = cache.get(loaded_db, store_id, None)
+    assert cache.get(loaded_db, store_id, index.last_seen) is index
+    assert cache.get(loaded_db, store_id, index.last_seen + timedelta(minutes=1)) is not index
+    cache.invalidate([store_id])
+    assert cache.get(loaded_db, store_id, None) is not index
+    assert cache.get(loaded_db, "no-such-store", None) is None
+
+
+def test_store_uptime_covers_the_week_before_the_latest_observation(loaded_db, report_input):
+    store_id, latest_timestamp = report_input[0][0], report_input[1]
+    uptime = store_uptime(loaded_db, store_id)
+    assert uptime["end"] == latest_timestamp.replace(tzinfo=timezone.utc).isoformat()
+    assert 0 < uptime["uptime_hours"] + uptime["downtime_hours"] <= 7 * 24
+    day = store_uptime(loaded_db, store_id, start_time=latest_timestamp - timedelta(days=1))
+    assert day["uptime_hours"] <= uptime["uptime_hours"] and day["downtime_hours"] <= uptime["downtime_hours"]
+    assert store_uptime(loaded_db, "no-such-store") is None